@@ -0,0 +1,200 @@
+import logging
+import threading
+from alert_system import alert_system
+
+logger = logging.getLogger(__name__)
+
+# Límite de caracteres de un mensaje de Telegram (con margen)
+MAX_MESSAGE_CHARS = 4000
+
+
+class AlertAggregator:
+    def __init__(self, alert_system, window_seconds=30.0, priority_strength=5, max_tracked_candles=8):
+        """
+        Agrupa las señales de una misma ventana en un resumen por chat.
+
+        Las señales se acumulan hasta que todos los símbolos registrados
+        evaluaron la misma vela, o hasta que vence la ventana de tiempo, lo que
+        ocurra primero. Entonces se envía un único resumen por chat ordenado por
+        fuerza. Las señales de alta prioridad se envían en el momento.
+
+        Args:
+            alert_system (AlertSystem): Sistema de alertas usado para enviar
+            window_seconds (float): Espera máxima desde la primera señal pendiente
+            priority_strength (int): Fuerza a partir de la cual la señal se envía sola y de inmediato
+            max_tracked_candles (int): Velas por intervalo cuyo avance se sigue; las más antiguas
+                se descartan aunque algún símbolo no las haya evaluado
+        """
+        self.alert_system = alert_system
+        self.window_seconds = window_seconds
+        self.priority_strength = priority_strength
+        self.max_tracked_candles = max_tracked_candles
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+        # Símbolos esperados por intervalo y símbolos ya evaluados por vela
+        self._expected = {}
+        self._evaluated = {}
+
+    def register(self, symbol, interval):
+        """
+        Registra un símbolo cuya evaluación se espera en cada vela del intervalo
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo de las velas
+        """
+        with self._lock:
+            self._expected.setdefault(interval, set()).add(symbol)
+
+    def add(self, symbol, interval, signal_type, details, message, image=None, chat_id=None):
+        """
+        Agrega una señal a la ventana actual, o la envía de inmediato si es prioritaria
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo de las velas
+            signal_type (str): Tipo de señal ("COMPRA" o "VENTA")
+            details (dict): Detalles de la señal (price, timestamp, strength, max_strength)
+            message (str): Mensaje completo de la señal (format_signal_message)
+            image (io.BytesIO): Imagen opcional del gráfico
+            chat_id (str): Chat de destino (por defecto el del sistema de alertas)
+        """
+        entry = {
+            "symbol": symbol,
+            "interval": interval,
+            "signal_type": signal_type,
+            "details": details,
+            "message": message,
+            "image": image,
+            "chat_id": chat_id or self.alert_system.CHAT_ID,
+            "candle": details["timestamp"],
+        }
+
+        if details["strength"] >= self.priority_strength:
+            self._send_single(entry)
+            return
+
+        with self._lock:
+            self._pending.append(entry)
+            if self._timer is None:
+                self._timer = threading.Timer(self.window_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def mark_evaluated(self, symbol, interval, candle):
+        """
+        Indica que un símbolo terminó de evaluar una vela
+
+        Cuando todos los símbolos registrados del intervalo evaluaron la vela,
+        se envían las señales pendientes de esa vela sin esperar la ventana.
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo de las velas
+            candle (pd.Timestamp): Timestamp de la vela evaluada
+        """
+        with self._lock:
+            key = (interval, candle)
+            evaluated = self._evaluated.setdefault(key, set())
+            evaluated.add(symbol)
+            if not evaluated >= self._expected.get(interval, set()):
+                # Si un símbolo falla siempre, ninguna vela se completa: acotar las velas seguidas
+                self._prune(interval, keep=self.max_tracked_candles)
+                return
+            del self._evaluated[key]
+            ready = [entry for entry in self._pending
+                     if entry["interval"] == interval and entry["candle"] == candle]
+            self._pending = [entry for entry in self._pending
+                             if not (entry["interval"] == interval and entry["candle"] == candle)]
+            # Descartar velas anteriores del intervalo que ya no se completarán
+            self._prune(interval, before=candle)
+            self._cancel_timer_if_idle()
+
+        self._emit(ready)
+
+    def flush(self):
+        """
+        Envía todas las señales pendientes, sin importar la vela
+        """
+        with self._lock:
+            ready, self._pending = self._pending, []
+            self._timer = None
+        self._emit(ready)
+
+    def _prune(self, interval, before=None, keep=None):
+        """
+        Descarta velas seguidas de un intervalo: las anteriores a `before` y,
+        si hay más de `keep`, las más antiguas
+        """
+        candles = sorted(k[1] for k in self._evaluated if k[0] == interval)
+        if before is not None:
+            stale = [c for c in candles if c < before]
+        else:
+            stale = candles[:max(len(candles) - keep, 0)]
+        for candle in stale:
+            del self._evaluated[(interval, candle)]
+
+    def _cancel_timer_if_idle(self):
+        if not self._pending and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _emit(self, entries):
+        """
+        Envía un resumen por chat, o el mensaje completo si el chat tiene una sola señal
+        """
+        by_chat = {}
+        for entry in entries:
+            by_chat.setdefault(entry["chat_id"], []).append(entry)
+
+        for chat_id, chat_entries in by_chat.items():
+            if len(chat_entries) == 1:
+                self._send_single(chat_entries[0])
+                continue
+            for digest in self.format_digest(chat_entries):
+                self.alert_system.send_telegram_message(digest, chat_id=chat_id)
+            logger.info(f"Resumen de {len(chat_entries)} señales enviado al chat {chat_id}")
+
+    def _send_single(self, entry):
+        self.alert_system.send_telegram_message(entry["message"], image_path=entry["image"], chat_id=entry["chat_id"])
+
+    @staticmethod
+    def format_digest(entries):
+        """
+        Formatea un resumen compacto de señales ordenadas por fuerza
+
+        Args:
+            entries (list): Señales pendientes de un mismo chat
+
+        Returns:
+            list: Mensajes del resumen (más de uno si excede el límite de Telegram)
+        """
+        ranked = sorted(entries, key=lambda entry: entry["details"]["strength"], reverse=True)
+        header = f"📋 RESUMEN DE SEÑALES ({len(ranked)})\n\n"
+
+        lines = []
+        for entry in ranked:
+            details = entry["details"]
+            emoji = "🟢" if entry["signal_type"] == "COMPRA" else "🔴"
+            # Con varias estrategias por par, cada señal indica la suya
+            strategy = f" [{details['strategy']}]" if details.get("strategy") else ""
+            lines.append(
+                f"{emoji} {entry['symbol']} @ {entry['interval']}{strategy} | {entry['signal_type']} "
+                f"{details['strength']}/{details['max_strength']} | {details['price']:.2f} USDT"
+            )
+
+        messages = []
+        current = header
+        for line in lines:
+            if len(current) + len(line) + 1 > MAX_MESSAGE_CHARS:
+                messages.append(current.rstrip())
+                current = header
+            current += line + "\n"
+        messages.append(current.rstrip())
+        return messages
+
+
+# Agregador compartido por todos los predictores del proceso
+alert_aggregator = AlertAggregator(alert_system)
@@ -0,0 +1,307 @@
+import asyncio
+import atexit
+import logging
+import random
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = "https://api.telegram.org/bot{token}/{method}"
+
+
+class IntervalLimiter:
+    def __init__(self, rate):
+        """
+        Limitador de tasa por espaciado mínimo entre envíos (para un único event loop)
+
+        Args:
+            rate (float): Envíos permitidos por segundo
+        """
+        self.interval = 1.0 / rate
+        self._next_slot = 0.0
+
+    async def wait(self):
+        """
+        Reserva el próximo turno libre y espera hasta que llegue
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds):
+        """
+        Posterga todos los envíos siguientes (por ejemplo, tras un 429 con retry_after)
+
+        Args:
+            seconds (float): Segundos de espera desde ahora
+        """
+        now = asyncio.get_running_loop().time()
+        self._next_slot = max(self._next_slot, now + seconds)
+
+
+class TelegramDispatcher:
+    def __init__(self, token, max_queue=1000, workers=4, request_timeout=10,
+                 max_retries=5, backoff_base=1.0, backoff_max=60.0,
+                 per_chat_rate=1.0, global_rate=30.0, put_timeout=30.0):
+        """
+        Despachador asíncrono de mensajes de Telegram.
+
+        Una cola acotada es consumida por un event loop en un hilo propio que
+        reutiliza una única sesión HTTP keep-alive. Respeta los límites de
+        Telegram por chat y globales, y reintenta con backoff exponencial los
+        errores 429/5xx y de red, honrando retry_after.
+
+        Args:
+            token (str): Token del bot de Telegram
+            max_queue (int): Tamaño máximo de la cola de envíos pendientes
+            workers (int): Envíos concurrentes (a chats distintos)
+            request_timeout (float): Timeout total de cada petición en segundos
+            max_retries (int): Reintentos máximos por mensaje
+            backoff_base (float): Espera base del backoff exponencial en segundos
+            backoff_max (float): Espera máxima entre reintentos en segundos
+            per_chat_rate (float): Mensajes por segundo permitidos por chat
+            global_rate (float): Mensajes por segundo permitidos en total
+            put_timeout (float): Segundos máximos que espera quien encola si la cola está llena
+        """
+        self.token = token
+        self.max_queue = max_queue
+        self.workers = workers
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.per_chat_rate = per_chat_rate
+        self.global_rate = global_rate
+        self.put_timeout = put_timeout
+
+        self._loop = None
+        self._thread = None
+        self._queue = None
+        self._session = None
+        self._tasks = []
+        self._global_limiter = None
+        self._chat_limiters = {}
+        self._chat_locks = {}
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Inicia el event loop del despachador en un hilo de fondo (idempotente)
+        """
+        with self._start_lock:
+            if self.running:
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, name='telegram-dispatcher', daemon=True)
+            self._thread.start()
+            self._ready.wait()
+            # Entregar lo pendiente antes de que termine el intérprete
+            atexit.register(self.close)
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._setup())
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _setup(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._global_limiter = IntervalLimiter(self.global_rate)
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            connector=aiohttp.TCPConnector(limit=self.workers)
+        )
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, method, chat_id, payload=None, photo=None):
+        """
+        Encola una llamada a la API de Telegram
+
+        Bloquea hasta put_timeout si la cola está llena, para no perder mensajes
+        ante ráfagas de señales.
+
+        Args:
+            method (str): Método de la API ("sendMessage", "sendPhoto", ...)
+            chat_id (str): Chat de destino
+            payload (dict): Campos adicionales de la petición
+            photo (bytes): Imagen PNG para sendPhoto
+
+        Returns:
+            bool: True si quedó encolado, False si la cola siguió llena
+        """
+        self.start()
+        item = {"method": method, "chat_id": chat_id, "payload": payload or {}, "photo": photo}
+        future = asyncio.run_coroutine_threadsafe(self._queue.put(item), self._loop)
+        try:
+            future.result(timeout=self.put_timeout)
+            return True
+        except FutureTimeoutError:
+            future.cancel()
+            logger.error(f"Cola de alertas llena ({self.max_queue}); mensaje descartado para el chat {chat_id}")
+            return False
+
+    def send_message(self, chat_id, text):
+        """
+        Encola un mensaje de texto
+
+        Args:
+            chat_id (str): Chat de destino
+            text (str): Texto del mensaje
+
+        Returns:
+            bool: True si quedó encolado
+        """
+        return self.submit("sendMessage", chat_id, payload={"text": text})
+
+    def send_photo(self, chat_id, photo, caption=None):
+        """
+        Encola una imagen
+
+        Args:
+            chat_id (str): Chat de destino
+            photo (bytes): Contenido PNG de la imagen
+            caption (str): Texto opcional bajo la imagen
+
+        Returns:
+            bool: True si quedó encolado
+        """
+        payload = {"caption": caption} if caption else {}
+        return self.submit("sendPhoto", chat_id, payload=payload, photo=photo)
+
+    def flush(self, timeout=None):
+        """
+        Espera a que se entreguen (o descarten) todos los mensajes encolados
+
+        Args:
+            timeout (float): Segundos máximos de espera (None espera indefinidamente)
+
+        Returns:
+            bool: True si la cola quedó vacía
+        """
+        if not self.running:
+            return True
+        future = asyncio.run_coroutine_threadsafe(self._queue.join(), self._loop)
+        try:
+            future.result(timeout=timeout)
+            return True
+        except FutureTimeoutError:
+            future.cancel()
+            return False
+
+    def close(self, timeout=30.0):
+        """
+        Entrega lo pendiente, cierra la sesión HTTP y detiene el hilo
+
+        Args:
+            timeout (float): Segundos máximos para vaciar la cola
+        """
+        if not self.running:
+            return
+        if not self.flush(timeout):
+            logger.error(f"Quedaron {self._queue.qsize()} alertas sin entregar al cerrar el despachador")
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        atexit.unregister(self.close)
+
+    async def _shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._session.close()
+
+    async def _worker(self):
+        while True:
+            item = await self._queue.get()
+            try:
+                await self._deliver(item)
+            except Exception as e:
+                logger.error(f"Error inesperado al enviar alerta por Telegram: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    async def _deliver(self, item):
+        """
+        Envía una llamada respetando los límites y reintentando si corresponde
+
+        El lock por chat mantiene el orden de los mensajes de un mismo chat
+        (por ejemplo, el texto de una alerta antes de su imagen).
+        """
+        chat_id = item["chat_id"]
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        limiter = self._chat_limiters.setdefault(chat_id, IntervalLimiter(self.per_chat_rate))
+        url = TELEGRAM_API_URL.format(token=self.token, method=item["method"])
+
+        async with lock:
+            for attempt in range(self.max_retries + 1):
+                await limiter.wait()
+                await self._global_limiter.wait()
+
+                try:
+                    async with self._session.post(url, **self._request_kwargs(item)) as response:
+                        status = response.status
+                        body = await response.json(content_type=None)
+                        retry_after = response.headers.get("Retry-After")
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    delay = self._backoff(attempt)
+                    logger.warning(f"Fallo de red enviando {item['method']} (intento {attempt + 1}): {e}. "
+                                   f"Reintentando en {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                if status == 200:
+                    logger.info(f"{item['method']} enviado por Telegram al chat {chat_id}")
+                    return True
+
+                if status == 429 or status >= 500:
+                    parameters = body.get("parameters", {}) if isinstance(body, dict) else {}
+                    retry_after = parameters.get("retry_after", retry_after)
+                    delay = self._backoff(attempt)
+                    if retry_after is not None:
+                        delay = max(delay, float(retry_after))
+                    if status == 429:
+                        limiter.pause(delay)
+                    logger.warning(f"Telegram respondió {status} a {item['method']} (intento {attempt + 1}). "
+                                   f"Reintentando en {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                # Errores 4xx distintos de 429 no se resuelven reintentando
+                logger.error(f"Error al enviar {item['method']} por Telegram: {body}")
+                return False
+
+        logger.error(f"Se agotaron los reintentos para {item['method']} al chat {chat_id}")
+        return False
+
+    @staticmethod
+    def _request_kwargs(item):
+        """
+        Arma el cuerpo de la petición (se rearma en cada intento)
+        """
+        if item["photo"] is None:
+            return {"json": {"chat_id": item["chat_id"], **item["payload"]}}
+
+        form = aiohttp.FormData()
+        form.add_field("chat_id", str(item["chat_id"]))
+        for key, value in item["payload"].items():
+            form.add_field(key, str(value))
+        form.add_field("photo", item["photo"], filename="chart.png", content_type="image/png")
+        return {"data": form}
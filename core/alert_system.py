@@ -1,77 +1,60 @@
-import requests
 import logging
-import threading
 import pandas as pd
-from webpage_capturer import webpage_capturer
 from decouple import config 
-
-logger = logging.getLogger(__name__)
-
-import threading
-import requests
-import logging
+from alert_dispatcher import TelegramDispatcher
 
 logger = logging.getLogger(__name__)
 
 class AlertSystem:
-    def __init__(self, use_telegram=True):
+    def __init__(self, use_telegram=True, max_queue=1000):
         self.use_telegram = use_telegram
-        self.TELEGRAM_TOKEN = config("TELEGRAM_TOKEN")  
-        self.CHAT_ID = config("TELEGRAM_CHAT_ID")
+        # Sin credenciales (por ejemplo, en modo replay) el sistema se puede importar igual
+        self.TELEGRAM_TOKEN = config("TELEGRAM_TOKEN", default=None)  
+        self.CHAT_ID = config("TELEGRAM_CHAT_ID", default=None)
+        # Despachador con cola acotada y sesión HTTP persistente (se inicia en el primer envío)
+        self.dispatcher = TelegramDispatcher(self.TELEGRAM_TOKEN, max_queue=max_queue)
     
-    def send_telegram_message(self, message, image_path=None):
-        """Envía un mensaje de texto por Telegram en un hilo separado, con opción a incluir una imagen"""
-        thread = threading.Thread(target=self._send_telegram_message, args=(message, image_path))
-        thread.start()
-
-    def _send_telegram_message(self, text, image_path=None):
-        """Método interno para enviar el mensaje y opcionalmente una imagen"""
-        print('Send alert ejecutándose en un hilo separado')
+    def send_telegram_message(self, message, image_path=None, chat_id=None):
+        """Encola un mensaje de texto para Telegram, con opción a incluir una imagen (ruta o buffer PNG)"""
+        chat_id = chat_id or self.CHAT_ID
+        if not self.TELEGRAM_TOKEN or not chat_id:
+            logger.warning("TELEGRAM_TOKEN o TELEGRAM_CHAT_ID no configurados; alerta no enviada")
+            return False
         
         # Convertir Timestamp a string si es necesario
-        if isinstance(text, pd.Timestamp):
-            text = text.strftime("%Y-%m-%d %H:%M:%S")  # Formatear el timestamp
-
-        try:
-            # Enviar mensaje de texto
-            url = f"https://api.telegram.org/bot{self.TELEGRAM_TOKEN}/sendMessage"
-            payload = {
-                "chat_id": self.CHAT_ID,
-                "text": str(text)  # Convertir a string en caso de que haya otros objetos no serializables
-            }
-            response = requests.post(url, json=payload)
-            if response.status_code == 200:
-                logger.info("Mensaje enviado por Telegram")
-            else:
-                logger.error(f"Error al enviar mensaje: {response.json()}")
-            
-            # Enviar imagen si se proporciona
-            if image_path:
-                self._send_telegram_image(image_path)
+        if isinstance(message, pd.Timestamp):
+            message = message.strftime("%Y-%m-%d %H:%M:%S")  # Formatear el timestamp
         
-        except Exception as e:
-            logger.error(f"Error al enviar mensaje por Telegram: {e}", exc_info=True)
-    
-    def _send_telegram_image(self, image_path):
-        """Método para enviar una imagen por Telegram"""
-        url = f"https://api.telegram.org/bot{self.TELEGRAM_TOKEN}/sendPhoto"
+        # Convertir a string en caso de que haya otros objetos no serializables
+        queued = self.dispatcher.send_message(chat_id, str(message))
+        
+        # Enviar imagen si se proporciona
+        if image_path is not None:
+            image = self._read_image(image_path)
+            if image is not None:
+                queued = self.dispatcher.send_photo(chat_id, image) and queued
         
+        return queued
+    
+    def _read_image(self, image_path):
+        """Lee la imagen a enviar, desde un archivo o desde un buffer en memoria"""
         try:
+            if hasattr(image_path, 'read'):
+                image_path.seek(0)
+                return image_path.read()
             with open(image_path, 'rb') as image_file:
-                payload = {
-                    "chat_id": self.CHAT_ID
-                }
-                files = {
-                    "photo": image_file
-                }
-                response = requests.post(url, data=payload, files=files)
-                
-                if response.status_code == 200:
-                    logger.info(f"Imagen '{image_path}' enviada correctamente.")
-                else:
-                    logger.error(f"Error al enviar la imagen: {response.json()}")
+                return image_file.read()
         except Exception as e:
-            logger.error(f"Error al enviar la imagen por Telegram: {e}", exc_info=True)
+            logger.error(f"Error al leer la imagen para Telegram: {e}", exc_info=True)
+            return None
+    
+    def flush(self, timeout=None):
+        """Espera a que se entreguen las alertas encoladas"""
+        return self.dispatcher.flush(timeout)
+    
+    def close(self, timeout=30.0):
+        """Entrega las alertas pendientes y libera la sesión HTTP"""
+        self.dispatcher.close(timeout)
 
 # Ejemplo de uso
 alert_system = AlertSystem()
@@ -0,0 +1,376 @@
+import argparse
+import time
+import numpy as np
+from tabulate import tabulate
+from candle_store import CandleStore
+from indicators import IndicatorStream
+from rules import RuleSet
+
+# Parámetros de la estrategia (mismos valores por defecto que PecetoPredictor)
+DEFAULT_PARAMS = {
+    'ema_short': 9,
+    'ema_medium': 21,
+    'ema_long': 55,
+    'rsi_period': 14,
+    'rsi_oversold': 30,
+    'rsi_overbought': 70,
+    'cooldown_hours': 2,
+    'min_conditions': 3,
+}
+
+BUY_CONDITIONS = ('ema_cross_up', 'price_above_long_ema', 'rsi_oversold_exit', 'macd_cross_up', 'near_support')
+SELL_CONDITIONS = ('ema_cross_down', 'price_below_long_ema', 'rsi_overbought_entry', 'macd_cross_down', 'near_resistance')
+
+# Columnas cuyo valor en la vela anterior usan las condiciones
+PREV_COLUMNS = ('ema_short', 'ema_medium', 'rsi', 'macd', 'macd_signal')
+
+
+def signal_conditions(indicators, close, rsi_oversold=30, rsi_overbought=70, prev=None):
+    """
+    Evalúa las condiciones de compra y venta de la estrategia Peceto en todas las velas
+
+    Es la versión vectorizada de check_buy_signal/check_sell_signal: la
+    posición i compara la vela i con la i - 1.
+
+    Args:
+        indicators (dict): Columnas de indicadores
+        close (np.ndarray): Precios de cierre
+        rsi_oversold (float): Nivel de sobreventa del RSI
+        rsi_overbought (float): Nivel de sobrecompra del RSI
+        prev (dict): Valores de PREV_COLUMNS en la vela anterior al bloque (None al inicio)
+
+    Returns:
+        tuple: (dict, dict) arreglos booleanos de las condiciones de compra y de venta
+    """
+    def previous(name):
+        values = indicators[name]
+        out = np.empty_like(values)
+        if values.shape[-1]:
+            out[..., 0] = np.nan if prev is None else prev[name]
+            out[..., 1:] = values[..., :-1]
+        return out
+
+    ema_short, ema_medium, ema_long = indicators['ema_short'], indicators['ema_medium'], indicators['ema_long']
+    rsi, macd, macd_signal = indicators['rsi'], indicators['macd'], indicators['macd_signal']
+    prev_ema_short, prev_ema_medium = previous('ema_short'), previous('ema_medium')
+    prev_rsi, prev_macd, prev_macd_signal = previous('rsi'), previous('macd'), previous('macd_signal')
+
+    buy = {
+        'ema_cross_up': (prev_ema_short <= prev_ema_medium) & (ema_short > ema_medium),
+        'price_above_long_ema': close > ema_long,
+        'rsi_oversold_exit': (prev_rsi < rsi_oversold) & (rsi >= rsi_oversold),
+        'macd_cross_up': (prev_macd <= prev_macd_signal) & (macd > macd_signal),
+        'near_support': close <= indicators['lower_band'] * 1.01,
+    }
+    sell = {
+        'ema_cross_down': (prev_ema_short >= prev_ema_medium) & (ema_short < ema_medium),
+        'price_below_long_ema': close < ema_long,
+        'rsi_overbought_entry': (prev_rsi > rsi_overbought) & (rsi <= rsi_overbought),
+        'macd_cross_down': (prev_macd >= prev_macd_signal) & (macd < macd_signal),
+        'near_resistance': close >= indicators['upper_band'] * 0.99,
+    }
+    return buy, sell
+
+
+def signal_strength(conditions):
+    """
+    Cantidad de condiciones cumplidas en cada vela
+    """
+    return np.sum([conditions[name] for name in conditions], axis=0, dtype=np.int64)
+
+
+def prioritize(buy_strength, sell_strength, min_conditions=3):
+    """
+    Señales de compra y venta tras priorizar la más fuerte, como en run()
+
+    Returns:
+        tuple: (np.ndarray, np.ndarray) señales booleanas de compra y de venta
+    """
+    buy = buy_strength >= min_conditions
+    sell = sell_strength >= min_conditions
+    both = buy & sell
+    return buy & ~(both & (buy_strength <= sell_strength)), sell & ~(both & (buy_strength > sell_strength))
+
+
+class PecetoBacktest:
+    def __init__(self, params=None, initial_capital=1000.0, fee=0.001, keep_trades=True, rules=None):
+        """
+        Backtest incremental de la estrategia Peceto (solo largos)
+
+        Las alertas siguen las reglas de run(): se prioriza la señal más
+        fuerte y cada tipo de alerta respeta su cooldown (medido en tiempo de
+        vela). Una alerta de COMPRA abre una posición si no hay una abierta y
+        una de VENTA la cierra, ambas al cierre de la vela.
+
+        Los bloques de velas se procesan en orden con update(); todo el estado
+        (indicadores, posición, cooldown y métricas) se conserva entre
+        bloques, por lo que el resultado no depende del tamaño de bloque.
+
+        Args:
+            params (dict): Parámetros de la estrategia (ver DEFAULT_PARAMS)
+            initial_capital (float): Capital inicial en USDT
+            fee (float): Comisión por operación (fracción)
+            keep_trades (bool): Si es True, guarda el detalle de cada operación
+            rules (RuleSet): Reglas compiladas (rules.py) en lugar de las condiciones
+                fijas; sus umbrales y mínimos reemplazan a los de params. Pueden
+                leer high, low, close y los indicadores
+        """
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.rules = rules
+        self.initial_capital = initial_capital
+        self.fee = fee
+        self.keep_trades = keep_trades
+        self.indicators = IndicatorStream(
+            self.params['ema_short'], self.params['ema_medium'],
+            self.params['ema_long'], self.params['rsi_period']
+        )
+        self.cooldown_ms = self.params['cooldown_hours'] * 3600 * 1000
+
+        self._prev = None
+        self.cash = initial_capital
+        self.units = 0.0
+        self.entry_price = None
+        self.entry_time = None
+        self.last_buy_alert = None
+        self.last_sell_alert = None
+
+        self.n_bars = 0
+        self.bars_in_position = 0
+        self.buy_alerts = 0
+        self.sell_alerts = 0
+        self.equity = initial_capital
+        self.peak = initial_capital
+        self.max_drawdown = 0.0
+        self.n_trades = 0
+        self.wins = 0
+        self.trades = []
+
+    def update(self, open_time, high, low, close):
+        """
+        Procesa el siguiente bloque de velas
+
+        Args:
+            open_time (np.ndarray): open_time de cada vela en milisegundos
+            high (np.ndarray): Máximos
+            low (np.ndarray): Mínimos
+            close (np.ndarray): Cierres
+
+        Returns:
+            np.ndarray: Equity al cierre de cada vela del bloque
+        """
+        close = np.asarray(close, dtype=float)
+        if len(close) == 0:
+            return np.empty(0)
+
+        indicators = self.indicators.update(high, low, close)
+        if self.rules is not None:
+            columns = {**indicators, 'high': np.asarray(high, dtype=float), 'low': np.asarray(low, dtype=float),
+                       'close': close}
+            buy, sell = self.rules.signals(columns, self._prev)
+            self._prev = self.rules.carry(columns, self._prev)
+            return self.apply_signals(open_time, close, buy, sell)
+
+        buy_conditions, sell_conditions = signal_conditions(
+            indicators, close, self.params['rsi_oversold'], self.params['rsi_overbought'], self._prev
+        )
+        self._prev = {name: indicators[name][-1] for name in PREV_COLUMNS}
+        buy, sell = prioritize(
+            signal_strength(buy_conditions), signal_strength(sell_conditions), self.params['min_conditions']
+        )
+        return self.apply_signals(open_time, close, buy, sell)
+
+    def apply_signals(self, open_time, close, buy, sell):
+        """
+        Aplica cooldown y posición a señales ya priorizadas de un bloque
+
+        Permite simular con señales calculadas fuera de update() (por ejemplo,
+        a partir de indicadores precalculados en el optimizador).
+
+        Args:
+            open_time (np.ndarray): open_time de cada vela en milisegundos
+            close (np.ndarray): Cierres
+            buy (np.ndarray): Señales de compra priorizadas
+            sell (np.ndarray): Señales de venta priorizadas
+
+        Returns:
+            np.ndarray: Equity al cierre de cada vela del bloque
+        """
+        open_time = np.asarray(open_time, dtype=np.int64)
+        close = np.asarray(close, dtype=float)
+        count = len(close)
+        if count == 0:
+            return np.empty(0)
+
+        # Recorrer solo las velas con señal; el resto no cambia la posición
+        changes = []
+        cash_states, units_states = [self.cash], [self.units]
+        for index in np.flatnonzero(buy | sell):
+            bar_time = int(open_time[index])
+            if buy[index]:
+                if self.last_buy_alert is not None and bar_time - self.last_buy_alert < self.cooldown_ms:
+                    continue
+                self.last_buy_alert = bar_time
+                self.buy_alerts += 1
+                if self.units > 0.0:
+                    continue
+                self._open(bar_time, close[index])
+            else:
+                if self.last_sell_alert is not None and bar_time - self.last_sell_alert < self.cooldown_ms:
+                    continue
+                self.last_sell_alert = bar_time
+                self.sell_alerts += 1
+                if self.units == 0.0:
+                    continue
+                self._close(bar_time, close[index])
+            changes.append(index)
+            cash_states.append(self.cash)
+            units_states.append(self.units)
+
+        # Estado vigente en cada vela: 0 es el del inicio del bloque, k el posterior al cambio k
+        segment = np.zeros(count, dtype=np.int64)
+        if changes:
+            segment[changes] = np.arange(1, len(changes) + 1)
+            segment = np.maximum.accumulate(segment)
+        units = np.asarray(units_states)[segment]
+        equity = np.asarray(cash_states)[segment] + units * close
+
+        # Métricas incrementales: el máximo de equity se arrastra entre bloques
+        running_peak = np.maximum.accumulate(np.concatenate(([self.peak], equity)))[1:]
+        self.max_drawdown = max(self.max_drawdown, float(np.max(1 - equity / running_peak)))
+        self.peak = float(running_peak[-1])
+        self.equity = float(equity[-1])
+        self.bars_in_position += int(np.count_nonzero(units))
+        self.n_bars += count
+        return equity
+
+    def _open(self, bar_time, price):
+        self.units = self.cash * (1 - self.fee) / price
+        self.cash = 0.0
+        self.entry_price = float(price)
+        self.entry_time = bar_time
+
+    def _close(self, bar_time, price):
+        self.cash = self.units * price * (1 - self.fee)
+        trade_return = price * (1 - self.fee) ** 2 / self.entry_price - 1
+        self.units = 0.0
+        self.n_trades += 1
+        self.wins += int(trade_return > 0)
+        if self.keep_trades:
+            self.trades.append({
+                'entry_time': self.entry_time,
+                'exit_time': bar_time,
+                'entry_price': self.entry_price,
+                'exit_price': float(price),
+                'return': float(trade_return),
+            })
+        self.entry_price = None
+        self.entry_time = None
+
+    def results(self):
+        """
+        Resultados acumulados hasta la última vela procesada
+
+        Una posición abierta se valúa al último cierre.
+
+        Returns:
+            dict: Métricas del backtest
+        """
+        return {
+            'bars': self.n_bars,
+            'final_equity': self.equity,
+            'total_return': self.equity / self.initial_capital - 1,
+            'max_drawdown': self.max_drawdown,
+            'trades': self.n_trades,
+            'win_rate': self.wins / self.n_trades if self.n_trades else 0.0,
+            'exposure': self.bars_in_position / self.n_bars if self.n_bars else 0.0,
+            'buy_alerts': self.buy_alerts,
+            'sell_alerts': self.sell_alerts,
+            'open_position': self.units > 0.0,
+            'trade_log': self.trades if self.keep_trades else None,
+        }
+
+
+def run_backtest(candles, params=None, on_chunk=None, **kwargs):
+    """
+    Backtest en memoria sobre un arreglo completo de velas
+
+    Args:
+        candles (np.ndarray): Registros KLINE_DTYPE ordenados por open_time
+        params (dict): Parámetros de la estrategia (ver DEFAULT_PARAMS)
+        on_chunk (callable): Función opcional on_chunk(open_time, equity)
+        **kwargs: Parámetros adicionales de PecetoBacktest
+
+    Returns:
+        dict: Métricas del backtest
+    """
+    backtest = PecetoBacktest(params, **kwargs)
+    equity = backtest.update(candles['open_time'], candles['high'], candles['low'], candles['close'])
+    if on_chunk is not None:
+        on_chunk(candles['open_time'], equity)
+    return backtest.results()
+
+
+def stream_backtest(store, symbol, interval, chunk_size=100_000, start=None, end=None,
+                    params=None, on_chunk=None, **kwargs):
+    """
+    Backtest por bloques leyendo las velas del almacenamiento local
+
+    Solo hay un bloque en memoria a la vez, por lo que el consumo no crece
+    con el largo del historial. El resultado es idéntico al de run_backtest()
+    sobre las mismas velas.
+
+    Args:
+        store (CandleStore): Almacenamiento local de velas
+        symbol (str): Par de trading
+        interval (str): Intervalo de las velas
+        chunk_size (int): Velas por bloque
+        start (int): open_time mínimo en milisegundos (incluido)
+        end (int): open_time máximo en milisegundos (excluido)
+        params (dict): Parámetros de la estrategia (ver DEFAULT_PARAMS)
+        on_chunk (callable): Función opcional on_chunk(open_time, equity) por bloque
+        **kwargs: Parámetros adicionales de PecetoBacktest
+
+    Returns:
+        dict: Métricas del backtest
+    """
+    backtest = PecetoBacktest(params, **kwargs)
+    for chunk in store.iter_chunks(symbol, interval, chunk_size, start, end):
+        equity = backtest.update(chunk['open_time'], chunk['high'], chunk['low'], chunk['close'])
+        if on_chunk is not None:
+            on_chunk(chunk['open_time'], equity)
+    return backtest.results()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest por bloques de la estrategia Peceto sobre velas almacenadas")
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='1m')
+    parser.add_argument('--start', help="Inicio del backtest (UTC), por ejemplo 2022-01-01")
+    parser.add_argument('--end', help="Fin del backtest (UTC)")
+    parser.add_argument('--data-dir', default='data/klines', help="Directorio del almacenamiento local de velas")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="Velas por bloque")
+    parser.add_argument('--capital', type=float, default=1000.0, help="Capital inicial en USDT")
+    parser.add_argument('--fee', type=float, default=0.001, help="Comisión por operación")
+    parser.add_argument('--rules', help="Archivo JSON de reglas de señales (ver rules.py)")
+    args = parser.parse_args()
+
+    to_ms = lambda value: int(np.datetime64(value, 'ms').astype(np.int64)) if value else None
+    started = time.perf_counter()
+    result = stream_backtest(
+        CandleStore(args.data_dir), args.symbol, args.interval, args.chunk_size,
+        to_ms(args.start), to_ms(args.end), initial_capital=args.capital, fee=args.fee, keep_trades=False,
+        rules=RuleSet.from_file(args.rules) if args.rules else None
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f"Backtest {args.symbol} {args.interval}: {result['bars']} velas en {elapsed:.1f}s")
+    print(tabulate([
+        ["Equity final", f"{result['final_equity']:.2f}"],
+        ["Retorno total", f"{result['total_return']:.2%}"],
+        ["Máximo drawdown", f"{result['max_drawdown']:.2%}"],
+        ["Operaciones", result['trades']],
+        ["Tasa de acierto", f"{result['win_rate']:.2%}"],
+        ["Exposición", f"{result['exposure']:.2%}"],
+        ["Alertas de compra", result['buy_alerts']],
+        ["Alertas de venta", result['sell_alerts']],
+    ], headers=["Métrica", "Valor"], tablefmt="grid"))
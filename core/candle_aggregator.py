@@ -0,0 +1,296 @@
+import argparse
+import logging
+import threading
+import time
+import numpy as np
+from tabulate import tabulate
+from candle_store import KLINE_DTYPE, CandleStore, array_to_klines, interval_to_ms, klines_to_array
+from clock import SystemClock
+
+logger = logging.getLogger(__name__)
+
+# Binance alinea las velas a múltiplos del intervalo desde la época, salvo las
+# semanales, que empiezan el lunes (la época cayó en jueves)
+BUCKET_OFFSET_MS = {'1w': 4 * 86_400_000}
+
+# Campos que se suman al agrupar velas
+SUM_FIELDS = ('volume', 'quote_asset_volume', 'number_of_trades',
+              'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume')
+
+
+def bucket_start(open_time, interval):
+    """
+    open_time de la vela de `interval` que contiene cada instante
+
+    Args:
+        open_time (int | np.ndarray): Instantes en milisegundos
+        interval (str): Intervalo de destino
+
+    Returns:
+        int | np.ndarray: Inicio de la vela contenedora en milisegundos
+    """
+    step = interval_to_ms(interval)
+    offset = BUCKET_OFFSET_MS.get(interval, 0)
+    return (open_time - offset) // step * step + offset
+
+
+def aggregate(candles, interval):
+    """
+    Agrupa velas de un intervalo menor en velas de `interval` (OHLCV)
+
+    Cada vela resultante toma la apertura de la primera vela del grupo, el
+    cierre de la última, el máximo y mínimo del grupo y la suma de volúmenes
+    y operaciones. Las velas faltantes (huecos del exchange) simplemente no
+    aportan al grupo.
+
+    Args:
+        candles (np.ndarray): Registros KLINE_DTYPE ordenados por open_time
+        interval (str): Intervalo de destino (múltiplo del de origen)
+
+    Returns:
+        np.ndarray: Registros KLINE_DTYPE, uno por grupo (el último puede estar incompleto)
+    """
+    if not len(candles):
+        return np.empty(0, dtype=KLINE_DTYPE)
+    buckets = bucket_start(candles['open_time'], interval)
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.concatenate((starts[1:], [len(candles)])) - 1
+
+    result = np.empty(len(starts), dtype=KLINE_DTYPE)
+    result['open_time'] = buckets[starts]
+    result['close_time'] = buckets[starts] + interval_to_ms(interval) - 1
+    result['open'] = candles['open'][starts]
+    result['close'] = candles['close'][ends]
+    result['high'] = np.maximum.reduceat(candles['high'], starts)
+    result['low'] = np.minimum.reduceat(candles['low'], starts)
+    for field in SUM_FIELDS:
+        result[field] = np.add.reduceat(candles[field], starts)
+    return result
+
+
+class CandleAggregator:
+    def __init__(self, client, base_interval='1m', history=500, poll_seconds=1.0, clock=None):
+        """
+        Velas de varios intervalos derivadas de un único flujo de velas base
+
+        Por par se consultan solo las velas de base_interval; las de los
+        intervalos mayores se arman localmente agrupando esas velas. Cada
+        intervalo se inicializa una vez desde la API (el historial previo) y
+        desde ahí avanza solo con las velas base, por lo que las consultas a
+        la API no dependen de cuántos intervalos se sigan.
+
+        Args:
+            client: Cliente con get_klines (por ejemplo, Client de Binance)
+            base_interval (str): Intervalo de las velas consultadas
+            history (int): Velas cerradas a conservar por intervalo
+            poll_seconds (float): Tiempo mínimo entre consultas de velas base por par
+            clock: Reloj con time() (por defecto, SystemClock)
+        """
+        self.client = client
+        self.base_interval = base_interval
+        self.base_ms = interval_to_ms(base_interval)
+        self.history = history
+        self.poll_seconds = poll_seconds
+        self.clock = clock if clock is not None else SystemClock()
+        self._lock = threading.Lock()
+        # Por par: velas base cerradas, vela base en formación, próxima vela base
+        # a consultar y hora de la última consulta
+        self._base = {}
+        self._forming = {}
+        self._cursor = {}
+        self._polled = {}
+        # Por (par, intervalo): velas cerradas
+        self._closed = {}
+        self.requests = 0
+
+    def _now_ms(self):
+        return int(self.clock.time() * 1000)
+
+    def _fetch(self, symbol, interval, **kwargs):
+        self.requests += 1
+        return klines_to_array(self.client.get_klines(symbol=symbol, interval=interval, **kwargs))
+
+    def _split_forming(self, rows, now):
+        # La API incluye la vela en formación como última fila
+        closed = rows[rows['close_time'] < now]
+        forming = rows[rows['close_time'] >= now]
+        return closed, forming[-1:] if len(forming) else None
+
+    def track(self, symbol, interval):
+        """
+        Empieza a seguir un intervalo de un par con su historial inicial
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo (múltiplo de base_interval)
+        """
+        step = interval_to_ms(interval)
+        if step % self.base_ms:
+            raise ValueError(f"{interval} no es múltiplo de {self.base_interval}")
+        with self._lock:
+            if (symbol, interval) in self._closed:
+                return
+            now = self._now_ms()
+            closed, _ = self._split_forming(self._fetch(symbol, interval, limit=self.history + 1), now)
+            self._closed[(symbol, interval)] = closed[-self.history:]
+
+            # Las velas base deben cubrir desde el fin de la última vela cerrada del intervalo
+            next_open = int(closed['open_time'][-1]) + step if len(closed) else int(bucket_start(now, interval))
+            if symbol not in self._cursor:
+                self._load_base(symbol, next_open, now)
+                return
+            # Primera vela base disponible (las anteriores ya formaron velas cerradas)
+            base = self._base[symbol]
+            available = int(base['open_time'][0]) if len(base) else self._cursor[symbol]
+            if available > next_open:
+                self._load_base(symbol, next_open, now)
+
+    def _load_base(self, symbol, start, now):
+        self._base[symbol] = np.empty(0, dtype=KLINE_DTYPE)
+        self._cursor[symbol] = start
+        self._poll(symbol, now)
+
+    def _poll(self, symbol, now):
+        # Velas base desde el cursor, en páginas de hasta 1000 velas
+        start = self._cursor[symbol]
+        pages = []
+        while True:
+            rows = self._fetch(symbol, self.base_interval, startTime=start, limit=1000)
+            pages.append(rows)
+            if len(rows) < 1000:
+                break
+            start = int(rows['open_time'][-1]) + self.base_ms
+        closed, forming = self._split_forming(np.concatenate(pages), now)
+        if len(closed):
+            self._base[symbol] = np.concatenate((self._base[symbol], closed))
+            self._cursor[symbol] = int(closed['open_time'][-1]) + self.base_ms
+        self._forming[symbol] = forming
+        self._polled[symbol] = self.clock.time()
+        self._roll_up(symbol)
+
+    def refresh(self, symbol, force=False):
+        """
+        Consulta las velas base nuevas de un par y actualiza todos sus intervalos
+
+        Varias llamadas dentro de poll_seconds comparten una misma consulta.
+
+        Args:
+            symbol (str): Par de trading
+            force (bool): Consultar aunque no haya pasado poll_seconds
+        """
+        with self._lock:
+            if symbol not in self._base:
+                raise KeyError(f"No se sigue ningún intervalo de {symbol}")
+            if not force and self.clock.time() - self._polled[symbol] < self.poll_seconds:
+                return
+            self._poll(symbol, self._now_ms())
+
+    def _roll_up(self, symbol):
+        """
+        Agrega a cada intervalo las velas que las velas base ya completaron
+        """
+        base = self._base[symbol]
+        if not len(base):
+            return
+        complete_until = int(base['close_time'][-1]) + 1
+        keep_from = complete_until
+        for (candle_symbol, interval), closed in self._closed.items():
+            if candle_symbol != symbol:
+                continue
+            step = interval_to_ms(interval)
+            next_open = int(closed['open_time'][-1]) + step if len(closed) else int(bucket_start(base['open_time'][0], interval))
+            pending = base[base['open_time'] >= next_open]
+            rows = aggregate(pending, interval)
+            rows = rows[rows['open_time'] + step <= complete_until]
+            if len(rows):
+                closed = np.concatenate((closed, rows))[-self.history:]
+                self._closed[(symbol, interval)] = closed
+                next_open = int(closed['open_time'][-1]) + step
+            keep_from = min(keep_from, next_open)
+        # Solo se conservan las velas base que todavía no formaron una vela cerrada
+        self._base[symbol] = base[base['open_time'] >= keep_from]
+
+    def candles(self, symbol, interval, limit=500):
+        """
+        Últimas velas de un intervalo, con la vela en formación al final (como la API)
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo
+            limit (int): Cantidad máxima de velas
+
+        Returns:
+            np.ndarray: Registros KLINE_DTYPE
+        """
+        with self._lock:
+            closed = self._closed[(symbol, interval)]
+            step = interval_to_ms(interval)
+            next_open = int(closed['open_time'][-1]) + step if len(closed) else None
+            base = self._base[symbol]
+            parts = [base if next_open is None else base[base['open_time'] >= next_open]]
+            if self._forming[symbol] is not None:
+                parts.append(self._forming[symbol])
+            # Las velas base pendientes solo cubren velas todavía abiertas
+            rows = np.concatenate((closed, aggregate(np.concatenate(parts), interval)))
+            return rows[-limit:]
+
+    def last_price(self, symbol):
+        """
+        Último precio conocido del par (cierre de la vela base más reciente)
+        """
+        with self._lock:
+            forming = self._forming.get(symbol)
+            if forming is not None:
+                return float(forming['close'][0])
+            base = self._base.get(symbol)
+            if base is None or not len(base):
+                raise KeyError(f"No hay velas de {symbol}")
+            return float(base['close'][-1])
+
+
+class AggregatedKlineClient:
+    def __init__(self, aggregator):
+        """
+        Cliente compatible con PecetoPredictor que sirve velas del agregador
+
+        get_klines y get_symbol_ticker se responden con las velas locales; la
+        única consulta a la API es la de las velas base, compartida por todos
+        los predictores del mismo par.
+
+        Args:
+            aggregator (CandleAggregator): Agregador de velas
+        """
+        self.aggregator = aggregator
+
+    def get_klines(self, symbol, interval, limit=500, **kwargs):
+        self.aggregator.track(symbol, interval)
+        self.aggregator.refresh(symbol)
+        return array_to_klines(self.aggregator.candles(symbol, interval, limit))
+
+    def get_symbol_ticker(self, symbol):
+        return {"symbol": symbol, "price": str(self.aggregator.last_price(symbol))}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arma velas de intervalos mayores a partir de velas de 1m almacenadas")
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--intervals', nargs='+', default=['5m', '15m', '1h', '4h'])
+    parser.add_argument('--base-interval', default='1m')
+    parser.add_argument('--data-dir', default='data/klines', help="Directorio del almacenamiento local de velas")
+    parser.add_argument('--write', action='store_true', help="Agregar las velas armadas al almacenamiento")
+    args = parser.parse_args()
+
+    store = CandleStore(args.data_dir)
+    base = store.load(args.symbol, args.base_interval)
+    rows = []
+    for interval in args.intervals:
+        started = time.perf_counter()
+        candles = aggregate(base, interval)
+        # La última vela puede estar incompleta si las velas base no cubren todo el grupo
+        if len(candles) and candles['close_time'][-1] > base['close_time'][-1]:
+            candles = candles[:-1]
+        elapsed = time.perf_counter() - started
+        added = store.append(args.symbol, interval, candles) if args.write else 0
+        rows.append([interval, len(candles), f"{elapsed * 1000:.1f}", added])
+    print(f"{len(base)} velas de {args.symbol} {args.base_interval}")
+    print(tabulate(rows, headers=["Intervalo", "Velas", "ms", "Agregadas"], tablefmt="grid"))
@@ -0,0 +1,271 @@
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columnas de las velas tal como las devuelve la API de Binance
+KLINE_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_asset_volume', 'number_of_trades',
+    'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
+]
+
+# Registro binario de ancho fijo de una vela (sin la columna 'ignore')
+KLINE_DTYPE = np.dtype([
+    ('open_time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('close_time', '<i8'),
+    ('quote_asset_volume', '<f8'),
+    ('number_of_trades', '<i8'),
+    ('taker_buy_base_asset_volume', '<f8'),
+    ('taker_buy_quote_asset_volume', '<f8'),
+])
+
+# Duración de los intervalos de Binance en milisegundos ('1M' depende del mes)
+INTERVAL_MS = {
+    '1s': 1000,
+    '1m': 60_000,
+    '3m': 3 * 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 3_600_000,
+    '2h': 2 * 3_600_000,
+    '4h': 4 * 3_600_000,
+    '6h': 6 * 3_600_000,
+    '8h': 8 * 3_600_000,
+    '12h': 12 * 3_600_000,
+    '1d': 86_400_000,
+    '3d': 3 * 86_400_000,
+    '1w': 7 * 86_400_000,
+}
+
+
+def interval_to_ms(interval):
+    """
+    Convierte un intervalo de Binance a milisegundos
+
+    Args:
+        interval (str): Intervalo (por ejemplo '15m')
+
+    Returns:
+        int: Duración en milisegundos
+    """
+    try:
+        return INTERVAL_MS[interval]
+    except KeyError:
+        raise ValueError(f"Intervalo no soportado: {interval}")
+
+
+def klines_to_array(klines):
+    """
+    Convierte velas en formato de la API de Binance (listas de 12 campos) a registros
+
+    Args:
+        klines (list): Velas tal como las devuelve client.get_klines()
+
+    Returns:
+        np.ndarray: Arreglo estructurado con dtype KLINE_DTYPE
+    """
+    array = np.empty(len(klines), dtype=KLINE_DTYPE)
+    if not len(klines):
+        return array
+    for position, name in enumerate(KLINE_DTYPE.names):
+        array[name] = [kline[position] for kline in klines]
+    return array
+
+
+def array_to_klines(array):
+    """
+    Convierte registros al formato de la API de Binance (listas de 12 campos)
+
+    Args:
+        array (np.ndarray): Arreglo estructurado con dtype KLINE_DTYPE
+
+    Returns:
+        list: Velas con el mismo layout que client.get_klines()
+    """
+    columns = [array[name].tolist() for name in KLINE_DTYPE.names]
+    columns.append(['0'] * len(array))
+    return [list(row) for row in zip(*columns)]
+
+
+def to_frame(array):
+    """
+    Convierte registros a un DataFrame como el de PecetoPredictor.get_historical_klines()
+
+    Args:
+        array (np.ndarray): Arreglo estructurado con dtype KLINE_DTYPE
+
+    Returns:
+        pd.DataFrame: DataFrame con las columnas de las velas
+    """
+    data = pd.DataFrame({name: array[name] for name in KLINE_DTYPE.names})
+    data = data.rename(columns={'open_time': 'timestamp'})
+    data['timestamp'] = pd.to_datetime(data['timestamp'], unit='ms')
+    data['ignore'] = '0'
+    return data[KLINE_COLUMNS]
+
+
+class CandleStore:
+    def __init__(self, root='data/klines'):
+        """
+        Almacenamiento local de velas: un archivo binario por par e intervalo.
+
+        Cada archivo es una secuencia de registros KLINE_DTYPE ordenados por
+        open_time, sin cabecera. Escribir es agregar al final; leer es mapear
+        el archivo en memoria y buscar por tiempo sin cargarlo entero.
+
+        Args:
+            root (str): Directorio raíz del almacenamiento
+        """
+        self.root = root
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, symbol, f"{interval}.bin")
+
+    def exists(self, symbol, interval):
+        return os.path.exists(self.path(symbol, interval))
+
+    def symbols(self):
+        """
+        Lista los pares con velas almacenadas
+        """
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def count(self, symbol, interval):
+        """
+        Cantidad de velas almacenadas para un par e intervalo
+        """
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // KLINE_DTYPE.itemsize
+
+    def last_open_time(self, symbol, interval):
+        """
+        Obtiene el open_time de la última vela almacenada
+
+        Returns:
+            int: Timestamp en milisegundos, o None si no hay velas
+        """
+        count = self.count(symbol, interval)
+        if count == 0:
+            return None
+        with open(self.path(symbol, interval), 'rb') as file:
+            file.seek((count - 1) * KLINE_DTYPE.itemsize)
+            return int(np.frombuffer(file.read(KLINE_DTYPE.itemsize), dtype=KLINE_DTYPE)['open_time'][0])
+
+    def append(self, symbol, interval, rows):
+        """
+        Agrega velas al final del archivo, ignorando las ya almacenadas
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo de las velas
+            rows (np.ndarray): Registros KLINE_DTYPE ordenados por open_time
+
+        Returns:
+            int: Cantidad de velas agregadas
+        """
+        rows = np.asarray(rows, dtype=KLINE_DTYPE)
+        last = self.last_open_time(symbol, interval)
+        if last is not None:
+            rows = rows[rows['open_time'] > last]
+        if not len(rows):
+            return 0
+
+        path = self.path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as file:
+            file.write(np.ascontiguousarray(rows).tobytes())
+        return len(rows)
+
+    def load(self, symbol, interval, start=None, end=None):
+        """
+        Obtiene las velas de un rango de tiempo como vista mapeada en memoria
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo de las velas
+            start (int): open_time mínimo en milisegundos (incluido)
+            end (int): open_time máximo en milisegundos (excluido)
+
+        Returns:
+            np.ndarray: Registros KLINE_DTYPE (vacío si no hay datos)
+        """
+        if self.count(symbol, interval) == 0:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        array = np.memmap(self.path(symbol, interval), dtype=KLINE_DTYPE, mode='r')
+        first, last = self._bounds(array, start, end)
+        return array[first:last]
+
+    def iter_chunks(self, symbol, interval, chunk_size=100_000, start=None, end=None):
+        """
+        Recorre las velas de un rango en bloques de tamaño fijo
+
+        Cada bloque es una copia en memoria, por lo que el consumo es
+        proporcional a chunk_size y no al largo del historial.
+
+        Yields:
+            np.ndarray: Bloques de registros KLINE_DTYPE
+        """
+        array = self.load(symbol, interval, start, end)
+        for offset in range(0, len(array), chunk_size):
+            yield np.array(array[offset:offset + chunk_size])
+
+    @staticmethod
+    def _bounds(array, start, end):
+        open_times = array['open_time']
+        first = 0 if start is None else int(np.searchsorted(open_times, start, side='left'))
+        last = len(array) if end is None else int(np.searchsorted(open_times, end, side='left'))
+        return first, last
+
+    def download(self, client, symbol, interval, start, end=None, limit=1000, now=None):
+        """
+        Descarga velas cerradas desde la API de Binance y las agrega al almacenamiento
+
+        Args:
+            client (binance.client.Client): Cliente de Binance
+            symbol (str): Par de trading
+            interval (str): Intervalo de las velas
+            start (int): open_time inicial en milisegundos
+            end (int): open_time final en milisegundos (por defecto, ahora)
+            limit (int): Velas por petición (máximo 1000)
+            now (int): Instante actual en milisegundos, que decide qué velas están cerradas
+                (por defecto, el reloj del sistema; con un reloj virtual, el de ese reloj)
+
+        Returns:
+            int: Cantidad de velas agregadas
+        """
+        now = int(time.time() * 1000) if now is None else int(now)
+        end = now if end is None else min(end, now)
+        last = self.last_open_time(symbol, interval)
+        if last is not None:
+            start = max(start, last + 1)
+
+        added = 0
+        while start < end:
+            klines = client.get_klines(symbol=symbol, interval=interval, startTime=start,
+                                       endTime=end - 1, limit=limit)
+            if not klines:
+                break
+            rows = klines_to_array(klines)
+            # No guardar la vela en formación
+            rows = rows[rows['close_time'] < now]
+            added += self.append(symbol, interval, rows)
+            start = int(klines[-1][0]) + 1
+            if len(klines) < limit:
+                break
+
+        logger.info(f"{added} velas de {symbol} {interval} agregadas al almacenamiento local")
+        return added
@@ -7,9 +7,10 @@ import time
 from datetime import datetime
 import webbrowser
 import os
+from collections import deque
 
 class TradingChart:
-    def __init__(self, symbol='BTCUSDT', interval='15m', update_interval=5, port=8050):
+    def __init__(self, symbol='BTCUSDT', interval='15m', update_interval=5, port=8050, max_signals=500):
         """
         Inicializa el módulo de gráficos para el bot de trading
         
@@ -18,6 +19,7 @@ class TradingChart:
             interval (str): Intervalo de tiempo para las velas
             update_interval (int): Intervalo de actualización en segundos
             port (int): Puerto para el servidor Dash
+            max_signals (int): Señales de cada tipo que se conservan (las más viejas se descartan)
         """
         self.symbol = symbol
         self.interval = interval
@@ -26,8 +28,10 @@ class TradingChart:
         
         # Datos para el gráfico
         self.data = None
-        self.buy_signals = []
-        self.sell_signals = []
+        self.buy_signals = deque(maxlen=max_signals)
+        self.sell_signals = deque(maxlen=max_signals)
+        # El bot agrega señales mientras el servidor de Dash las recorre desde su hilo
+        self._signals_lock = threading.Lock()
         
         # Estado del servidor
         self.running = False
@@ -42,28 +46,32 @@ class TradingChart:
             data (pd.DataFrame): DataFrame con datos de velas e indicadores
             buy_signal (bool): Si hay señal de compra
             sell_signal (bool): Si hay señal de venta
-            buy_details (dict): Detalles de la señal de compra
-            sell_details (dict): Detalles de la señal de venta
+            buy_details (SignalRecord | dict): Detalles de la señal de compra
+            sell_details (SignalRecord | dict): Detalles de la señal de venta
         """
         self.data = data.copy()
         
         # Registrar señales si existen
-        if buy_signal and buy_details:
-            self.buy_signals.append({
-                'timestamp': buy_details['timestamp'],
-                'price': buy_details['price'],
-                'strength': buy_details['strength'],
-                'details': buy_details
-            })
-        
-        if sell_signal and sell_details:
-            self.sell_signals.append({
-                'timestamp': sell_details['timestamp'],
-                'price': sell_details['price'],
-                'strength': sell_details['strength'],
-                'details': sell_details
-            })
+        with self._signals_lock:
+            if buy_signal and buy_details:
+                self.buy_signals.append(buy_details)
             
+            if sell_signal and sell_details:
+                self.sell_signals.append(sell_details)
+            
+    def signals(self):
+        """
+        Copia de las señales registradas
+
+        Un deque no puede recorrerse mientras otro hilo le agrega elementos,
+        así que los lectores (el servidor de Dash, el renderizador) usan esta copia.
+
+        Returns:
+            tuple: (list, list) señales de compra y de venta
+        """
+        with self._signals_lock:
+            return list(self.buy_signals), list(self.sell_signals)
+
     def create_chart(self):
         """
         Crea un gráfico interactivo con Plotly
@@ -184,14 +192,15 @@ class TradingChart:
         ), row=3, col=1)
         
         # Añadir señales de compra y venta
-        buy_timestamps = [signal['timestamp'] for signal in self.buy_signals 
+        buy_signals, sell_signals = self.signals()
+        buy_timestamps = [signal['timestamp'] for signal in buy_signals 
                          if signal['timestamp'] in self.data['timestamp'].values]
-        buy_prices = [signal['price'] for signal in self.buy_signals 
+        buy_prices = [signal['price'] for signal in buy_signals 
                      if signal['timestamp'] in self.data['timestamp'].values]
         
-        sell_timestamps = [signal['timestamp'] for signal in self.sell_signals 
+        sell_timestamps = [signal['timestamp'] for signal in sell_signals 
                           if signal['timestamp'] in self.data['timestamp'].values]
-        sell_prices = [signal['price'] for signal in self.sell_signals 
+        sell_prices = [signal['price'] for signal in sell_signals 
                       if signal['timestamp'] in self.data['timestamp'].values]
         
         if buy_timestamps:
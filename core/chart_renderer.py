@@ -0,0 +1,246 @@
+import io
+import threading
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+# Colores alineados con los del gráfico interactivo de chart_module
+COLOR_UP = '#26a69a'
+COLOR_DOWN = '#ef5350'
+COLOR_EMA_SHORT = (1.0, 165 / 255, 0.0, 0.7)
+COLOR_EMA_MEDIUM = (46 / 255, 139 / 255, 87 / 255, 0.7)
+COLOR_EMA_LONG = (25 / 255, 25 / 255, 112 / 255, 0.7)
+COLOR_BANDS = (173 / 255, 216 / 255, 230 / 255, 0.8)
+COLOR_BANDS_FILL = (173 / 255, 216 / 255, 230 / 255, 0.15)
+
+
+class ChartRenderer:
+    def __init__(self, symbol='BTCUSDT', interval='15m', width=1200, height=800, dpi=80,
+                 max_candles=200, rsi_oversold=30, rsi_overbought=70, compress_level=1):
+        """
+        Renderizador de gráficos a PNG en memoria, sin navegador.
+
+        Mantiene una única figura de matplotlib (backend Agg) con todos los
+        elementos ya creados; cada render solo actualiza los datos de esos
+        elementos y rasteriza, por lo que tarda decenas de milisegundos.
+
+        Args:
+            symbol (str): Par de trading mostrado en el título
+            interval (str): Intervalo de las velas mostrado en el título
+            width (int): Ancho de la imagen en píxeles
+            height (int): Alto de la imagen en píxeles
+            dpi (int): Resolución de la figura
+            max_candles (int): Cantidad máxima de velas a dibujar (las más recientes)
+            rsi_oversold (int): Nivel de sobreventa dibujado en el panel de RSI
+            rsi_overbought (int): Nivel de sobrecompra dibujado en el panel de RSI
+            compress_level (int): Nivel de compresión PNG (0-9, menor es más rápido)
+        """
+        self.symbol = symbol
+        self.interval = interval
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.max_candles = max_candles
+        self.rsi_oversold = rsi_oversold
+        self.rsi_overbought = rsi_overbought
+        self.compress_level = compress_level
+
+        # La figura no es thread-safe: un render a la vez
+        self._lock = threading.Lock()
+        self._timestamps = pd.DatetimeIndex([])
+
+        self._build_figure()
+
+    def _build_figure(self):
+        """
+        Crea la figura y todos sus elementos una única vez
+        """
+        self.figure = Figure(figsize=(self.width / self.dpi, self.height / self.dpi), dpi=self.dpi)
+        FigureCanvasAgg(self.figure)
+
+        grid = self.figure.add_gridspec(3, 1, height_ratios=[0.6, 0.2, 0.2], hspace=0.08)
+        self.ax_price = self.figure.add_subplot(grid[0])
+        self.ax_rsi = self.figure.add_subplot(grid[1], sharex=self.ax_price)
+        self.ax_macd = self.figure.add_subplot(grid[2], sharex=self.ax_price)
+        self.figure.subplots_adjust(left=0.07, right=0.97, top=0.93, bottom=0.06)
+
+        # Panel de precio: velas, EMAs, bandas de Bollinger y señales
+        self._band_fill = PolyCollection([], facecolors=[COLOR_BANDS_FILL], linewidths=0)
+        self.ax_price.add_collection(self._band_fill)
+        self._wicks = LineCollection([], linewidths=0.8)
+        self.ax_price.add_collection(self._wicks)
+        self._bodies = PolyCollection([], linewidths=0)
+        self.ax_price.add_collection(self._bodies)
+
+        self._upper_band, = self.ax_price.plot([], [], color=COLOR_BANDS, linewidth=1)
+        self._lower_band, = self.ax_price.plot([], [], color=COLOR_BANDS, linewidth=1)
+        self._ema_short, = self.ax_price.plot([], [], color=COLOR_EMA_SHORT, linewidth=1, label='EMA corta')
+        self._ema_medium, = self.ax_price.plot([], [], color=COLOR_EMA_MEDIUM, linewidth=1, label='EMA media')
+        self._ema_long, = self.ax_price.plot([], [], color=COLOR_EMA_LONG, linewidth=1, label='EMA larga')
+        self._buy_markers, = self.ax_price.plot([], [], linestyle='none', marker='^', markersize=9,
+                                                color='green', label='Señal de Compra')
+        self._sell_markers, = self.ax_price.plot([], [], linestyle='none', marker='v', markersize=9,
+                                                 color='red', label='Señal de Venta')
+        self.ax_price.set_ylabel('Precio')
+        self.ax_price.legend(loc='upper left', fontsize=8, ncol=5, frameon=False)
+
+        # Panel de RSI
+        self._rsi, = self.ax_rsi.plot([], [], color=(70 / 255, 130 / 255, 180 / 255), linewidth=1)
+        self.ax_rsi.axhline(self.rsi_overbought, color='red', linestyle='--', linewidth=0.8)
+        self.ax_rsi.axhline(self.rsi_oversold, color='green', linestyle='--', linewidth=0.8)
+        self.ax_rsi.set_ylim(0, 100)
+        self.ax_rsi.set_ylabel('RSI')
+
+        # Panel de MACD
+        self._macd_hist = PolyCollection([], linewidths=0)
+        self.ax_macd.add_collection(self._macd_hist)
+        self._macd, = self.ax_macd.plot([], [], color='blue', linewidth=1)
+        self._macd_signal, = self.ax_macd.plot([], [], color='red', linewidth=1)
+        self.ax_macd.set_ylabel('MACD')
+
+        # Eje X por posición de vela; las etiquetas se traducen a fechas
+        self.ax_macd.xaxis.set_major_locator(MaxNLocator(nbins=8, integer=True))
+        self.ax_macd.xaxis.set_major_formatter(FuncFormatter(self._format_tick))
+        for ax in (self.ax_price, self.ax_rsi):
+            ax.tick_params(labelbottom=False)
+        for ax in (self.ax_price, self.ax_rsi, self.ax_macd):
+            ax.grid(True, linewidth=0.3, alpha=0.5)
+
+        self._title = self.figure.suptitle('', fontsize=12)
+
+    def _format_tick(self, value, _position):
+        """
+        Traduce la posición de una vela a su fecha para las etiquetas del eje X
+        """
+        index = int(round(value))
+        if 0 <= index < len(self._timestamps):
+            return self._timestamps[index].strftime('%m-%d %H:%M')
+        return ''
+
+    @staticmethod
+    def _signal_positions(signals, timestamps):
+        """
+        Convierte una lista de señales a posiciones de vela dentro de la ventana
+
+        Args:
+            signals (list): Señales con claves 'timestamp' y 'price'
+            timestamps (np.ndarray): Timestamps (int64) de las velas dibujadas
+
+        Returns:
+            tuple: (np.ndarray, np.ndarray) posiciones X y precios de las señales visibles
+        """
+        if not signals or len(timestamps) == 0:
+            return np.empty(0), np.empty(0)
+
+        signal_times = pd.DatetimeIndex([signal['timestamp'] for signal in signals]).asi8
+        prices = np.array([signal['price'] for signal in signals], dtype=float)
+
+        positions = np.searchsorted(timestamps, signal_times)
+        positions = np.clip(positions, 0, len(timestamps) - 1)
+        visible = timestamps[positions] == signal_times
+        return positions[visible].astype(float), prices[visible]
+
+    def render(self, data, buy_signals=None, sell_signals=None):
+        """
+        Dibuja velas, indicadores y señales y devuelve la imagen PNG en memoria
+
+        Args:
+            data (pd.DataFrame): DataFrame con velas e indicadores (salida de calculate_indicators)
+            buy_signals (list): Señales de compra con claves 'timestamp' y 'price'
+            sell_signals (list): Señales de venta con claves 'timestamp' y 'price'
+
+        Returns:
+            io.BytesIO: Buffer con la imagen PNG, posicionado al inicio
+        """
+        data = data.iloc[-self.max_candles:]
+        count = len(data)
+        x = np.arange(count, dtype=float)
+
+        open_ = data['open'].to_numpy(dtype=float)
+        high = data['high'].to_numpy(dtype=float)
+        low = data['low'].to_numpy(dtype=float)
+        close = data['close'].to_numpy(dtype=float)
+        upper = data['upper_band'].to_numpy(dtype=float)
+        lower = data['lower_band'].to_numpy(dtype=float)
+        macd = data['macd'].to_numpy(dtype=float)
+        macd_signal = data['macd_signal'].to_numpy(dtype=float)
+        macd_hist = data['macd_hist'].to_numpy(dtype=float)
+
+        with self._lock:
+            self._timestamps = pd.DatetimeIndex(data['timestamp'])
+
+            # Velas: mechas como segmentos y cuerpos como rectángulos
+            self._wicks.set_segments(np.stack([np.column_stack([x, low]), np.column_stack([x, high])], axis=1))
+            colors = np.where(close >= open_, COLOR_UP, COLOR_DOWN)
+            self._wicks.set_color(colors)
+            half = 0.35
+            self._bodies.set_verts(np.stack([
+                np.column_stack([x - half, open_]),
+                np.column_stack([x + half, open_]),
+                np.column_stack([x + half, close]),
+                np.column_stack([x - half, close]),
+            ], axis=1))
+            self._bodies.set_facecolor(colors)
+
+            # Bandas de Bollinger (solo donde ya hay ventana completa)
+            valid = np.isfinite(upper) & np.isfinite(lower)
+            if valid.any():
+                band = np.concatenate([
+                    np.column_stack([x[valid], upper[valid]]),
+                    np.column_stack([x[valid][::-1], lower[valid][::-1]]),
+                ])
+                self._band_fill.set_verts([band])
+            else:
+                self._band_fill.set_verts([])
+            self._upper_band.set_data(x, upper)
+            self._lower_band.set_data(x, lower)
+
+            self._ema_short.set_data(x, data['ema_short'].to_numpy(dtype=float))
+            self._ema_medium.set_data(x, data['ema_medium'].to_numpy(dtype=float))
+            self._ema_long.set_data(x, data['ema_long'].to_numpy(dtype=float))
+
+            timestamps = self._timestamps.asi8
+            self._buy_markers.set_data(*self._signal_positions(buy_signals, timestamps))
+            self._sell_markers.set_data(*self._signal_positions(sell_signals, timestamps))
+
+            self._rsi.set_data(x, data['rsi'].to_numpy(dtype=float))
+
+            self._macd.set_data(x, macd)
+            self._macd_signal.set_data(x, macd_signal)
+            hist = np.nan_to_num(macd_hist)
+            self._macd_hist.set_verts(np.stack([
+                np.column_stack([x - half, np.zeros(count)]),
+                np.column_stack([x + half, np.zeros(count)]),
+                np.column_stack([x + half, hist]),
+                np.column_stack([x - half, hist]),
+            ], axis=1))
+            self._macd_hist.set_facecolor(np.where(hist >= 0, 'green', 'red'))
+
+            # Límites de los ejes
+            self.ax_price.set_xlim(-1, max(count, 1))
+            if count:
+                price_low, price_high = np.nanmin(low), np.nanmax(high)
+                margin = (price_high - price_low) * 0.05 or price_high * 0.01 or 1.0
+                self.ax_price.set_ylim(price_low - margin, price_high + margin)
+
+                macd_values = np.concatenate([macd, macd_signal, hist])
+                macd_values = macd_values[np.isfinite(macd_values)]
+                if len(macd_values):
+                    macd_low, macd_high = macd_values.min(), macd_values.max()
+                    margin = (macd_high - macd_low) * 0.1 or 1.0
+                    self.ax_macd.set_ylim(macd_low - margin, macd_high + margin)
+
+                last_time = self._timestamps[-1].strftime('%Y-%m-%d %H:%M:%S')
+                self._title.set_text(f'{self.symbol} ({self.interval}) - Última vela: {last_time}')
+            else:
+                self._title.set_text(f'{self.symbol} ({self.interval})')
+
+            buf = io.BytesIO()
+            self.figure.savefig(buf, format='png', dpi=self.dpi,
+                                pil_kwargs={'compress_level': self.compress_level})
+            buf.seek(0)
+
+        return buf
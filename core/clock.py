@@ -0,0 +1,50 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+
+class SystemClock:
+    """
+    Reloj real usado por el bot en vivo (fechas naive en UTC, como las velas)
+    """
+
+    def now(self):
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    def __init__(self, start, end=None, on_expire=None):
+        """
+        Reloj simulado para reproducir el bucle principal sin esperas reales.
+
+        sleep() avanza el tiempo al instante; al pasar `end` se llama una única
+        vez a `on_expire` (por ejemplo, para detener el predictor). Las fechas
+        son naive en UTC, como los timestamps de las velas.
+
+        Args:
+            start (datetime): Instante inicial
+            end (datetime): Instante final de la simulación (opcional)
+            on_expire (callable): Función a llamar cuando el reloj supera `end`
+        """
+        self._now = start
+        self.end = end
+        self.on_expire = on_expire
+        self.expired = False
+
+    def now(self):
+        return self._now
+
+    def time(self):
+        return self._now.replace(tzinfo=timezone.utc).timestamp()
+
+    def sleep(self, seconds):
+        self._now += timedelta(seconds=seconds)
+        if self.end is not None and self._now >= self.end and not self.expired:
+            self.expired = True
+            if self.on_expire is not None:
+                self.on_expire()
@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+from datetime import datetime, timezone
+import pandas as pd
+
+# Segundos entre limpiezas automáticas de los registros de deduplicación
+PRUNE_EVERY_SECONDS = 3600
+
+
+class CooldownStore:
+    def __init__(self, path='cooldowns.db', timeout=5.0, retention_seconds=35 * 86400):
+        """
+        Almacén compartido de cooldown y deduplicación de alertas sobre SQLite.
+
+        Varios procesos pueden usar el mismo archivo: la verificación y el
+        registro de una alerta ocurren en una única transacción, por lo que
+        solo uno de ellos la envía. Los datos sobreviven a reinicios.
+
+        Args:
+            path (str): Ruta del archivo de base de datos
+            timeout (float): Segundos máximos de espera si otro proceso tiene el lock
+            retention_seconds (float): Antigüedad a partir de la cual try_acquire borra los
+                registros de deduplicación; debe superar la duración de la vela más larga
+                usada (por defecto, más de un mes), porque hasta que cierra la siguiente
+                la misma vela puede volver a dar la señal
+        """
+        self.path = path
+        self.timeout = timeout
+        self.retention_seconds = retention_seconds
+        self._pruned_at = None
+        # sqlite3 no comparte conexiones entre hilos: una por hilo
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS alerts (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                side TEXT NOT NULL,
+                candle INTEGER NOT NULL,
+                sent_at REAL NOT NULL,
+                PRIMARY KEY (symbol, interval, side, candle)
+            ) WITHOUT ROWID
+        """)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS cooldowns (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                side TEXT NOT NULL,
+                last_sent REAL NOT NULL,
+                PRIMARY KEY (symbol, interval, side)
+            ) WITHOUT ROWID
+        """)
+
+    @staticmethod
+    def _epoch(moment):
+        # Las fechas naive son UTC, como las de los relojes y las velas
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.timestamp()
+
+    @staticmethod
+    def _candle_key(candle):
+        return int(pd.Timestamp(candle).value // 10**6)
+
+    def try_acquire(self, symbol, interval, side, candle, now, cooldown_seconds):
+        """
+        Verifica y registra una alerta de forma atómica
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo de las velas
+            side (str): Tipo de señal ("COMPRA" o "VENTA")
+            candle (pd.Timestamp): Vela que dispara la alerta
+            now (datetime): Momento actual
+            cooldown_seconds (float): Espera mínima entre alertas del mismo tipo
+
+        Returns:
+            bool: True si la alerta debe enviarse (y quedó registrada), False si
+            ya se envió para esa vela o está en cooldown
+        """
+        sent_at = self._epoch(now)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Cada tanto, descartar registros viejos para que la tabla no crezca sin límite
+            if self._pruned_at is None or sent_at - self._pruned_at >= PRUNE_EVERY_SECONDS:
+                connection.execute("DELETE FROM alerts WHERE sent_at < ?", (sent_at - self.retention_seconds,))
+                self._pruned_at = sent_at
+            inserted = connection.execute(
+                "INSERT OR IGNORE INTO alerts (symbol, interval, side, candle, sent_at) VALUES (?, ?, ?, ?, ?)",
+                (symbol, interval, side, self._candle_key(candle), sent_at)
+            ).rowcount
+            if not inserted:
+                connection.execute("ROLLBACK")
+                return False
+
+            updated = connection.execute("""
+                INSERT INTO cooldowns (symbol, interval, side, last_sent) VALUES (?, ?, ?, ?)
+                ON CONFLICT (symbol, interval, side) DO UPDATE SET last_sent = excluded.last_sent
+                WHERE cooldowns.last_sent <= excluded.last_sent - ?
+            """, (symbol, interval, side, sent_at, cooldown_seconds)).rowcount
+            if not updated:
+                connection.execute("ROLLBACK")
+                return False
+
+            connection.execute("COMMIT")
+            return True
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def last_alert(self, symbol, interval, side):
+        """
+        Obtiene el momento de la última alerta enviada
+
+        Returns:
+            datetime: Momento de la última alerta (naive en UTC), o None si no hubo
+        """
+        row = self._connection().execute(
+            "SELECT last_sent FROM cooldowns WHERE symbol = ? AND interval = ? AND side = ?",
+            (symbol, interval, side)
+        ).fetchone()
+        return datetime.fromtimestamp(row[0], timezone.utc).replace(tzinfo=None) if row else None
+
+    def is_in_cooldown(self, symbol, interval, side, now, cooldown_seconds):
+        """
+        Verifica (sin registrar nada) si un tipo de alerta está en cooldown
+
+        Returns:
+            bool: True si está en cooldown
+        """
+        last = self.last_alert(symbol, interval, side)
+        return last is not None and (now - last).total_seconds() < cooldown_seconds
+
+    def prune(self, older_than):
+        """
+        Elimina los registros de deduplicación anteriores a una fecha
+
+        Args:
+            older_than (datetime): Fecha límite
+        """
+        connection = self._connection()
+        connection.execute("DELETE FROM alerts WHERE sent_at < ?", (self._epoch(older_than),))
+
+    def close(self):
+        """
+        Cierra la conexión del hilo actual
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
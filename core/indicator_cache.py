@@ -0,0 +1,134 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def fingerprint(*arrays):
+    """
+    Huella de una o más series (contenido, tipo y forma)
+
+    Dos series con los mismos valores tienen la misma huella aunque sean
+    objetos distintos, por lo que sirven de clave entre ejecuciones.
+
+    Args:
+        *arrays (np.ndarray): Series de entrada
+
+    Returns:
+        str: Huella hexadecimal
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.view(np.uint8))
+    return digest.hexdigest()
+
+
+def _nbytes(value):
+    if isinstance(value, tuple):
+        return sum(_nbytes(item) for item in value)
+    return value.nbytes
+
+
+def _freeze(value):
+    # Las series guardadas se comparten entre llamadas: no deben modificarse
+    if isinstance(value, tuple):
+        return tuple(_freeze(item) for item in value)
+    value = np.asarray(value)
+    # Una vista (por ejemplo, de una columna de pandas) se copia para no bloquear al dueño
+    if not value.flags.owndata:
+        value = value.copy()
+    value.setflags(write=False)
+    return value
+
+
+class IndicatorCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        """
+        Caché LRU de series de indicadores con límite de memoria
+
+        Cada entrada se identifica por (huella de la serie de entrada,
+        indicador, parámetros) y guarda un arreglo o una tupla de arreglos de
+        solo lectura. Al superar max_bytes se descartan las entradas usadas
+        hace más tiempo.
+
+        Args:
+            max_bytes (int): Memoria máxima ocupada por las series guardadas
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, compute):
+        """
+        Devuelve la serie guardada bajo key, calculándola solo si falta
+
+        Args:
+            key (tuple): (huella, indicador, parámetros)
+            compute (callable): Función sin argumentos que calcula la serie
+
+        Returns:
+            np.ndarray | tuple: Serie o tupla de series de solo lectura
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # El cálculo se hace fuera del lock; si dos hilos calculan la misma serie gana el primero
+        value = _freeze(compute())
+        size = _nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= _nbytes(evicted)
+        return value
+
+    def series(self, series_key, indicator, params, compute):
+        """
+        Atajo de get() para una serie identificada por su huella
+
+        Args:
+            series_key (str): Huella de la serie de entrada (ver fingerprint())
+            indicator (str): Nombre del indicador
+            params (tuple): Parámetros del indicador
+            compute (callable): Función sin argumentos que calcula la serie
+        """
+        return self.get((series_key, indicator, tuple(params)), compute)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Estado del caché
+
+        Returns:
+            dict: Entradas, memoria ocupada, aciertos y fallos
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# Instancia compartida por el predictor y el optimizador
+indicator_cache = IndicatorCache()
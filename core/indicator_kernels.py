@@ -0,0 +1,320 @@
+import argparse
+import functools
+import time
+import numpy as np
+from tabulate import tabulate
+from indicators import (BOLLINGER_STD, BOLLINGER_WINDOW, ATR_WINDOW, MACD_SIGNAL_SPAN, rolling_mean, rolling_std,
+                        rsi, true_range)
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Filas de la matriz de salida del kernel (mismos nombres que calculate_indicators)
+FUSED_COLUMNS = (
+    'ema_short', 'ema_medium', 'ema_long', 'rsi', 'macd', 'macd_signal', 'macd_hist',
+    'sma20', 'stddev', 'upper_band', 'lower_band', 'tr', 'atr',
+)
+
+# Grupos de columnas que se calculan juntos; los grupos sin columnas pedidas se omiten
+FUSED_GROUPS = {
+    'ema': ('ema_short', 'ema_medium', 'ema_long', 'macd', 'macd_signal', 'macd_hist'),
+    'rsi': ('rsi',),
+    'bands': ('sma20', 'stddev', 'upper_band', 'lower_band'),
+    'atr': ('tr', 'atr'),
+}
+
+
+def _window_mean(values, i, window):
+    # Suma en el mismo orden que indicators.rolling_sum para obtener los mismos valores
+    total = values[i - window + 1]
+    for j in range(i - window + 2, i + 1):
+        total += values[j]
+    return total / window
+
+
+def _fused_pass(high, low, close, ema_short, ema_medium, ema_long, rsi_period,
+                signal_span, bollinger_window, bollinger_std, atr_window,
+                do_ema, do_rsi, do_bands, do_atr, out):
+    """
+    Calcula los grupos de indicadores pedidos en una sola pasada sobre las velas
+
+    Escrito con bucles simples para que numba lo compile; sin numba se usa
+    _grouped_indicators(), que da los mismos valores con operaciones de NumPy.
+    Las filas de `out` de los grupos omitidos quedan sin inicializar.
+    """
+    n = close.shape[0]
+    alphas = (2.0 / (ema_short + 1.0), 2.0 / (ema_medium + 1.0),
+              2.0 / (ema_long + 1.0), 2.0 / (signal_span + 1.0))
+    gain = np.zeros(n)
+    loss = np.zeros(n)
+    tr = np.empty(n)
+
+    for i in range(n):
+        # EMAs, MACD y su señal: la misma fórmula que pandas ewm(adjust=False)
+        if do_ema:
+            for row in range(3):
+                alpha = alphas[row]
+                if i == 0:
+                    out[row, i] = close[i]
+                else:
+                    out[row, i] = ((1.0 - alpha) * out[row, i - 1] + alpha * close[i]) / ((1.0 - alpha) + alpha)
+            out[4, i] = out[0, i] - out[1, i]
+            alpha = alphas[3]
+            if i == 0:
+                out[5, i] = out[4, i]
+            else:
+                out[5, i] = ((1.0 - alpha) * out[5, i - 1] + alpha * out[4, i]) / ((1.0 - alpha) + alpha)
+            out[6, i] = out[4, i] - out[5, i]
+
+        # RSI con medias simples de ganancias y pérdidas
+        if do_rsi:
+            if i > 0:
+                delta = close[i] - close[i - 1]
+                if delta > 0:
+                    gain[i] = delta
+                elif delta < 0:
+                    loss[i] = -delta
+            if i >= rsi_period - 1:
+                rs = _window_mean(gain, i, rsi_period) / _window_mean(loss, i, rsi_period)
+                out[3, i] = 100 - (100 / (1 + rs))
+            else:
+                out[3, i] = np.nan
+
+        # Bandas de Bollinger (desvío muestral)
+        if do_bands:
+            if i >= bollinger_window - 1:
+                mean = _window_mean(close, i, bollinger_window)
+                total = 0.0
+                for j in range(i - bollinger_window + 1, i + 1):
+                    deviation = close[j] - mean
+                    total += deviation * deviation
+                stddev = np.sqrt(total / (bollinger_window - 1))
+                out[7, i] = mean
+                out[8, i] = stddev
+                out[9, i] = mean + (stddev * bollinger_std)
+                out[10, i] = mean - (stddev * bollinger_std)
+            else:
+                out[7, i] = out[8, i] = out[9, i] = out[10, i] = np.nan
+
+        # Rango verdadero y ATR (NaN en la primera vela, como pandas)
+        if do_atr:
+            if i == 0:
+                tr[i] = np.nan
+            else:
+                tr[i] = max(max(high[i] - low[i], abs(high[i] - close[i - 1])), abs(low[i] - close[i - 1]))
+            out[11, i] = tr[i]
+            out[12, i] = _window_mean(tr, i, atr_window) if i >= atr_window - 1 else np.nan
+    return out
+
+
+if NUMBA_AVAILABLE:
+    # error_model='numpy': las divisiones por cero dan inf/NaN como en pandas;
+    # nogil=True: varios hilos pueden ejecutar el kernel a la vez
+    _window_mean = njit(cache=True, nogil=True, error_model='numpy')(_window_mean)
+    _fused_kernel = njit(cache=True, nogil=True, error_model='numpy')(_fused_pass)
+else:
+    _fused_kernel = None
+
+# Velas por bloque de block_ema(): acota el error de las potencias del factor de decaimiento
+EMA_BLOCK = 64
+
+
+@functools.lru_cache(maxsize=32)
+def _ema_weights(span, block):
+    """
+    Pesos de un bloque de la EMA: weights[t, i] es el peso del valor i en la
+    salida t, y carry[t] el de la última salida del bloque anterior
+    """
+    alpha = 2.0 / (span + 1.0)
+    steps = np.arange(block)
+    lags = steps[:, None] - steps[None, :]
+    weights = np.where(lags >= 0, alpha * (1.0 - alpha) ** np.maximum(lags, 0), 0.0)
+    carry = (1.0 - alpha) ** (steps + 1)
+    return weights.T.copy(), carry
+
+
+def block_ema(values, span, block=EMA_BLOCK):
+    """
+    EMA (adjust=False) por bloques de velas con productos de matrices
+
+    indicators.ema() recorre las velas en Python y retiene el GIL; aquí cada
+    bloque es un producto de matrices de NumPy, que lo libera, así que varios
+    hilos pueden calcular lotes de pares a la vez. Los valores coinciden con
+    indicators.ema() salvo por el redondeo (error relativo del orden de 1e-15).
+
+    Args:
+        values (np.ndarray): Valores (vector o matriz de pares x velas)
+        span (int): Periodo de la EMA
+        block (int): Velas por bloque
+
+    Returns:
+        np.ndarray: EMA con la misma forma que `values`
+    """
+    values = np.asarray(values, dtype=float)
+    result = np.empty_like(values)
+    if values.shape[-1] == 0:
+        return result
+    result[..., 0] = values[..., 0]
+    previous = result[..., 0]
+    for start in range(1, values.shape[-1], block):
+        stop = min(start + block, values.shape[-1])
+        weights, carry = _ema_weights(span, stop - start)
+        chunk = values[..., start:stop] @ weights + previous[..., None] * carry
+        result[..., start:stop] = chunk
+        previous = chunk[..., -1]
+    return result
+
+
+def _grouped_indicators(high, low, close, groups, ema_short, ema_medium, ema_long, rsi_period):
+    """
+    Alternativa sin numba: cada grupo pedido se calcula por separado con los
+    kernels vectorizados de indicators.py y las EMAs con block_ema() (no es
+    una sola pasada, pero acepta matrices de pares x velas y casi todo el
+    tiempo transcurre en NumPy sin el GIL)
+    """
+    result = {}
+    if 'ema' in groups:
+        for name, span in (('ema_short', ema_short), ('ema_medium', ema_medium), ('ema_long', ema_long)):
+            result[name] = block_ema(close, span)
+        result['macd'] = result['ema_short'] - result['ema_medium']
+        result['macd_signal'] = block_ema(result['macd'], MACD_SIGNAL_SPAN)
+        result['macd_hist'] = result['macd'] - result['macd_signal']
+    if 'rsi' in groups:
+        result['rsi'] = rsi(close, rsi_period)
+    if 'bands' in groups:
+        result['sma20'] = rolling_mean(close, BOLLINGER_WINDOW)
+        result['stddev'] = rolling_std(close, BOLLINGER_WINDOW)
+        result['upper_band'] = result['sma20'] + (result['stddev'] * BOLLINGER_STD)
+        result['lower_band'] = result['sma20'] - (result['stddev'] * BOLLINGER_STD)
+    if 'atr' in groups:
+        result['tr'] = true_range(high, low, close)
+        result['atr'] = rolling_mean(result['tr'], ATR_WINDOW)
+    return result
+
+
+def fused_indicators(high, low, close, ema_short=9, ema_medium=21, ema_long=55, rsi_period=14,
+                     columns=None, use_jit=None):
+    """
+    Indicadores de la estrategia Peceto en una sola pasada compilada
+
+    Con numba instalado, las EMAs, RSI, MACD, Bollinger y ATR pedidos se
+    calculan en un único recorrido de las velas sin la sobrecarga de pandas
+    por llamada (con matrices de pares x velas, fila por fila). Sin numba no
+    hay una sola pasada: cada grupo pedido se calcula por separado con los
+    kernels de NumPy de indicators.py y block_ema(). Los dos caminos liberan
+    el GIL casi todo el tiempo, así que admiten lotes en hilos paralelos. En
+    los dos casos se omiten los grupos de FUSED_GROUPS sin columnas pedidas.
+
+    Args:
+        high (np.ndarray): Máximos
+        low (np.ndarray): Mínimos
+        close (np.ndarray): Cierres
+        ema_short (int): Periodo para EMA corta
+        ema_medium (int): Periodo para EMA media
+        ema_long (int): Periodo para EMA larga
+        rsi_period (int): Periodo para RSI
+        columns (iterable): Columnas de FUSED_COLUMNS a devolver (por defecto, todas)
+        use_jit (bool): Forzar (True) o evitar (False) el kernel compilado;
+            por defecto se usa si numba está disponible
+
+    Returns:
+        dict: Columnas pedidas (mismos nombres que calculate_indicators)
+    """
+    columns = FUSED_COLUMNS if columns is None else tuple(columns)
+    unknown = set(columns) - set(FUSED_COLUMNS)
+    if unknown:
+        raise KeyError(f"Columnas que no calcula el kernel: {sorted(unknown)}")
+    groups = {group for group, names in FUSED_GROUPS.items() if any(name in columns for name in names)}
+    use_jit = NUMBA_AVAILABLE if use_jit is None else use_jit
+    if use_jit and not NUMBA_AVAILABLE:
+        raise RuntimeError("numba no está instalado: no hay kernel compilado disponible")
+
+    high = np.ascontiguousarray(high, dtype=float)
+    low = np.ascontiguousarray(low, dtype=float)
+    close = np.ascontiguousarray(close, dtype=float)
+    if not use_jit:
+        values = _grouped_indicators(high, low, close, groups, ema_short, ema_medium, ema_long, rsi_period)
+        return {name: values[name] for name in columns}
+
+    # Con matrices de pares x velas el kernel recorre cada fila por separado
+    rows = close.reshape(-1, close.shape[-1])
+    out = np.empty((len(FUSED_COLUMNS),) + rows.shape)
+    for row, (row_high, row_low, row_close) in enumerate(zip(high.reshape(rows.shape), low.reshape(rows.shape), rows)):
+        _fused_kernel(row_high, row_low, row_close, ema_short, ema_medium, ema_long, rsi_period,
+                      MACD_SIGNAL_SPAN, BOLLINGER_WINDOW, BOLLINGER_STD, ATR_WINDOW,
+                      'ema' in groups, 'rsi' in groups, 'bands' in groups, 'atr' in groups,
+                      out[:, row])
+    return {name: out[FUSED_COLUMNS.index(name)].reshape(close.shape) for name in columns}
+
+
+def validate(high, low, close, rtol=1e-9, atol=1e-9, **params):
+    """
+    Compara los kernels con el cálculo de pandas del registro de indicadores
+
+    Args:
+        high (np.ndarray): Máximos
+        low (np.ndarray): Mínimos
+        close (np.ndarray): Cierres
+        rtol (float): Tolerancia relativa
+        atol (float): Tolerancia absoluta
+        **params: Periodos de EMAs y RSI
+
+    Returns:
+        dict: Máxima diferencia absoluta por columna y backend, y si todas están dentro de la tolerancia
+    """
+    from indicator_registry import indicator_registry
+
+    expected = indicator_registry.compute({'high': high, 'low': low, 'close': close}, FUSED_COLUMNS, params)
+    backends = {'numpy': False}
+    if NUMBA_AVAILABLE:
+        backends['numba'] = True
+
+    report, passed = {}, True
+    for backend, use_jit in backends.items():
+        values = fused_indicators(high, low, close, use_jit=use_jit, **params)
+        for name in FUSED_COLUMNS:
+            both = ~(np.isnan(expected[name]) & np.isnan(values[name]))
+            diff = np.abs(expected[name][both] - values[name][both])
+            report[(backend, name)] = float(np.max(diff)) if diff.size else 0.0
+            passed &= bool(np.allclose(values[name], expected[name], rtol=rtol, atol=atol, equal_nan=True))
+    return {'max_diff': report, 'passed': passed}
+
+
+if __name__ == "__main__":
+    from candle_store import CandleStore
+    from indicator_registry import indicator_registry
+
+    parser = argparse.ArgumentParser(description="Valida y mide los kernels de indicadores contra pandas")
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--data-dir', default='data/klines', help="Directorio del almacenamiento local de velas")
+    parser.add_argument('--rows', type=int, default=200, help="Velas por cálculo (como get_historical_klines)")
+    parser.add_argument('--repeat', type=int, default=1000, help="Cálculos a medir por backend")
+    args = parser.parse_args()
+
+    candles = CandleStore(args.data_dir).load(args.symbol, args.interval)
+    high, low, close = (candles[field].astype(float) for field in ('high', 'low', 'close'))
+    result = validate(high, low, close)
+    print(f"Validación contra pandas sobre {len(close)} velas: {'OK' if result['passed'] else 'FALLÓ'}")
+    print(tabulate(
+        [[backend, name, f"{diff:.3e}"] for (backend, name), diff in result['max_diff'].items()],
+        headers=["Backend", "Columna", "Máx. diferencia"],
+        tablefmt="grid"
+    ))
+
+    window = {'high': high[-args.rows:], 'low': low[-args.rows:], 'close': close[-args.rows:]}
+    runners = {'pandas': lambda: indicator_registry.compute(window, FUSED_COLUMNS)}
+    runners['numpy'] = lambda: fused_indicators(window['high'], window['low'], window['close'], use_jit=False)
+    if NUMBA_AVAILABLE:
+        fused_indicators(window['high'], window['low'], window['close'], use_jit=True)  # compilación
+        runners['numba'] = lambda: fused_indicators(window['high'], window['low'], window['close'], use_jit=True)
+    rows = []
+    for backend, run in runners.items():
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            run()
+        rows.append([backend, f"{(time.perf_counter() - started) / args.repeat * 1e6:.0f}"])
+    print(tabulate(rows, headers=["Backend", f"µs por cálculo ({args.rows} velas)"], tablefmt="grid"))
@@ -0,0 +1,313 @@
+import numpy as np
+import pandas as pd
+from indicator_cache import fingerprint
+from indicator_kernels import FUSED_COLUMNS, NUMBA_AVAILABLE, fused_indicators
+from indicators import ATR_WINDOW, BOLLINGER_STD, BOLLINGER_WINDOW, MACD_SIGNAL_SPAN
+
+# Columnas de velas que pueden usarse como entrada de un indicador
+BASE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Parámetros por defecto de los indicadores de la estrategia Peceto
+DEFAULT_INDICATOR_PARAMS = {
+    'ema_short': 9,
+    'ema_medium': 21,
+    'ema_long': 55,
+    'rsi_period': 14,
+    'macd_signal_span': MACD_SIGNAL_SPAN,
+    'bollinger_window': BOLLINGER_WINDOW,
+    'bollinger_std': BOLLINGER_STD,
+    'atr_window': ATR_WINDOW,
+}
+
+# Parámetros que el kernel fusionado tiene fijos (ver indicators.py)
+FUSED_FIXED_PARAMS = ('macd_signal_span', 'bollinger_window', 'bollinger_std', 'atr_window')
+
+# Backends de cálculo: 'pandas' (un indicador a la vez), 'fused' (fused_indicators:
+# una sola pasada compilada con numba; sin numba, kernels de NumPy por grupo)
+# y 'auto' (fused solo si hay numba)
+BACKENDS = ('pandas', 'fused', 'auto')
+
+# Columnas que lee cada condición de check_buy_signal/check_sell_signal
+CONDITION_INPUTS = {
+    'ema_cross_up': ('ema_short', 'ema_medium'),
+    'price_above_long_ema': ('close', 'ema_long'),
+    'rsi_oversold_exit': ('rsi',),
+    'macd_cross_up': ('macd', 'macd_signal'),
+    'near_support': ('close', 'lower_band'),
+    'ema_cross_down': ('ema_short', 'ema_medium'),
+    'price_below_long_ema': ('close', 'ema_long'),
+    'rsi_overbought_entry': ('rsi',),
+    'macd_cross_down': ('macd', 'macd_signal'),
+    'near_resistance': ('close', 'upper_band'),
+}
+
+# Columnas que dibujan los gráficos (TradingChart y ChartRenderer)
+CHART_COLUMNS = (
+    'ema_short', 'ema_medium', 'ema_long', 'upper_band', 'lower_band',
+    'rsi', 'macd', 'macd_signal', 'macd_hist',
+)
+
+
+class Indicator:
+    def __init__(self, name, inputs, params=(), compute=None, kind=None):
+        """
+        Declaración de un indicador: de qué columnas depende y cómo se calcula
+
+        Args:
+            name (str): Nombre de la columna resultante
+            inputs (tuple): Columnas de velas o nombres de otros indicadores
+            params (tuple): Nombres de los parámetros que recibe compute
+            compute (callable): compute(*inputs, *params) -> np.ndarray
+            kind (str): Identidad del cálculo (por defecto name); dos indicadores del
+                mismo tipo, entradas y parámetros comparten resultado en el caché
+        """
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.params = tuple(params)
+        self.compute = compute
+        self.kind = kind or name
+
+
+class IndicatorRegistry:
+    def __init__(self):
+        """
+        Registro de indicadores y resolución de dependencias
+
+        Para un conjunto de columnas pedidas se calcula solo el subgrafo de
+        indicadores necesario, en orden de dependencias. Los intermedios que
+        no se pidieron quedan en buffers temporales y no llegan al DataFrame.
+        """
+        self._indicators = {}
+
+    def register(self, name, inputs, params=(), kind=None):
+        """
+        Decorador para registrar la función de cálculo de un indicador
+
+        Ejemplo:
+            @indicator_registry.register('vwap', inputs=('close', 'volume'))
+            def vwap(close, volume): ...
+        """
+        def decorator(compute):
+            self.add(Indicator(name, inputs, params, compute, kind))
+            return compute
+        return decorator
+
+    def add(self, indicator):
+        for source in indicator.inputs:
+            if source not in BASE_COLUMNS and source not in self._indicators:
+                raise ValueError(f"Entrada desconocida '{source}' para el indicador '{indicator.name}'")
+        self._indicators[indicator.name] = indicator
+
+    def names(self):
+        return list(self._indicators)
+
+    def __contains__(self, name):
+        return name in self._indicators
+
+    def resolve(self, targets):
+        """
+        Indicadores necesarios para calcular las columnas pedidas
+
+        Args:
+            targets (iterable): Nombres de columnas (se ignoran las columnas de velas)
+
+        Returns:
+            list: Indicadores del subgrafo mínimo, cada uno después de sus entradas
+        """
+        order, visited = [], set()
+
+        def visit(name):
+            if name in visited or name in BASE_COLUMNS:
+                return
+            if name not in self._indicators:
+                raise KeyError(f"Indicador no registrado: {name}")
+            visited.add(name)
+            indicator = self._indicators[name]
+            for source in indicator.inputs:
+                visit(source)
+            order.append(indicator)
+
+        for target in targets:
+            visit(target)
+        return order
+
+    def compute(self, data, targets, params=None, cache=None, backend='pandas'):
+        """
+        Calcula las columnas pedidas y solo sus dependencias
+
+        Args:
+            data (pd.DataFrame | dict): Velas con las columnas de BASE_COLUMNS necesarias
+            targets (iterable): Columnas a devolver
+            params (dict): Parámetros de los indicadores (ver DEFAULT_INDICATOR_PARAMS)
+            cache (IndicatorCache): Caché opcional de series
+            backend (str): Uno de BACKENDS; con 'fused' las columnas necesarias de
+                FUSED_COLUMNS salen de fused_indicators() y el resto del registro se calcula encima
+                (si se cambian los parámetros de FUSED_FIXED_PARAMS se usa pandas)
+
+        Returns:
+            dict: Arreglo por columna pedida (los intermedios no se devuelven)
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend de indicadores no soportado: {backend}")
+        if backend == 'auto':
+            backend = 'fused' if NUMBA_AVAILABLE else 'pandas'
+        targets = list(targets)
+        params = {**DEFAULT_INDICATOR_PARAMS, **(params or {})}
+        order = self.resolve(targets)
+
+        # Buffers temporales: columnas de velas e indicadores intermedios
+        scratch, signatures, bases = {}, {}, {}
+        # El kernel fusionado solo sirve con los parámetros fijos de la estrategia
+        fused_columns = tuple(indicator.name for indicator in order if indicator.name in FUSED_COLUMNS)
+        fused = (backend == 'fused' and fused_columns
+                 and all(params[name] == DEFAULT_INDICATOR_PARAMS[name] for name in FUSED_FIXED_PARAMS))
+        sources = {source for indicator in order for source in indicator.inputs}
+        sources.update(targets)
+        if fused:
+            sources.update(('high', 'low', 'close'))
+        for source in BASE_COLUMNS:
+            if source in sources:
+                scratch[source] = np.asarray(data[source], dtype=float)
+                signatures[source] = source
+                bases[source] = frozenset((source,))
+
+        fingerprints = {}
+
+        def cached(columns, signature, compute):
+            if cache is None:
+                return compute()
+            for column in columns:
+                if column not in fingerprints:
+                    fingerprints[column] = fingerprint(scratch[column])
+            series_key = tuple(fingerprints[column] for column in sorted(columns))
+            return cache.get((series_key, signature), compute)
+
+        if fused:
+            # Las columnas necesarias en una pasada; firma propia para no mezclar en el caché
+            # resultados de backends distintos (coinciden solo dentro de la tolerancia)
+            kernel_params = {name: params[name] for name in ('ema_short', 'ema_medium', 'ema_long', 'rsi_period')}
+            signature = ('fused', tuple(kernel_params.values()))
+            def compute_fused():
+                values = fused_indicators(scratch['high'], scratch['low'], scratch['close'],
+                                          columns=fused_columns, **kernel_params)
+                return tuple(values[name] for name in fused_columns)
+
+            values = cached(('high', 'low', 'close'), signature + (fused_columns,), compute_fused)
+            for name, value in zip(fused_columns, values):
+                scratch[name] = value
+                signatures[name] = (signature, name)
+                bases[name] = frozenset(('high', 'low', 'close'))
+
+        for indicator in order:
+            if indicator.name in scratch:
+                continue
+            args = [scratch[source] for source in indicator.inputs]
+            values = tuple(params[name] for name in indicator.params)
+            # La firma identifica el cálculo completo: tipo, parámetros y firmas de las entradas
+            signatures[indicator.name] = (indicator.kind, values, tuple(signatures[s] for s in indicator.inputs))
+            bases[indicator.name] = frozenset().union(*(bases[s] for s in indicator.inputs))
+            scratch[indicator.name] = cached(
+                bases[indicator.name], signatures[indicator.name],
+                lambda: indicator.compute(*args, *values)
+            )
+
+        return {name: scratch[name] for name in targets if name in scratch}
+
+
+def indicator_columns():
+    """
+    Todas las columnas de indicadores en orden de registro
+
+    Se consulta al registro en cada llamada, así que incluye los indicadores
+    registrados después de importar este módulo.
+
+    Returns:
+        list: Nombres de las columnas
+    """
+    return indicator_registry.names()
+
+
+def required_columns(conditions=None, chart=False):
+    """
+    Columnas de indicadores que necesitan las condiciones activas (y el gráfico)
+
+    Args:
+        conditions (iterable): Nombres de condiciones (por defecto, todas las de CONDITION_INPUTS)
+        chart (bool): Si es True, agrega las columnas que dibujan los gráficos
+
+    Returns:
+        list: Columnas de indicadores sin repetir, en orden de registro
+    """
+    conditions = CONDITION_INPUTS if conditions is None else conditions
+    needed = {column for condition in conditions for column in CONDITION_INPUTS[condition]}
+    if chart:
+        needed.update(CHART_COLUMNS)
+    return [name for name in indicator_columns() if name in needed]
+
+
+def _ewm_mean(values, span):
+    return pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def _rolling_mean(values, window):
+    return pd.Series(values).rolling(window=window).mean().to_numpy()
+
+
+# Indicadores de la estrategia Peceto (mismos cálculos que calculate_indicators)
+indicator_registry = IndicatorRegistry()
+indicator_registry.add(Indicator('ema_short', ('close',), ('ema_short',), _ewm_mean, kind='ema'))
+indicator_registry.add(Indicator('ema_medium', ('close',), ('ema_medium',), _ewm_mean, kind='ema'))
+indicator_registry.add(Indicator('ema_long', ('close',), ('ema_long',), _ewm_mean, kind='ema'))
+
+
+@indicator_registry.register('rsi', inputs=('close',), params=('rsi_period',))
+def _rsi(close, period):
+    delta = pd.Series(close).diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+
+    avg_gain = gain.rolling(window=period).mean()
+    avg_loss = loss.rolling(window=period).mean()
+
+    rs = avg_gain / avg_loss
+    return (100 - (100 / (1 + rs))).to_numpy()
+
+
+@indicator_registry.register('macd', inputs=('ema_short', 'ema_medium'))
+def _macd(ema_short, ema_medium):
+    return ema_short - ema_medium
+
+
+indicator_registry.add(Indicator('macd_signal', ('macd',), ('macd_signal_span',), _ewm_mean, kind='ema'))
+
+
+@indicator_registry.register('macd_hist', inputs=('macd', 'macd_signal'))
+def _macd_hist(macd, macd_signal):
+    return macd - macd_signal
+
+
+indicator_registry.add(Indicator('sma20', ('close',), ('bollinger_window',), _rolling_mean, kind='sma'))
+
+
+@indicator_registry.register('stddev', inputs=('close',), params=('bollinger_window',))
+def _stddev(close, window):
+    return pd.Series(close).rolling(window=window).std().to_numpy()
+
+
+@indicator_registry.register('upper_band', inputs=('sma20', 'stddev'), params=('bollinger_std',))
+def _upper_band(sma, stddev, width):
+    return sma + (stddev * width)
+
+
+@indicator_registry.register('lower_band', inputs=('sma20', 'stddev'), params=('bollinger_std',))
+def _lower_band(sma, stddev, width):
+    return sma - (stddev * width)
+
+
+@indicator_registry.register('tr', inputs=('high', 'low', 'close'))
+def _true_range(high, low, close):
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    return np.maximum(np.maximum(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+indicator_registry.add(Indicator('atr', ('tr',), ('atr_window',), _rolling_mean, kind='sma'))
@@ -0,0 +1,232 @@
+import numpy as np
+
+# Parámetros fijos de la estrategia Peceto (ver PecetoPredictor.calculate_indicators)
+MACD_SIGNAL_SPAN = 9
+BOLLINGER_WINDOW = 20
+BOLLINGER_STD = 2
+ATR_WINDOW = 14
+
+
+def ema(values, span, seed=None):
+    """
+    Media móvil exponencial equivalente a pandas ewm(span, adjust=False).mean()
+
+    Opera sobre el último eje, por lo que acepta una serie o una matriz
+    (símbolos x velas).
+
+    Args:
+        values (np.ndarray): Valores de entrada
+        span (int): Periodo de la EMA
+        seed (float | np.ndarray): Último valor de la EMA del bloque anterior
+            (None si la serie empieza en values[..., 0])
+
+    Returns:
+        np.ndarray: EMA con la misma forma que values
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.empty_like(values)
+    if values.shape[-1] == 0:
+        return out
+
+    alpha = 2.0 / (span + 1.0)
+    old_weight = 1.0 - alpha
+    # Misma fórmula que la implementación de pandas
+    divisor = old_weight + alpha
+
+    # La recurrencia avanza vela a vela: con el tiempo en el primer eje cada
+    # paso opera sobre memoria contigua (todas las series a la vez)
+    steps = np.ascontiguousarray(np.moveaxis(values, -1, 0))
+    result = np.empty_like(steps)
+    if seed is None:
+        result[0] = steps[0]
+    else:
+        result[0] = (old_weight * seed + alpha * steps[0]) / divisor
+    for i in range(1, len(steps)):
+        result[i] = (old_weight * result[i - 1] + alpha * steps[i]) / divisor
+    out[...] = np.moveaxis(result, 0, -1)
+    return out
+
+
+def rolling_sum(values, window):
+    """
+    Suma móvil sobre el último eje (NaN hasta completar la ventana)
+
+    Cada ventana se suma en el mismo orden sin importar dónde empiece el
+    arreglo, por lo que procesar por bloques da resultados idénticos.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    count = values.shape[-1] - window + 1
+    if count <= 0:
+        return out
+    total = values[..., 0:count].copy()
+    for offset in range(1, window):
+        total += values[..., offset:offset + count]
+    out[..., window - 1:] = total
+    return out
+
+
+def rolling_mean(values, window):
+    """
+    Media móvil simple, equivalente a pandas rolling(window).mean()
+    """
+    return rolling_sum(values, window) / window
+
+
+def rolling_std(values, window):
+    """
+    Desvío estándar móvil muestral, equivalente a pandas rolling(window).std()
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    count = values.shape[-1] - window + 1
+    if count <= 0:
+        return out
+    mean = rolling_mean(values, window)[..., window - 1:]
+    total = np.zeros(mean.shape)
+    for offset in range(window):
+        total += (values[..., offset:offset + count] - mean) ** 2
+    out[..., window - 1:] = np.sqrt(total / (window - 1))
+    return out
+
+
+def shift(values, first=np.nan):
+    """
+    Desplaza una posición hacia adelante sobre el último eje
+
+    Args:
+        values (np.ndarray): Valores de entrada
+        first (float | np.ndarray): Valor para la primera posición
+
+    Returns:
+        np.ndarray: values[..., i - 1] en la posición i
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.empty_like(values)
+    if values.shape[-1] == 0:
+        return out
+    out[..., 0] = first
+    out[..., 1:] = values[..., :-1]
+    return out
+
+
+def rsi(close, period):
+    """
+    RSI con medias simples de ganancias y pérdidas, como calculate_indicators
+
+    Args:
+        close (np.ndarray): Precios de cierre
+        period (int): Periodo del RSI
+
+    Returns:
+        np.ndarray: RSI (NaN hasta completar el periodo)
+    """
+    delta = np.diff(close, axis=-1, prepend=np.nan)
+    # Como pandas where(): el NaN inicial se reemplaza por 0
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = -np.where(delta < 0, delta, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = rolling_mean(gain, period) / rolling_mean(loss, period)
+        return 100 - (100 / (1 + rs))
+
+
+def true_range(high, low, close):
+    """
+    Rango verdadero (NaN en la primera vela, como calculate_indicators)
+    """
+    prev_close = shift(close)
+    return np.maximum(
+        np.maximum(high - low, np.abs(high - prev_close)),
+        np.abs(low - prev_close)
+    )
+
+
+class IndicatorStream:
+    def __init__(self, ema_short=9, ema_medium=21, ema_long=55, rsi_period=14):
+        """
+        Calcula los indicadores de la estrategia Peceto bloque a bloque.
+
+        Conserva entre bloques el último valor de cada EMA y las últimas velas
+        necesarias para las ventanas móviles, de modo que procesar una serie
+        por partes produce exactamente los mismos valores que procesarla
+        entera.
+
+        Args:
+            ema_short (int): Periodo para EMA corta
+            ema_medium (int): Periodo para EMA media
+            ema_long (int): Periodo para EMA larga
+            rsi_period (int): Periodo para RSI
+        """
+        self.ema_short = ema_short
+        self.ema_medium = ema_medium
+        self.ema_long = ema_long
+        self.rsi_period = rsi_period
+        # Velas previas necesarias para completar las ventanas del bloque siguiente
+        self.tail_size = max(rsi_period + 1, BOLLINGER_WINDOW, ATR_WINDOW + 1)
+        self.reset()
+
+    def reset(self):
+        self._ema_seeds = {'ema_short': None, 'ema_medium': None, 'ema_long': None, 'macd_signal': None}
+        self._tail = None
+
+    def update(self, high, low, close):
+        """
+        Procesa el siguiente bloque de velas
+
+        Args:
+            high (np.ndarray): Máximos del bloque
+            low (np.ndarray): Mínimos del bloque
+            close (np.ndarray): Cierres del bloque
+
+        Returns:
+            dict: Columnas de indicadores del bloque (mismos nombres que calculate_indicators)
+        """
+        high = np.asarray(high, dtype=float)
+        low = np.asarray(low, dtype=float)
+        close = np.asarray(close, dtype=float)
+        result = {}
+
+        # EMAs y MACD: recurrencias que solo necesitan el último valor
+        for name, span in (('ema_short', self.ema_short), ('ema_medium', self.ema_medium), ('ema_long', self.ema_long)):
+            result[name] = ema(close, span, self._ema_seeds[name])
+        result['macd'] = result['ema_short'] - result['ema_medium']
+        result['macd_signal'] = ema(result['macd'], MACD_SIGNAL_SPAN, self._ema_seeds['macd_signal'])
+        result['macd_hist'] = result['macd'] - result['macd_signal']
+
+        # Ventanas móviles: se calculan sobre las velas previas más el bloque
+        if self._tail is None:
+            full_high, full_low, full_close = high, low, close
+        else:
+            full_high = np.concatenate([self._tail[0], high], axis=-1)
+            full_low = np.concatenate([self._tail[1], low], axis=-1)
+            full_close = np.concatenate([self._tail[2], close], axis=-1)
+        start = full_close.shape[-1] - close.shape[-1]
+
+        result['rsi'] = rsi(full_close, self.rsi_period)[..., start:]
+        result['sma20'] = rolling_mean(full_close, BOLLINGER_WINDOW)[..., start:]
+        result['stddev'] = rolling_std(full_close, BOLLINGER_WINDOW)[..., start:]
+        result['upper_band'] = result['sma20'] + (result['stddev'] * BOLLINGER_STD)
+        result['lower_band'] = result['sma20'] - (result['stddev'] * BOLLINGER_STD)
+        full_tr = true_range(full_high, full_low, full_close)
+        result['tr'] = full_tr[..., start:]
+        result['atr'] = rolling_mean(full_tr, ATR_WINDOW)[..., start:]
+
+        if close.shape[-1]:
+            for name in self._ema_seeds:
+                self._ema_seeds[name] = result[name][..., -1].copy()
+            self._tail = (
+                full_high[..., -self.tail_size:].copy(),
+                full_low[..., -self.tail_size:].copy(),
+                full_close[..., -self.tail_size:].copy(),
+            )
+        return result
+
+
+def compute_indicators(high, low, close, ema_short=9, ema_medium=21, ema_long=55, rsi_period=14):
+    """
+    Calcula todos los indicadores de la estrategia Peceto sobre series completas
+
+    Returns:
+        dict: Columnas de indicadores (mismos nombres que calculate_indicators)
+    """
+    return IndicatorStream(ema_short, ema_medium, ema_long, rsi_period).update(high, low, close)
@@ -0,0 +1,229 @@
+import argparse
+import contextlib
+import glob
+import logging
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+from candle_store import KLINE_COLUMNS, KLINE_DTYPE, CandleStore, interval_to_ms
+
+logger = logging.getLogger(__name__)
+
+# Nombre de los archivos de data.binance.vision: BTCUSDT-1m-2024-01.zip o BTCUSDT-1m-2024-01-15.zip
+ARCHIVE_PATTERN = re.compile(r'^(?P<symbol>[A-Z0-9]+)-(?P<interval>\d+[smhdwM])-(?P<period>\d{4}-\d{2}(?:-\d{2})?)\.(?:zip|csv)$')
+
+# Tipos de las 11 primeras columnas (la última, 'ignore', no se lee)
+CSV_DTYPES = {position: KLINE_DTYPE[name] for position, name in enumerate(KLINE_DTYPE.names)}
+
+
+def parse_archive_name(path):
+    """
+    Obtiene par, intervalo y período del nombre de un archivo de Binance
+
+    Args:
+        path (str): Ruta del archivo
+
+    Returns:
+        tuple: (symbol, interval, period), o None si el nombre no sigue el formato
+    """
+    match = ARCHIVE_PATTERN.match(os.path.basename(path))
+    if match is None:
+        return None
+    return match.group('symbol'), match.group('interval'), match.group('period')
+
+
+@contextlib.contextmanager
+def _open_csv(path):
+    # El CSV se lee directo desde el zip, sin extraerlo al disco; al salir se
+    # cierran el CSV y el zip
+    if not path.endswith('.zip'):
+        with open(path, 'rb') as source:
+            yield source
+        return
+    with zipfile.ZipFile(path) as archive:
+        names = [name for name in archive.namelist() if name.endswith('.csv')]
+        if len(names) != 1:
+            raise ValueError(f"{path} debe contener un único CSV (tiene {len(names)})")
+        with archive.open(names[0]) as source:
+            yield source
+
+
+def read_archive(path, chunk_rows=100_000):
+    """
+    Lee un archivo de velas de Binance (CSV o zip) por bloques
+
+    Los archivos pueden traer cabecera o no, y desde 2025 los de contado
+    traen los tiempos en microsegundos; ambos casos se normalizan.
+
+    Args:
+        path (str): Archivo .zip o .csv de data.binance.vision
+        chunk_rows (int): Filas por bloque de lectura
+
+    Returns:
+        np.ndarray: Registros KLINE_DTYPE en el orden del archivo
+    """
+    with _open_csv(path) as source:
+        # Los archivos más nuevos traen cabecera: se detecta por el primer carácter
+        header = None if source.peek(1)[:1].isdigit() else 0
+        chunks = []
+        # round_trip: mismos floats que float() sobre el texto, como klines_to_array
+        reader = pd.read_csv(source, header=header, names=range(len(KLINE_COLUMNS)),
+                             usecols=range(len(KLINE_DTYPE.names)), dtype=CSV_DTYPES,
+                             float_precision='round_trip', chunksize=chunk_rows)
+        for frame in reader:
+            chunk = np.empty(len(frame), dtype=KLINE_DTYPE)
+            for position, name in enumerate(KLINE_DTYPE.names):
+                chunk[name] = frame[position].to_numpy()
+            chunks.append(chunk)
+
+    array = np.concatenate(chunks) if chunks else np.empty(0, dtype=KLINE_DTYPE)
+    # Tiempos en microsegundos: una marca en ms no supera 10**14 hasta el año 5138
+    micro = array['open_time'] > 10**14
+    if micro.any():
+        array['open_time'][micro] //= 1000
+        array['close_time'][micro] //= 1000
+    return array
+
+
+def check_continuity(array, interval, previous=None):
+    """
+    Busca huecos y velas inconsistentes en un bloque de velas ordenado
+
+    Args:
+        array (np.ndarray): Registros KLINE_DTYPE ordenados y sin repetidos
+        interval (str): Intervalo esperado
+        previous (int): open_time de la última vela anterior al bloque (opcional)
+
+    Returns:
+        dict: Huecos como (inicio, velas faltantes) e índices de velas con close_time inconsistente
+    """
+    step = interval_to_ms(interval)
+    open_times = array['open_time']
+    if previous is not None:
+        open_times = np.concatenate(([previous], open_times))
+    diffs = np.diff(open_times)
+    gaps = np.flatnonzero(diffs > step)
+    return {
+        'gaps': [(int(open_times[index]) + step, int(diffs[index] // step) - 1) for index in gaps],
+        'bad_close': np.flatnonzero(array['close_time'] != array['open_time'] + step - 1),
+    }
+
+
+def _read_task(path):
+    return path, read_archive(path)
+
+
+def import_archives(paths, store, workers=None):
+    """
+    Importa archivos de velas de Binance al almacenamiento local
+
+    Los archivos se leen en paralelo (un proceso por archivo) y se escriben
+    en orden por par e intervalo, validando la continuidad entre archivos.
+    Las velas repetidas o ya almacenadas se ignoran; los
+    huecos se informan pero no interrumpen la importación (Binance tiene
+    huecos reales por mantenimiento).
+
+    Args:
+        paths (list): Archivos .zip/.csv con nombres de data.binance.vision
+        store (CandleStore): Almacenamiento local de velas
+        workers (int): Procesos de lectura (por defecto, uno por núcleo)
+
+    Returns:
+        dict: Resumen por (symbol, interval): archivos, velas leídas y agregadas, huecos y rango
+    """
+    named = []
+    for path in paths:
+        parsed = parse_archive_name(path)
+        if parsed is None:
+            logger.warning(f"Archivo ignorado (nombre desconocido): {path}")
+            continue
+        named.append((parsed, path))
+    # Orden cronológico por par e intervalo (los diarios de un mes van después del mensual)
+    named.sort(key=lambda item: item[0])
+    ordered = [path for _, path in named]
+
+    workers = workers if workers is not None else os.cpu_count() or 1
+    summary = {}
+    if workers > 1 and len(ordered) > 1:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(ordered)))
+        results = executor.map(_read_task, ordered)
+    else:
+        executor = None
+        results = map(_read_task, ordered)
+
+    try:
+        for ((symbol, interval, period), _), (path, array) in zip(named, results):
+            entry = summary.setdefault((symbol, interval), {
+                'files': 0, 'rows': 0, 'added': 0, 'gaps': [], 'unordered': 0, 'bad_close': 0,
+                'first': None, 'last': store.last_open_time(symbol, interval),
+            })
+            entry['files'] += 1
+            entry['rows'] += len(array)
+            if not len(array):
+                continue
+
+            # Se ordena y se quitan repetidos y velas ya almacenadas antes de escribir
+            unordered = int(np.count_nonzero(np.diff(array['open_time']) <= 0))
+            if unordered:
+                entry['unordered'] += unordered
+                array = np.sort(array, order='open_time', kind='stable')
+                array = array[np.concatenate(([True], np.diff(array['open_time']) > 0))]
+            if entry['last'] is not None:
+                array = array[array['open_time'] > entry['last']]
+            if not len(array):
+                continue
+
+            report = check_continuity(array, interval, entry['last'])
+            entry['gaps'].extend(report['gaps'])
+            entry['bad_close'] += len(report['bad_close'])
+
+            entry['added'] += store.append(symbol, interval, array)
+            entry['first'] = int(array['open_time'][0]) if entry['first'] is None else entry['first']
+            entry['last'] = int(array['open_time'][-1])
+            logger.info(f"{os.path.basename(path)}: {len(array)} velas de {symbol} {interval} ({period})")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    for (symbol, interval), entry in summary.items():
+        for start, missing in entry['gaps']:
+            logger.warning(f"Hueco en {symbol} {interval}: faltan {missing} velas desde "
+                           f"{pd.Timestamp(start, unit='ms')}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa velas de data.binance.vision al almacenamiento local")
+    parser.add_argument('paths', nargs='+', help="Archivos .zip/.csv o directorios que los contienen")
+    parser.add_argument('--data-dir', default='data/klines', help="Directorio del almacenamiento local de velas")
+    parser.add_argument('--workers', type=int, help="Procesos de lectura (por defecto, uno por núcleo)")
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '**', '*.zip'), recursive=True)))
+            files.extend(sorted(glob.glob(os.path.join(path, '**', '*.csv'), recursive=True)))
+        else:
+            files.append(path)
+
+    started = time.perf_counter()
+    summary = import_archives(files, CandleStore(args.data_dir), args.workers)
+    elapsed = time.perf_counter() - started
+
+    print(f"{sum(entry['files'] for entry in summary.values())} archivos importados en {elapsed:.1f}s")
+    print(tabulate(
+        [[symbol, interval, entry['files'], entry['rows'], entry['added'],
+          sum(missing for _, missing in entry['gaps']), entry['unordered'], entry['bad_close'],
+          pd.Timestamp(entry['first'], unit='ms') if entry['first'] is not None else '-',
+          pd.Timestamp(entry['last'], unit='ms') if entry['last'] is not None else '-']
+         for (symbol, interval), entry in summary.items()],
+        headers=["Par", "Intervalo", "Archivos", "Velas leídas", "Agregadas", "Velas faltantes",
+                 "Fuera de orden", "close_time inválido", "Desde", "Hasta"],
+        tablefmt="grid"
+    ))
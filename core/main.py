@@ -1,15 +1,18 @@
-import time
-import numpy as np
 import pandas as pd
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
 import logging
-from datetime import datetime, timedelta
 from tabulate import tabulate
 from chart_module import TradingChart
 import telegram_send
-from alert_system import alert_system
-from webpage_capturer import webpage_capturer
+from alert_aggregator import alert_aggregator as shared_alert_aggregator
+from chart_renderer import ChartRenderer
+from cooldown_store import CooldownStore
+from signal_journal import SignalJournal
+from clock import SystemClock
+from indicator_cache import indicator_cache as shared_indicator_cache
+from indicator_registry import indicator_columns, indicator_registry, required_columns
+from strategies import PecetoStrategy
 from decouple import config
 
 # Configuración de logging
@@ -24,7 +27,9 @@ class PecetoPredictor:
     def __init__(self, api_key, api_secret, symbol='BTCUSDT', interval='15m', 
                  ema_short=9, ema_medium=21, ema_long=55, rsi_period=14, 
                  rsi_oversold=30, rsi_overbought=70, use_telegram=False, 
-                 show_chart=True):
+                 show_chart=True, attach_chart_image=True, cooldown_store=None,
+                 client=None, clock=None, alert_aggregator=None, indicator_cache=None,
+                 indicator_backend='auto', strategy=None, signal_journal=None):
         """
         Inicialización del bot de predicción con estrategia Peceto
         
@@ -41,10 +46,27 @@ class PecetoPredictor:
             rsi_overbought (int): Nivel de sobrecompra para RSI (default: 70)
             use_telegram (bool): Si es True, envía alertas por Telegram
             show_chart (bool): Si es True, muestra gráficos interactivos
+            attach_chart_image (bool): Si es True, adjunta una imagen del gráfico a cada alerta
+            cooldown_store (CooldownStore): Almacén compartido de cooldown y deduplicación;
+                si es None, el cooldown se lleva solo en memoria
+            client: Cliente con get_klines/get_symbol_ticker (por defecto, Client de Binance)
+            clock: Reloj con now/sleep (por defecto, SystemClock)
+            alert_aggregator (AlertAggregator): Destino de las alertas (por defecto, el compartido)
+            indicator_cache (IndicatorCache): Caché de series de indicadores (por defecto, el compartido)
+            indicator_backend (str): 'pandas', 'fused' (una sola pasada; compilada si numba
+                está instalado, NumPy si no) o 'auto' (fused solo con numba)
+            strategy (Strategy): Reglas de las señales (por defecto, PecetoStrategy con
+                los niveles de RSI dados)
+            signal_journal (SignalJournal): Registro persistente de las señales alertadas (opcional)
         """
         self.api_key = api_key
         self.api_secret = api_secret
-        self.client = Client(api_key, api_secret)
+        self.client = client if client is not None else Client(api_key, api_secret)
+        self.clock = clock if clock is not None else SystemClock()
+        self.alert_aggregator = alert_aggregator if alert_aggregator is not None else shared_alert_aggregator
+        self.indicator_cache = indicator_cache if indicator_cache is not None else shared_indicator_cache
+        self.indicator_backend = indicator_backend
+        self.running = False
         self.symbol = symbol
         self.interval = interval
         self.ema_short = ema_short
@@ -53,6 +75,15 @@ class PecetoPredictor:
         self.rsi_period = rsi_period
         self.rsi_oversold = rsi_oversold
         self.rsi_overbought = rsi_overbought
+        self.strategy = strategy if strategy is not None else PecetoStrategy(
+            rsi_oversold=rsi_oversold, rsi_overbought=rsi_overbought
+        )
+        self.indicator_params = {
+            'ema_short': ema_short,
+            'ema_medium': ema_medium,
+            'ema_long': ema_long,
+            'rsi_period': rsi_period,
+        }
         self.use_telegram = use_telegram
         self.last_signal = None
         self.signal_time = None
@@ -62,6 +93,10 @@ class PecetoPredictor:
         self.last_buy_alert = None
         self.last_sell_alert = None
         self.cooldown_hours = 2  # Horas de espera entre alertas del mismo tipo
+        self.cooldown_store = cooldown_store
+        self.signal_journal = signal_journal
+        if signal_journal is not None:
+            signal_journal.check_strategy(self.strategy.name)
         
         # Inicializar módulo de gráficos
         if self.show_chart:
@@ -71,6 +106,26 @@ class PecetoPredictor:
         else:
             self.chart = None
         
+        # Renderizador de imágenes del gráfico para las alertas (sin navegador)
+        self.attach_chart_image = attach_chart_image
+        if self.attach_chart_image:
+            self.chart_renderer = ChartRenderer(
+                symbol=symbol,
+                interval=interval,
+                rsi_oversold=rsi_oversold,
+                rsi_overbought=rsi_overbought
+            )
+        else:
+            self.chart_renderer = None
+        
+        # Columnas que leen las condiciones de la estrategia y, si hay gráficos, las que se dibujan
+        needed = set(required_columns((), chart=self.show_chart or self.attach_chart_image))
+        needed.update(self.strategy.columns)
+        self.required_columns = [name for name in indicator_columns() if name in needed]
+        
+        # Registrar el símbolo para agrupar sus alertas con las de otros predictores
+        self.alert_aggregator.register(symbol, interval)
+        
         logger.info(f"Bot de predicción inicializado para {symbol} con intervalos de {interval}")
         
     def get_historical_klines(self, limit=200):
@@ -108,55 +163,28 @@ class PecetoPredictor:
             logger.error(f"Error al obtener datos históricos: {e}")
             return None
             
-    def calculate_indicators(self, data):
+    def calculate_indicators(self, data, columns=None):
         """
         Calcula los indicadores técnicos para la estrategia Peceto
         
+        Solo se calculan las columnas pedidas y sus dependencias (ver
+        indicator_registry); los intermedios no se agregan al DataFrame.
+        El DataFrame recibido no se modifica.
+        
         Args:
             data (pd.DataFrame): DataFrame con datos históricos
+            columns (list): Columnas de indicadores a agregar (por defecto, todas)
             
         Returns:
-            pd.DataFrame: DataFrame con indicadores calculados
+            pd.DataFrame: Nuevo DataFrame con los indicadores calculados
         """
         print('Calcula los indicadores técnicos para la estrategia Peceto ... ')
-        # Calcular EMAs
-        data['ema_short'] = data['close'].ewm(span=self.ema_short, adjust=False).mean()
-        data['ema_medium'] = data['close'].ewm(span=self.ema_medium, adjust=False).mean()
-        data['ema_long'] = data['close'].ewm(span=self.ema_long, adjust=False).mean()
-        
-        # Calcular RSI
-        delta = data['close'].diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        
-        avg_gain = gain.rolling(window=self.rsi_period).mean()
-        avg_loss = loss.rolling(window=self.rsi_period).mean()
-        
-        rs = avg_gain / avg_loss
-        data['rsi'] = 100 - (100 / (1 + rs))
-        
-        # Calcular MACD
-        data['macd'] = data['ema_short'] - data['ema_medium']
-        data['macd_signal'] = data['macd'].ewm(span=9, adjust=False).mean()
-        data['macd_hist'] = data['macd'] - data['macd_signal']
-        
-        # Calcular bandas de Bollinger
-        data['sma20'] = data['close'].rolling(window=20).mean()
-        data['stddev'] = data['close'].rolling(window=20).std()
-        data['upper_band'] = data['sma20'] + (data['stddev'] * 2)
-        data['lower_band'] = data['sma20'] - (data['stddev'] * 2)
-        
-        # Calcular ATR (Average True Range)
-        data['tr'] = np.maximum(
-            np.maximum(
-                data['high'] - data['low'],
-                np.abs(data['high'] - data['close'].shift(1))
-            ),
-            np.abs(data['low'] - data['close'].shift(1))
-        )
-        data['atr'] = data['tr'].rolling(window=14).mean()
-        
-        return data
+        columns = indicator_columns() if columns is None else columns
+        # Las series ya calculadas sobre los mismos precios se toman del caché
+        values = indicator_registry.compute(data, columns, self.indicator_params, self.indicator_cache,
+                                           self.indicator_backend)
+        # Copias: las columnas del DataFrame pueden modificarse, las del caché no
+        return data.assign(**{name: values[name].copy() for name in columns})
         
     def check_buy_signal(self, data):
         """
@@ -169,58 +197,7 @@ class PecetoPredictor:
             tuple: (bool, dict) True si hay señal de compra y detalles de la señal
         """
         print('Verifica si hay señal de compra según la estrategia Peceto ... ')
-        # Obtener las últimas filas para análisis
-        last_row = data.iloc[-1]
-        prev_row = data.iloc[-2]
-        
-        # Condiciones de la estrategia Peceto para compra:
-        # 1. EMA corta cruza por encima de EMA media
-        ema_cross_up = (prev_row['ema_short'] <= prev_row['ema_medium'] and 
-                        last_row['ema_short'] > last_row['ema_medium'])
-        
-        # 2. Precio por encima de EMA larga (tendencia alcista)
-        price_above_long_ema = last_row['close'] > last_row['ema_long']
-        
-        # 3. RSI saliendo de zona de sobreventa
-        rsi_oversold_exit = (prev_row['rsi'] < self.rsi_oversold and 
-                            last_row['rsi'] >= self.rsi_oversold)
-        
-        # 4. MACD cruzando por encima de la línea de señal
-        macd_cross_up = (prev_row['macd'] <= prev_row['macd_signal'] and 
-                        last_row['macd'] > last_row['macd_signal'])
-        
-        # 5. Precio cerca del soporte (banda inferior de Bollinger)
-        near_support = last_row['close'] <= last_row['lower_band'] * 1.01
-        
-        # Señal de compra si se cumplen al menos 3 de las 5 condiciones
-        buy_conditions = [ema_cross_up, price_above_long_ema, rsi_oversold_exit, macd_cross_up, near_support]
-        buy_signals = sum(buy_conditions)
-        
-        # Crear resumen detallado de la señal
-        signal_details = {
-            "price": last_row['close'],
-            "timestamp": last_row['timestamp'],
-            "strength": buy_signals,
-            "max_strength": 5,
-            "conditions": {
-                "ema_cross_up": ema_cross_up,
-                "price_above_long_ema": price_above_long_ema,
-                "rsi_oversold_exit": rsi_oversold_exit,
-                "macd_cross_up": macd_cross_up,
-                "near_support": near_support
-            },
-            "indicators": {
-                "ema_short": last_row['ema_short'],
-                "ema_medium": last_row['ema_medium'],
-                "ema_long": last_row['ema_long'],
-                "rsi": last_row['rsi'],
-                "macd": last_row['macd'],
-                "macd_signal": last_row['macd_signal'],
-                "lower_band": last_row['lower_band']
-            }
-        }
-        
-        return buy_signals >= 3, signal_details
+        return self.strategy.check_buy_signal(data)
         
     def check_sell_signal(self, data):
         """
@@ -233,58 +210,20 @@ class PecetoPredictor:
             tuple: (bool, dict) True si hay señal de venta y detalles de la señal
         """
         print('Verifica si hay señal de venta según la estrategia Peceto ...')
-        # Obtener las últimas filas para análisis
-        last_row = data.iloc[-1]
-        prev_row = data.iloc[-2]
-        
-        # Condiciones de la estrategia Peceto para venta:
-        # 1. EMA corta cruza por debajo de EMA media
-        ema_cross_down = (prev_row['ema_short'] >= prev_row['ema_medium'] and 
-                        last_row['ema_short'] < last_row['ema_medium'])
-        
-        # 2. Precio por debajo de EMA larga (tendencia bajista)
-        price_below_long_ema = last_row['close'] < last_row['ema_long']
-        
-        # 3. RSI entrando en zona de sobrecompra
-        rsi_overbought_entry = (prev_row['rsi'] > self.rsi_overbought and 
-                                last_row['rsi'] <= self.rsi_overbought)
-        
-        # 4. MACD cruzando por debajo de la línea de señal
-        macd_cross_down = (prev_row['macd'] >= prev_row['macd_signal'] and 
-                            last_row['macd'] < last_row['macd_signal'])
-        
-        # 5. Precio cerca de la resistencia (banda superior de Bollinger)
-        near_resistance = last_row['close'] >= last_row['upper_band'] * 0.99
-        
-        # Señal de venta si se cumplen al menos 3 de las 5 condiciones
-        sell_conditions = [ema_cross_down, price_below_long_ema, rsi_overbought_entry, macd_cross_down, near_resistance]
-        sell_signals = sum(sell_conditions)
-        
-        # Crear resumen detallado de la señal
-        signal_details = {
-            "price": last_row['close'],
-            "timestamp": last_row['timestamp'],
-            "strength": sell_signals,
-            "max_strength": 5,
-            "conditions": {
-                "ema_cross_down": ema_cross_down,
-                "price_below_long_ema": price_below_long_ema,
-                "rsi_overbought_entry": rsi_overbought_entry,
-                "macd_cross_down": macd_cross_down,
-                "near_resistance": near_resistance
-            },
-            "indicators": {
-                "ema_short": last_row['ema_short'],
-                "ema_medium": last_row['ema_medium'],
-                "ema_long": last_row['ema_long'],
-                "rsi": last_row['rsi'],
-                "macd": last_row['macd'],
-                "macd_signal": last_row['macd_signal'],
-                "upper_band": last_row['upper_band']
-            }
-        }
+        return self.strategy.check_sell_signal(data)
+
+    def check_signals(self, data):
+        """
+        Verifica compra y venta en una sola pasada sobre la última vela
         
-        return sell_signals >= 3, signal_details
+        Args:
+            data (pd.DataFrame): DataFrame con indicadores
+            
+        Returns:
+            tuple: (bool, SignalRecord, bool, SignalRecord) señal y detalles de compra y de venta
+        """
+        print('Verifica si hay señales de compra y venta según la estrategia Peceto ...')
+        return self.strategy.check_signals(data)
         
     def format_signal_message(self, signal_type, details):
         """
@@ -339,7 +278,12 @@ class PecetoPredictor:
         Returns:
             bool: True si está en cooldown, False si no
         """
-        now = datetime.now()
+        now = self.clock.now()
+        
+        if self.cooldown_store is not None:
+            return self.cooldown_store.is_in_cooldown(
+                self.symbol, self.interval, signal_type, now, self.cooldown_hours * 3600
+            )
         
         if signal_type == "COMPRA" and self.last_buy_alert:
             time_diff = now - self.last_buy_alert
@@ -351,6 +295,45 @@ class PecetoPredictor:
             
         return False
 
+    def claim_alert(self, signal_type, details):
+        """
+        Verifica el cooldown y reserva el envío de una alerta
+        
+        Con un almacén compartido, la verificación y el registro son atómicos
+        entre procesos y no se repite una alerta para la misma vela.
+        
+        Args:
+            signal_type (str): Tipo de señal ("COMPRA" o "VENTA")
+            details (dict): Detalles de la señal
+            
+        Returns:
+            bool: True si la alerta debe enviarse
+        """
+        if self.cooldown_store is None:
+            return not self.is_in_cooldown(signal_type)
+        
+        return self.cooldown_store.try_acquire(
+            self.symbol, self.interval, signal_type, details['timestamp'],
+            self.clock.now(), self.cooldown_hours * 3600
+        )
+
+    def record_signal(self, signal_type, details, strategy=None):
+        """
+        Guarda una señal alertada en el registro persistente, si hay uno
+        
+        Args:
+            signal_type (str): Tipo de señal ("COMPRA" o "VENTA")
+            details (dict): Detalles de la señal
+            strategy (str): Estrategia que generó la señal
+        """
+        if self.signal_journal is None:
+            return
+        try:
+            self.signal_journal.append(self.symbol, self.interval, signal_type, details,
+                                       strategy=strategy, recorded_at=int(self.clock.time() * 1000))
+        except (OSError, ValueError) as e:
+            logger.error(f"No se pudo registrar la señal de {self.symbol}: {e}")
+
     def format_signal_details(self, details, signal_type):
         if details is None:
             return []
@@ -381,6 +364,150 @@ class PecetoPredictor:
         
         return headers, main_table, condition_headers, condition_rows
 
+    def render_chart_image(self, data, signal_type, details):
+        """
+        Genera en memoria la imagen del gráfico para adjuntarla a una alerta
+        
+        Args:
+            data (pd.DataFrame): DataFrame con indicadores
+            signal_type (str): Tipo de señal ("COMPRA" o "VENTA")
+            details (dict): Detalles de la señal que dispara la alerta
+            
+        Returns:
+            io.BytesIO: Imagen PNG, o None si no se adjuntan imágenes o falla el render
+        """
+        if not self.attach_chart_image or self.chart_renderer is None:
+            return None
+        
+        # El gráfico interactivo ya registra el historial de señales
+        if self.chart:
+            buy_signals, sell_signals = self.chart.signals()
+        else:
+            buy_signals = [details] if signal_type == "COMPRA" else []
+            sell_signals = [details] if signal_type == "VENTA" else []
+        
+        try:
+            return self.chart_renderer.render(data, buy_signals, sell_signals)
+        except Exception as e:
+            logger.error(f"Error al generar la imagen del gráfico: {e}")
+            return None
+
+    def process_signals(self, data):
+        """
+        Verifica las señales sobre datos con indicadores y procesa las alertas
+        
+        Actualiza el gráfico, prioriza la señal más fuerte, aplica el cooldown
+        y entrega las alertas al agregador.
+        
+        Args:
+            data (pd.DataFrame): DataFrame con indicadores
+            
+        Returns:
+            tuple: (bool, dict, bool, dict) señal y detalles de compra y de venta
+        """
+        # Verificar señales
+        buy_signal, buy_details, sell_signal, sell_details = self.check_signals(data)
+        
+        # Actualizar el gráfico con los nuevos datos
+        if self.show_chart and self.chart:
+            self.chart.update_data(
+                data=data,
+                buy_signal=buy_signal,
+                sell_signal=sell_signal,
+                buy_details=buy_details if buy_signal else None,
+                sell_details=sell_details if sell_signal else None
+            )
+        
+        # Priorizar la señal más fuerte si ambas están presentes
+        if buy_signal and sell_signal:
+            if buy_details['strength'] > sell_details['strength']:
+                sell_signal = False
+            else:
+                buy_signal = False
+        
+        # Procesar señal de compra
+        if buy_signal and self.claim_alert("COMPRA", buy_details):
+            message = self.format_signal_message("COMPRA", buy_details)
+            image = self.render_chart_image(data, "COMPRA", buy_details)
+            self.alert_aggregator.add(self.symbol, self.interval, "COMPRA", buy_details, message, image=image)
+            self.record_signal("COMPRA", buy_details)
+            self.last_signal = "COMPRA"
+            self.signal_time = self.clock.now()
+            self.last_buy_alert = self.clock.now()
+            
+        # Procesar señal de venta
+        elif sell_signal and self.claim_alert("VENTA", sell_details):
+            message = self.format_signal_message("VENTA", sell_details)
+            image = self.render_chart_image(data, "VENTA", sell_details)
+            self.alert_aggregator.add(self.symbol, self.interval, "VENTA", sell_details, message, image=image)
+            self.record_signal("VENTA", sell_details)
+            self.last_signal = "VENTA"
+            self.signal_time = self.clock.now()
+            self.last_sell_alert = self.clock.now()
+        
+        # Las señales de la vela se agrupan hasta que todos los símbolos la evaluaron
+        self.alert_aggregator.mark_evaluated(self.symbol, self.interval, data['timestamp'].iloc[-1])
+        
+        return buy_signal, buy_details, sell_signal, sell_details
+
+    def run_cycle(self):
+        """
+        Ejecuta un ciclo del bucle principal: datos, indicadores, señales, alertas y espera
+        """
+        # Obtener datos históricos
+        data = self.get_historical_klines()
+        if data is None:
+            logger.error("No se pudieron obtener datos históricos. Esperando 1 minuto...")
+            self.clock.sleep(60)
+            return
+            
+        # Calcular indicadores
+        data = self.calculate_indicators(data, self.required_columns)
+        
+        # Obtener precio actual
+        ticker = self.client.get_symbol_ticker(symbol=self.symbol)
+        current_price = float(ticker['price'])
+        
+        self.process_signals(data)
+        
+        # Estado actual (versión simplificada) cada ciclo
+        current_time = self.clock.now().strftime("%Y-%m-%d %H:%M:%S")
+        indicators = {
+            "price": current_price,
+            "rsi": data['rsi'].iloc[-1],
+            "macd": data['macd'].iloc[-1],
+            "signal": data['macd_signal'].iloc[-1],
+            "ema_short": data['ema_short'].iloc[-1],
+            "ema_medium": data['ema_medium'].iloc[-1],
+            "ema_long": data['ema_long'].iloc[-1]
+        }
+        
+        print(f"\r[{current_time}] Precio: {current_price:.2f} | RSI: {indicators['rsi']:.2f} | Última señal: {self.last_signal if self.last_signal else 'Ninguna'}", end="")
+        
+        # Esperar antes del siguiente ciclo (ajustar según el intervalo elegido)
+        self.clock.sleep(self.cycle_delay())
+
+    def cycle_delay(self):
+        """
+        Segundos de espera entre ciclos según el intervalo de las velas
+        """
+        if self.interval == '1m':
+            return 15
+        elif self.interval == '1s':
+            return 2
+        elif self.interval == '5m':
+            return 30
+        elif self.interval == '15m':
+            return 60
+        else:
+            return 120
+
+    def stop(self):
+        """
+        Detiene el bucle principal al terminar el ciclo en curso
+        """
+        self.running = False
+
     def run(self):
         """
         Ejecuta el bucle principal del bot de predicción
@@ -390,93 +517,14 @@ class PecetoPredictor:
         print(f"Presiona Ctrl+C para detener el bot")
         print("-"*50)
         
+        self.running = True
         try:
-            while True:
+            while self.running:
                 try:
-                    # Obtener datos históricos
-                    data = self.get_historical_klines()
-                    if data is None:
-                        logger.error("No se pudieron obtener datos históricos. Esperando 1 minuto...")
-                        time.sleep(60)
-                        continue
-                        
-                    # Calcular indicadores
-                    data = self.calculate_indicators(data)
-                    
-                    # Obtener precio actual
-                    ticker = self.client.get_symbol_ticker(symbol=self.symbol)
-                    current_price = float(ticker['price'])
-                    
-                    # webpage_capturer.capture()
-
-                    # Verificar señales
-                    buy_signal, buy_details = self.check_buy_signal(data)
-                    sell_signal, sell_details = self.check_sell_signal(data)
-                    
-                    # Actualizar el gráfico con los nuevos datos
-                    if self.show_chart and self.chart:
-                        self.chart.update_data(
-                            data=data,
-                            buy_signal=buy_signal,
-                            sell_signal=sell_signal,
-                            buy_details=buy_details if buy_signal else None,
-                            sell_details=sell_details if sell_signal else None
-                        )
-                    
-                    # Priorizar la señal más fuerte si ambas están presentes
-                    if buy_signal and sell_signal:
-                        if buy_details['strength'] > sell_details['strength']:
-                            sell_signal = False
-                        else:
-                            buy_signal = False
-                    
-                    # Procesar señal de compra
-                    if buy_signal and not self.is_in_cooldown("COMPRA"):
-                        message = self.format_signal_message("COMPRA", buy_details)
-                        alert_system.send_telegram_message(message)
-                        # alert_system.send_telegram_message('Estado de los graficos:', image_path="captura.png")
-                        self.last_signal = "COMPRA"
-                        self.signal_time = datetime.now()
-                        self.last_buy_alert = datetime.now()
-                        
-                    # Procesar señal de venta
-                    elif sell_signal and not self.is_in_cooldown("VENTA"):
-                        message = self.format_signal_message("VENTA", sell_details)
-                        alert_system.send_telegram_message(message)
-                        # alert_system.send_telegram_message('Estado de los graficos:', image_path="captura.png")
-                        self.last_signal = "VENTA"
-                        self.signal_time = datetime.now()
-                        self.last_sell_alert = datetime.now()
-                    
-                    # Estado actual (versión simplificada) cada ciclo
-                    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    indicators = {
-                        "price": current_price,
-                        "rsi": data['rsi'].iloc[-1],
-                        "macd": data['macd'].iloc[-1],
-                        "signal": data['macd_signal'].iloc[-1],
-                        "ema_short": data['ema_short'].iloc[-1],
-                        "ema_medium": data['ema_medium'].iloc[-1],
-                        "ema_long": data['ema_long'].iloc[-1]
-                    }
-                    
-                    print(f"\r[{current_time}] Precio: {current_price:.2f} | RSI: {indicators['rsi']:.2f} | Última señal: {self.last_signal if self.last_signal else 'Ninguna'}", end="")
-                    
-                    # Esperar antes del siguiente ciclo (ajustar según el intervalo elegido)
-                    if self.interval == '1m':
-                        time.sleep(15)
-                    elif self.interval == '1s':
-                        time.sleep(2)
-                    elif self.interval == '5m':
-                        time.sleep(30)
-                    elif self.interval == '15m':
-                        time.sleep(60)
-                    else:
-                        time.sleep(120)
-                        
+                    self.run_cycle()
                 except Exception as e:
                     logger.error(f"Error en el ciclo principal: {e}")
-                    time.sleep(60)
+                    self.clock.sleep(60)
                     
         except KeyboardInterrupt:
             print("\n\nBot detenido manualmente.")
@@ -493,7 +541,9 @@ if __name__ == "__main__":
         symbol='BTCUSDT',    # Par de trading
         interval='1m',      # Intervalo de tiempo
         use_telegram=True,  # Cambiar a True para recibir alertas por Telegram
-        show_chart=True     # Activar para mostrar gráficos interactivos
+        show_chart=True,    # Activar para mostrar gráficos interactivos
+        cooldown_store=CooldownStore('cooldowns.db'),  # Cooldown compartido entre procesos y reinicios
+        signal_journal=SignalJournal('data/signals')   # Registro consultable de las señales
     )
     
     predictor.run()
\ No newline at end of file
@@ -0,0 +1,478 @@
+import argparse
+import multiprocessing
+import os
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from binance.client import Client
+from decouple import config
+from candle_store import KLINE_DTYPE, array_to_klines, interval_to_ms, klines_to_array, to_frame
+from clock import SystemClock
+from main import PecetoPredictor, logger
+
+# Cabecera de cada buffer (int64): secuencia del seqlock (impar mientras se
+# escribe), velas cerradas publicadas en total, hay vela en formación,
+# capacidad del anillo y open_time de la última vela cerrada
+SEQUENCE, CLOSED, FORMING, CAPACITY, LAST_OPEN = range(5)
+HEADER_BYTES = 64
+
+
+def _block_name(name, symbol, interval):
+    return f"{name}_{symbol}_{interval}"
+
+
+def _block_size(capacity):
+    # Anillo espejado (2 x capacidad) más una vela en formación
+    return HEADER_BYTES + (2 * capacity + 1) * KLINE_DTYPE.itemsize
+
+
+class MarketDataBus:
+    def __init__(self, streams, capacity=1000, name='peceto', condition=None, create=True):
+        """
+        Velas por par e intervalo en memoria compartida entre procesos
+
+        Un único proceso de ingesta publica las velas (MarketDataFeed) y
+        cualquier cantidad de procesos las leen sin consultar la API. Cada
+        par e intervalo tiene un anillo de velas cerradas más la vela en
+        formación. El anillo está espejado (cada vela se escribe en i e
+        i + capacidad), así que las últimas N velas siempre son un bloque
+        contiguo que se lee como vista de NumPy sin copiar.
+
+        Las lecturas usan un seqlock: el escritor incrementa la secuencia
+        antes y después de escribir, y el lector reintenta si la secuencia
+        era impar o cambió mientras leía. Los procesos creados con
+        multiprocessing reciben el bus como argumento (con su Condition,
+        que los despierta en cada vela cerrada); otros procesos pueden
+        adjuntarse por nombre con MarketDataBus.attach() y consultan la
+        secuencia periódicamente.
+
+        Args:
+            streams (list): Tuplas (symbol, interval) a publicar
+            capacity (int): Velas cerradas por par e intervalo
+            name (str): Prefijo de los bloques de memoria compartida
+            condition (multiprocessing.Condition): Aviso de velas cerradas (se crea si es None)
+            create (bool): Crear los bloques (proceso de ingesta) o adjuntarse a bloques existentes
+        """
+        self.streams = [tuple(stream) for stream in streams]
+        self.name = name
+        self.owner = create
+        # Con fork los hijos heredan el bus tal cual: solo el proceso que lo creó es dueño
+        self.owner_pid = os.getpid() if create else None
+        self.condition = condition if condition is not None or not create else multiprocessing.Condition()
+        self._blocks = {}
+        self._headers = {}
+        self._rings = {}
+        self._forming = {}
+        for symbol, interval in self.streams:
+            block_name = _block_name(name, symbol, interval)
+            if create:
+                block = shared_memory.SharedMemory(block_name, create=True, size=_block_size(capacity))
+            else:
+                block = shared_memory.SharedMemory(block_name)
+                # Solo el proceso de ingesta libera los bloques al terminar (los
+                # procesos hijos comparten su resource_tracker; los demás no)
+                if multiprocessing.parent_process() is None:
+                    resource_tracker.unregister(block._name, 'shared_memory')
+            header = np.ndarray(HEADER_BYTES // 8, dtype=np.int64, buffer=block.buf)
+            if create:
+                header[:] = 0
+                header[CAPACITY] = capacity
+                header[LAST_OPEN] = -1
+            size = int(header[CAPACITY])
+            records = np.ndarray(2 * size + 1, dtype=KLINE_DTYPE, buffer=block.buf, offset=HEADER_BYTES)
+            self._blocks[(symbol, interval)] = block
+            self._headers[(symbol, interval)] = header
+            self._rings[(symbol, interval)] = records[:2 * size]
+            self._forming[(symbol, interval)] = records[2 * size:]
+        self.capacity = int(next(iter(self._headers.values()))[CAPACITY]) if self.streams else capacity
+
+    @classmethod
+    def attach(cls, streams, name='peceto', condition=None):
+        """
+        Se adjunta a los buffers creados por el proceso de ingesta
+
+        Returns:
+            MarketDataBus: Bus de solo lectura
+        """
+        return cls(streams, name=name, condition=condition, create=False)
+
+    def __reduce__(self):
+        # Los procesos hijos se adjuntan a los mismos bloques en lugar de copiarlos
+        return self.__class__.attach, (self.streams, self.name, self.condition)
+
+    def publish(self, symbol, interval, closed, forming=None):
+        """
+        Publica velas cerradas nuevas y la vela en formación de un par
+
+        Las velas cerradas ya publicadas se ignoran. Si hubo velas cerradas
+        nuevas se despierta a los consumidores.
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo
+            closed (np.ndarray): Velas cerradas (KLINE_DTYPE) ordenadas por open_time
+            forming (np.ndarray): Vela en formación (0 o 1 registro)
+
+        Returns:
+            int: Cantidad de velas cerradas nuevas
+        """
+        key = (symbol, interval)
+        header, ring = self._headers[key], self._rings[key]
+        if int(header[LAST_OPEN]) >= 0:
+            closed = closed[closed['open_time'] > header[LAST_OPEN]]
+        closed = closed[-self.capacity:]
+        added = len(closed)
+
+        header[SEQUENCE] += 1
+        if added:
+            slots = (int(header[CLOSED]) + np.arange(added)) % self.capacity
+            ring[slots] = closed
+            ring[slots + self.capacity] = closed
+            header[CLOSED] += added
+            header[LAST_OPEN] = closed['open_time'][-1]
+        if forming is not None and len(forming):
+            self._forming[key][0] = forming[-1]
+            header[FORMING] = 1
+        else:
+            header[FORMING] = 0
+        header[SEQUENCE] += 1
+
+        if added and self.condition is not None:
+            with self.condition:
+                self.condition.notify_all()
+        return added
+
+    def _window(self, ring, header, limit):
+        # La última vela cerrada está en closed - 1 (módulo capacidad); en la
+        # mitad espejada las `limit` anteriores son contiguas
+        count = min(int(header[CLOSED]), self.capacity, max(limit, 0))
+        end = int(header[CLOSED]) % self.capacity + self.capacity
+        return ring[end - count:end]
+
+    def _read(self, key, reader):
+        header = self._headers[key]
+        while True:
+            sequence = int(header[SEQUENCE])
+            if sequence % 2 == 0:
+                result = reader(header)
+                if int(header[SEQUENCE]) == sequence:
+                    return result
+            # El escritor está a mitad de una publicación: se cede el turno
+            time.sleep(0)
+
+    def view(self, symbol, interval, limit=500):
+        """
+        Vista sin copia de las últimas velas cerradas
+
+        La vista apunta a la memoria compartida: es válida mientras
+        is_current(symbol, interval, sequence) sea True (una publicación
+        posterior puede sobrescribir velas viejas del anillo).
+
+        Returns:
+            tuple: (np.ndarray, int) vista de registros KLINE_DTYPE y secuencia leída
+        """
+        key = (symbol, interval)
+        ring = self._rings[key]
+
+        def reader(header):
+            return self._window(ring, header, limit), int(header[SEQUENCE])
+        return self._read(key, reader)
+
+    def is_current(self, symbol, interval, sequence):
+        """
+        Indica si no hubo publicaciones desde que se leyó `sequence`
+        """
+        return int(self._headers[(symbol, interval)][SEQUENCE]) == sequence
+
+    def candles(self, symbol, interval, limit=500, include_forming=False):
+        """
+        Copia consistente de las últimas velas (como get_klines si include_forming)
+
+        Returns:
+            np.ndarray: Registros KLINE_DTYPE
+        """
+        key = (symbol, interval)
+        ring, forming = self._rings[key], self._forming[key]
+
+        def reader(header):
+            with_forming = include_forming and int(header[FORMING])
+            closed = self._window(ring, header, limit - 1 if with_forming else limit)
+            return np.concatenate((closed, forming) if with_forming else (closed,))
+        return self._read(key, reader)
+
+    def closed_count(self, symbol, interval):
+        """
+        Velas cerradas publicadas en total (sirve como cursor de los consumidores)
+        """
+        return int(self._headers[(symbol, interval)][CLOSED])
+
+    def last_open_time(self, symbol, interval):
+        """
+        open_time de la última vela cerrada publicada, o None si no hay
+        """
+        value = int(self._headers[(symbol, interval)][LAST_OPEN])
+        return None if value < 0 else value
+
+    def last_price(self, symbol, interval):
+        """
+        Cierre de la vela en formación, o de la última cerrada si no hay
+        """
+        rows = self.candles(symbol, interval, 1, include_forming=True)
+        if not len(rows):
+            raise KeyError(f"No hay velas de {symbol} {interval}")
+        return float(rows['close'][-1])
+
+    def wait_for_close(self, symbol, interval, after, timeout=None, poll_seconds=0.5):
+        """
+        Espera a que se publiquen velas cerradas después del cursor `after`
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo
+            after (int): Valor de closed_count() ya procesado
+            timeout (float): Espera máxima en segundos (None: sin límite)
+            poll_seconds (float): Intervalo de consulta si no hay Condition
+
+        Returns:
+            bool: True si hay velas nuevas
+        """
+        ready = lambda: self.closed_count(symbol, interval) > after
+        if self.condition is not None:
+            with self.condition:
+                return self.condition.wait_for(ready, timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not ready():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_seconds)
+        return True
+
+    @property
+    def is_owner(self):
+        """
+        Indica si este proceso creó los bloques (y debe eliminarlos al cerrar)
+        """
+        return self.owner and self.owner_pid == os.getpid()
+
+    def close(self):
+        """
+        Libera los buffers (el proceso de ingesta además los elimina)
+        """
+        self._headers.clear()
+        self._rings.clear()
+        self._forming.clear()
+        for block in self._blocks.values():
+            block.close()
+            if self.is_owner:
+                block.unlink()
+        self._blocks.clear()
+
+
+class MarketDataFeed:
+    def __init__(self, bus, client, poll_seconds=1.0, clock=None):
+        """
+        Proceso de ingesta: consulta las velas y las publica en el bus
+
+        Por par e intervalo se hace una única consulta por ciclo sin importar
+        cuántos consumidores lean el bus. El cliente puede ser un
+        AggregatedKlineClient para consultar además solo velas de 1m.
+
+        Args:
+            bus (MarketDataBus): Bus creado por este proceso
+            client: Cliente con get_klines (por ejemplo, Client de Binance)
+            poll_seconds (float): Segundos entre ciclos de consulta
+            clock: Reloj con time/sleep (por defecto, SystemClock)
+        """
+        self.bus = bus
+        self.client = client
+        self.poll_seconds = poll_seconds
+        self.clock = clock if clock is not None else SystemClock()
+        self.running = False
+        self.requests = 0
+
+    def poll(self):
+        """
+        Publica las velas nuevas de todos los pares e intervalos
+
+        Returns:
+            int: Velas cerradas nuevas publicadas
+        """
+        added = 0
+        for symbol, interval in self.bus.streams:
+            last = self.bus.last_open_time(symbol, interval)
+            if last is None:
+                # Historial inicial (más la vela en formación)
+                kwargs = {'limit': min(self.bus.capacity + 1, 1000)}
+            else:
+                kwargs = {'startTime': last + interval_to_ms(interval), 'limit': 1000}
+            try:
+                rows = klines_to_array(self.client.get_klines(symbol=symbol, interval=interval, **kwargs))
+            except Exception as e:
+                logger.error(f"Error al obtener velas de {symbol} {interval} para el bus: {e}")
+                continue
+            self.requests += 1
+            # La API incluye la vela en formación como última fila
+            now = int(self.clock.time() * 1000)
+            added += self.bus.publish(symbol, interval, rows[rows['close_time'] < now],
+                                      rows[rows['close_time'] >= now][-1:])
+        return added
+
+    def stop(self):
+        """
+        Detiene el bucle de ingesta al terminar el ciclo en curso
+        """
+        self.running = False
+
+    def run(self):
+        """
+        Publica velas cada poll_seconds hasta stop() o Ctrl+C
+        """
+        self.running = True
+        try:
+            while self.running:
+                self.poll()
+                self.clock.sleep(self.poll_seconds)
+        except KeyboardInterrupt:
+            logger.info("Ingesta del bus detenida manualmente")
+
+
+class BusKlineClient:
+    def __init__(self, bus):
+        """
+        Cliente compatible con PecetoPredictor que lee las velas del bus
+
+        Permite usar el bucle normal de run() sin consultar la API.
+
+        Args:
+            bus (MarketDataBus): Bus de velas
+        """
+        self.bus = bus
+
+    def get_klines(self, symbol, interval, limit=500, **kwargs):
+        return array_to_klines(self.bus.candles(symbol, interval, limit, include_forming=True))
+
+    def get_symbol_ticker(self, symbol):
+        for stream_symbol, interval in self.bus.streams:
+            if stream_symbol == symbol:
+                return {"symbol": symbol, "price": str(self.bus.last_price(symbol, interval))}
+        raise KeyError(f"{symbol} no se publica en el bus")
+
+
+class BusSignalConsumer:
+    def __init__(self, predictor, bus, limit=200, stop_event=None):
+        """
+        Evalúa las señales de un predictor en cada vela cerrada del bus
+
+        En lugar de consultar la API cada cycle_delay(), el consumidor duerme
+        hasta que el proceso de ingesta publica una vela cerrada y evalúa las
+        últimas `limit` velas. Si se publicaron varias juntas se evalúa solo
+        la última.
+
+        Args:
+            predictor (PecetoPredictor): Predictor a alimentar
+            bus (MarketDataBus): Bus de velas
+            limit (int): Velas por evaluación (como get_historical_klines)
+            stop_event (multiprocessing.Event): Evento para detener el consumidor desde
+                otro proceso (terminarlo mientras espera en la Condition puede dejar
+                tomado su lock y bloquear publish())
+        """
+        self.predictor = predictor
+        self.bus = bus
+        self.limit = limit
+        self.stop_event = stop_event
+        self.cursor = 0
+        self.evaluations = 0
+        self.running = False
+
+    def evaluate(self):
+        """
+        Calcula indicadores y procesa señales con las últimas velas cerradas
+        """
+        symbol, interval = self.predictor.symbol, self.predictor.interval
+        self.cursor = self.bus.closed_count(symbol, interval)
+        candles = self.bus.candles(symbol, interval, self.limit)
+        # Los cruces necesitan al menos la vela anterior
+        if len(candles) < 2:
+            return
+        try:
+            data = self.predictor.calculate_indicators(to_frame(candles), self.predictor.required_columns)
+            self.predictor.process_signals(data)
+            self.evaluations += 1
+        except Exception as e:
+            logger.error(f"Error al evaluar velas del bus de {symbol} {interval}: {e}")
+
+    def stop(self):
+        """
+        Detiene el consumidor al terminar la evaluación en curso
+        """
+        self.running = False
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    def run(self, timeout=1.0):
+        """
+        Evalúa cada vela cerrada hasta stop(), el evento de parada o Ctrl+C
+
+        Args:
+            timeout (float): Segundos máximos de cada espera (cada cuánto se revisa el evento)
+        """
+        symbol, interval = self.predictor.symbol, self.predictor.interval
+        self.running = True
+        try:
+            while self.running and not (self.stop_event is not None and self.stop_event.is_set()):
+                if self.bus.wait_for_close(symbol, interval, self.cursor, timeout):
+                    self.evaluate()
+        except KeyboardInterrupt:
+            logger.info(f"Consumidor del bus de {symbol} {interval} detenido manualmente")
+
+
+def _run_consumer(bus, symbol, interval, use_telegram, stop_event):
+    predictor = PecetoPredictor(
+        api_key=config("BINANCE_API_KEY"),
+        api_secret=config("BINANCE_API_SECRET"),
+        symbol=symbol,
+        interval=interval,
+        use_telegram=use_telegram,
+        show_chart=False,
+        client=BusKlineClient(bus),
+    )
+    BusSignalConsumer(predictor, bus, stop_event=stop_event).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bus de velas en memoria compartida con un proceso por estrategia")
+    parser.add_argument('--symbols', nargs='+', default=['BTCUSDT', 'ETHUSDT'])
+    parser.add_argument('--intervals', nargs='+', default=['1m', '15m'])
+    parser.add_argument('--capacity', type=int, default=1000, help="Velas cerradas por par e intervalo")
+    parser.add_argument('--poll-seconds', type=float, default=2.0, help="Segundos entre consultas a Binance")
+    parser.add_argument('--telegram', action='store_true', help="Enviar alertas por Telegram")
+    args = parser.parse_args()
+
+    streams = [(symbol, interval) for symbol in args.symbols for interval in args.intervals]
+    bus = MarketDataBus(streams, args.capacity)
+    feed = MarketDataFeed(bus, Client(config("BINANCE_API_KEY"), config("BINANCE_API_SECRET")), args.poll_seconds)
+    # Historial inicial antes de arrancar los consumidores
+    feed.poll()
+    stop_event = multiprocessing.Event()
+    consumers = [
+        multiprocessing.Process(target=_run_consumer, args=(bus, symbol, interval, args.telegram, stop_event),
+                                daemon=True)
+        for symbol, interval in streams
+    ]
+    for process in consumers:
+        process.start()
+    print(f"Bus de velas iniciado para {', '.join(f'{symbol} {interval}' for symbol, interval in streams)} "
+          f"con {len(consumers)} procesos consumidores")
+    print(f"Presiona Ctrl+C para detener el bot")
+    try:
+        feed.run()
+    finally:
+        # Con el evento cada consumidor sale de su espera y suelta el lock de la Condition
+        stop_event.set()
+        for process in consumers:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        bus.close()
+        print("\n\nBot detenido manualmente.")
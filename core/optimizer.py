@@ -0,0 +1,465 @@
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from tabulate import tabulate
+from backtest import DEFAULT_PARAMS, PecetoBacktest, prioritize, signal_conditions, signal_strength
+from candle_store import CandleStore
+from indicator_cache import fingerprint, indicator_cache
+from indicators import BOLLINGER_STD, BOLLINGER_WINDOW, MACD_SIGNAL_SPAN, ema, rolling_mean, rolling_std, rsi
+
+# Grilla por defecto de los parámetros de PecetoPredictor
+DEFAULT_GRID = {
+    'ema_short': [5, 9, 12],
+    'ema_medium': [21, 26],
+    'ema_long': [50, 55, 100],
+    'rsi_period': [7, 14],
+    'rsi_oversold': [25, 30],
+    'rsi_overbought': [70, 75],
+}
+
+# Espacio de la búsqueda adaptativa: los seis parámetros, el cooldown y el umbral de condiciones
+SEARCH_SPACE = {
+    'ema_short': [5, 7, 9, 12, 15],
+    'ema_medium': [18, 21, 26, 30],
+    'ema_long': [50, 55, 75, 100, 150],
+    'rsi_period': [7, 10, 14, 21],
+    'rsi_oversold': [20, 25, 30, 35],
+    'rsi_overbought': [65, 70, 75, 80],
+    'cooldown_hours': [0.5, 1, 2, 4],
+    'min_conditions': [2, 3, 4],
+}
+
+
+def valid_params(params):
+    """
+    Verifica que una combinación de parámetros tenga sentido para la estrategia
+    """
+    return (
+        params['ema_short'] < params['ema_medium'] < params['ema_long']
+        and params['rsi_oversold'] < params['rsi_overbought']
+        and 1 <= params['min_conditions'] <= 5
+    )
+
+
+def expand_grid(param_grid, base=None):
+    """
+    Genera las combinaciones válidas de una grilla de parámetros
+
+    Args:
+        param_grid (dict): Valores a probar por parámetro
+        base (dict): Valores de los parámetros que no están en la grilla (por defecto DEFAULT_PARAMS)
+
+    Returns:
+        list: Diccionarios de parámetros completos, en el orden de la grilla
+    """
+    base = {**DEFAULT_PARAMS, **(base or {})}
+    names = list(param_grid)
+    candidates = []
+    for values in itertools.product(*(param_grid[name] for name in names)):
+        params = {**base, **dict(zip(names, values))}
+        if valid_params(params):
+            candidates.append(params)
+    return candidates
+
+
+def score(results, objective='total_return'):
+    """
+    Puntaje de un resultado de backtest (mayor es mejor)
+
+    Args:
+        results (dict): Métricas de PecetoBacktest.results()
+        objective (str | callable): Métrica a maximizar o función results -> float
+    """
+    if callable(objective):
+        return float(objective(results))
+    return float(results[objective])
+
+
+class IndicatorBank:
+    def __init__(self, candles, cache=None):
+        """
+        Indicadores de una serie de velas calculados una sola vez sobre todo el historial
+
+        Cada columna (EMA de un periodo, RSI de un periodo, MACD de un par de
+        EMAs, bandas de Bollinger) se calcula al pedirla y queda guardada, por
+        lo que todos los candidatos y ventanas que la usan la comparten. Como
+        los indicadores son causales, el valor en una vela es el mismo que se
+        obtendría con todo el historial previo.
+
+        Las columnas se buscan primero en el caché de indicadores, así que
+        otro banco sobre los mismos precios reutiliza lo ya calculado.
+
+        Args:
+            candles (np.ndarray): Registros KLINE_DTYPE ordenados por open_time
+            cache (IndicatorCache): Caché de series (por defecto, el compartido)
+        """
+        self.open_time = np.ascontiguousarray(candles['open_time'])
+        self.high = np.ascontiguousarray(candles['high'], dtype=float)
+        self.low = np.ascontiguousarray(candles['low'], dtype=float)
+        self.close = np.ascontiguousarray(candles['close'], dtype=float)
+        self.cache = cache if cache is not None else indicator_cache
+        self.series_key = fingerprint(self.close)
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.close)
+
+    def __getstate__(self):
+        # El caché tiene un lock y no se serializa: los procesos hijos usan el suyo
+        state = self.__dict__.copy()
+        del state['cache']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.cache = indicator_cache
+
+    def _cached(self, key, compute):
+        # Las columnas quedan también en el banco: se entregan con él a los procesos del pool
+        if key not in self._columns:
+            self._columns[key] = self.cache.series(self.series_key, f"bank_{key[0]}", key[1:], compute)
+        return self._columns[key]
+
+    def ema(self, span):
+        return self._cached(('ema', span), lambda: ema(self.close, span))
+
+    def macd(self, short, medium):
+        def compute():
+            macd = self.ema(short) - self.ema(medium)
+            return macd, ema(macd, MACD_SIGNAL_SPAN)
+        return self._cached(('macd', short, medium), compute)
+
+    def rsi(self, period):
+        return self._cached(('rsi', period), lambda: rsi(self.close, period))
+
+    def bands(self):
+        def compute():
+            sma = rolling_mean(self.close, BOLLINGER_WINDOW)
+            stddev = rolling_std(self.close, BOLLINGER_WINDOW)
+            return sma - (stddev * BOLLINGER_STD), sma + (stddev * BOLLINGER_STD)
+        return self._cached(('bands',), compute)
+
+    def precompute(self, candidates):
+        """
+        Calcula por adelantado las columnas que usan los candidatos
+
+        Conviene llamarlo antes de repartir trabajo entre procesos para que
+        todos reciban las columnas ya calculadas.
+        """
+        self.bands()
+        for params in candidates:
+            self.macd(params['ema_short'], params['ema_medium'])
+            self.ema(params['ema_long'])
+            self.rsi(params['rsi_period'])
+
+    def indicators(self, params, start, stop):
+        """
+        Columnas de indicadores de un tramo para unos parámetros
+
+        Returns:
+            tuple: (dict, dict) columnas del tramo (mismos nombres que
+                calculate_indicators) y sus valores en la vela anterior (None si start es 0)
+        """
+        macd, macd_signal = self.macd(params['ema_short'], params['ema_medium'])
+        lower_band, upper_band = self.bands()
+        columns = {
+            'ema_short': self.ema(params['ema_short']),
+            'ema_medium': self.ema(params['ema_medium']),
+            'ema_long': self.ema(params['ema_long']),
+            'rsi': self.rsi(params['rsi_period']),
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'lower_band': lower_band,
+            'upper_band': upper_band,
+        }
+        prev = None if start == 0 else {name: values[start - 1] for name, values in columns.items()}
+        return {name: values[start:stop] for name, values in columns.items()}, prev
+
+    def signals(self, params, start=0, stop=None):
+        """
+        Señales priorizadas de compra y venta de un tramo
+
+        Returns:
+            tuple: (np.ndarray, np.ndarray) señales de compra y de venta
+        """
+        stop = len(self) if stop is None else stop
+        indicators, prev = self.indicators(params, start, stop)
+        buy_conditions, sell_conditions = signal_conditions(
+            indicators, self.close[start:stop], params['rsi_oversold'], params['rsi_overbought'], prev
+        )
+        return prioritize(
+            signal_strength(buy_conditions), signal_strength(sell_conditions), params['min_conditions']
+        )
+
+
+def evaluate(bank, params, start=0, stop=None, initial_capital=1000.0, fee=0.001, keep_equity=False):
+    """
+    Backtest de unos parámetros sobre un tramo del banco de indicadores
+
+    La posición y el cooldown empiezan vacíos al inicio del tramo.
+
+    Args:
+        bank (IndicatorBank): Banco de indicadores de la serie
+        params (dict): Parámetros de la estrategia
+        start (int): Primera vela del tramo
+        stop (int): Vela final del tramo (excluida)
+        initial_capital (float): Capital inicial en USDT
+        fee (float): Comisión por operación (fracción)
+        keep_equity (bool): Si es True, agrega la equity por vela en results['equity']
+
+    Returns:
+        dict: Métricas del backtest
+    """
+    stop = len(bank) if stop is None else stop
+    backtest = PecetoBacktest(params, initial_capital, fee, keep_trades=False)
+    buy, sell = bank.signals(backtest.params, start, stop)
+    equity = backtest.apply_signals(bank.open_time[start:stop], bank.close[start:stop], buy, sell)
+    results = backtest.results()
+    if keep_equity:
+        results['equity'] = equity
+    return results
+
+
+def grid_search(bank, candidates, start=0, stop=None, objective='total_return', **backtest_kwargs):
+    """
+    Evalúa todos los candidatos sobre un tramo y elige el de mejor puntaje
+
+    Ante empates gana el primero en el orden de candidates.
+
+    Args:
+        bank (IndicatorBank): Banco de indicadores de la serie
+        candidates (list): Diccionarios de parámetros a evaluar
+        start (int): Primera vela del tramo
+        stop (int): Vela final del tramo (excluida)
+        objective (str | callable): Métrica a maximizar
+        **backtest_kwargs: Parámetros de evaluate() (capital inicial, comisión)
+
+    Returns:
+        tuple: (dict, float) mejores parámetros y su puntaje
+    """
+    if not candidates:
+        raise ValueError("No hay candidatos para evaluar")
+    best_params, best_score = None, -np.inf
+    for params in candidates:
+        value = score(evaluate(bank, params, start, stop, **backtest_kwargs), objective)
+        if value > best_score:
+            best_params, best_score = params, value
+    return best_params, best_score
+
+
+# Banco de indicadores de cada proceso del pool (heredado o recibido una vez al iniciar)
+_worker_bank = None
+
+
+def _init_worker(bank):
+    global _worker_bank
+    _worker_bank = bank
+
+
+def _call_with_bank(function, args):
+    return function(_worker_bank, *args)
+
+
+def bank_executor(bank, workers):
+    """
+    Pool de procesos que recibe el banco de indicadores una sola vez al iniciar
+
+    Args:
+        bank (IndicatorBank): Banco de indicadores compartido
+        workers (int): Cantidad de procesos
+
+    Returns:
+        ProcessPoolExecutor: Pool listo para map_with_bank()
+    """
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(bank,))
+
+
+def map_with_bank(bank, function, tasks, workers=1, executor=None):
+    """
+    Ejecuta function(bank, *task) para cada tarea, en paralelo si workers > 1
+
+    El banco se entrega a cada proceso una sola vez al iniciarlo y no con
+    cada tarea, de modo que las columnas precalculadas se comparten.
+
+    Args:
+        bank (IndicatorBank): Banco de indicadores compartido
+        function (callable): Función de nivel de módulo function(bank, *args)
+        tasks (list): Tuplas de argumentos
+        workers (int): Cantidad de procesos
+        executor (ProcessPoolExecutor): Pool de bank_executor() a reutilizar (opcional)
+
+    Returns:
+        list: Resultados en el orden de tasks
+    """
+    tasks = list(tasks)
+    if executor is None and (workers <= 1 or len(tasks) <= 1):
+        return [function(bank, *task) for task in tasks]
+    # Lotes de tareas por envío para no pagar la comunicación tarea a tarea
+    chunksize = max(1, len(tasks) // (4 * max(workers, 1)))
+    if executor is not None:
+        return list(executor.map(_call_with_bank, [function] * len(tasks), tasks, chunksize=chunksize))
+    with bank_executor(bank, min(workers, len(tasks))) as executor:
+        return list(executor.map(_call_with_bank, [function] * len(tasks), tasks, chunksize=chunksize))
+
+
+def _score_candidate(bank, params, start, stop, objective, backtest_kwargs):
+    return score(evaluate(bank, params, start, stop, **backtest_kwargs), objective)
+
+
+def sample_candidates(space, count, seed=None, base=None):
+    """
+    Sortea combinaciones válidas y distintas de un espacio de parámetros
+
+    Args:
+        space (dict): Valores posibles por parámetro
+        count (int): Cantidad de combinaciones a sortear
+        seed (int): Semilla del sorteo (misma semilla, mismos candidatos)
+        base (dict): Valores de los parámetros que no están en el espacio (por defecto DEFAULT_PARAMS)
+
+    Returns:
+        list: Diccionarios de parámetros completos
+    """
+    rng = np.random.default_rng(seed)
+    base = {**DEFAULT_PARAMS, **(base or {})}
+    names = list(space)
+    candidates, seen = [], set()
+    # Límite de intentos por si el espacio tiene menos combinaciones válidas que count
+    for _ in range(count * 50):
+        if len(candidates) == count:
+            break
+        values = tuple(space[name][rng.integers(len(space[name]))] for name in names)
+        params = {**base, **dict(zip(names, values))}
+        if values not in seen and valid_params(params):
+            seen.add(values)
+            candidates.append(params)
+    return candidates
+
+
+def successive_halving(bank, candidates=None, space=None, n_candidates=243, eta=3, start=0, stop=None,
+                       min_bars=2000, objective='total_return', seed=None, workers=1, **backtest_kwargs):
+    """
+    Búsqueda adaptativa de parámetros por eliminación sucesiva (successive halving)
+
+    Todos los candidatos se evalúan primero sobre las velas más recientes del
+    tramo; en cada ronda se conserva la mejor fracción 1 / eta y se les da
+    eta veces más historial, hasta evaluar a los últimos sobre el tramo
+    completo. El resultado depende solo de la semilla y no de la cantidad
+    de procesos.
+
+    Args:
+        bank (IndicatorBank): Banco de indicadores de la serie
+        candidates (list): Candidatos iniciales (por defecto, sorteados de space)
+        space (dict): Valores posibles por parámetro (por defecto SEARCH_SPACE)
+        n_candidates (int): Candidatos a sortear si no se pasan candidates
+        eta (int): Factor de eliminación y de crecimiento del historial por ronda
+        start (int): Primera vela del tramo
+        stop (int): Vela final del tramo (excluida)
+        min_bars (int): Velas mínimas de la primera ronda
+        objective (str | callable): Métrica a maximizar
+        seed (int): Semilla del sorteo de candidatos
+        workers (int): Procesos para evaluar los candidatos de cada ronda
+        **backtest_kwargs: Parámetros de evaluate() (capital inicial, comisión)
+
+    Returns:
+        dict: Mejores parámetros, su puntaje en el tramo completo y el detalle de las rondas
+    """
+    stop = len(bank) if stop is None else stop
+    if candidates is None:
+        candidates = sample_candidates(space or SEARCH_SPACE, n_candidates, seed)
+    if not candidates:
+        raise ValueError("No hay candidatos para evaluar")
+    total = stop - start
+    rounds = max(1, int(np.ceil(np.log(len(candidates)) / np.log(eta) - 1e-9)))
+
+    survivors = list(candidates)
+    history = []
+    bar_evaluations = 0
+    executor = bank_executor(bank, workers) if workers > 1 else None
+    try:
+        if executor is not None:
+            # Las columnas se calculan antes de que los procesos reciban el banco
+            bank.precompute(candidates)
+        scores, previous_bars = None, None
+        for level in range(rounds):
+            bars = min(total, max(min_bars, total // eta ** (rounds - 1 - level)))
+            # Con el mismo historial que la ronda anterior los puntajes no cambian
+            if bars != previous_bars:
+                first = stop - bars
+                tasks = [(params, first, stop, objective, backtest_kwargs) for params in survivors]
+                scores = np.asarray(map_with_bank(bank, _score_candidate, tasks, workers, executor))
+                bar_evaluations += bars * len(survivors)
+            previous_bars = bars
+
+            # Orden estable: ante empates se conserva el orden de los candidatos
+            order = np.argsort(-scores, kind='stable')
+            history.append({
+                'bars': bars,
+                'candidates': len(survivors),
+                'best_score': float(scores[order[0]]),
+            })
+            if level < rounds - 1:
+                keep = max(1, int(np.ceil(len(survivors) / eta)))
+                survivors = [survivors[index] for index in order[:keep]]
+                scores = scores[order[:keep]]
+            else:
+                best_params, best_score = survivors[order[0]], float(scores[order[0]])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Si la última ronda no usó el tramo completo, se evalúa al ganador en él
+    if history[-1]['bars'] < total:
+        best_score = _score_candidate(bank, best_params, start, stop, objective, backtest_kwargs)
+        bar_evaluations += total
+
+    return {
+        'params': best_params,
+        'score': best_score,
+        'rounds': history,
+        'candidates': len(candidates),
+        'bar_evaluations': bar_evaluations,
+        'grid_bar_evaluations': len(candidates) * total,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimización de parámetros de la estrategia Peceto")
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--start', help="Inicio del historial (UTC), por ejemplo 2024-01-01")
+    parser.add_argument('--end', help="Fin del historial (UTC)")
+    parser.add_argument('--data-dir', default='data/klines', help="Directorio del almacenamiento local de velas")
+    parser.add_argument('--search', choices=['grid', 'halving'], default='halving', help="Grilla completa o búsqueda adaptativa")
+    parser.add_argument('--candidates', type=int, default=243, help="Candidatos a sortear (búsqueda adaptativa)")
+    parser.add_argument('--seed', type=int, help="Semilla del sorteo de candidatos")
+    parser.add_argument('--objective', default='total_return', help="Métrica a maximizar")
+    parser.add_argument('--workers', type=int, help="Procesos (por defecto, uno por núcleo)")
+    args = parser.parse_args()
+
+    to_ms = lambda value: int(np.datetime64(value, 'ms').astype(np.int64)) if value else None
+    bank = IndicatorBank(CandleStore(args.data_dir).load(args.symbol, args.interval, to_ms(args.start), to_ms(args.end)))
+    workers = args.workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    if args.search == 'halving':
+        result = successive_halving(bank, n_candidates=args.candidates, objective=args.objective,
+                                    seed=args.seed, workers=workers)
+        print(tabulate([[level['bars'], level['candidates'], f"{level['best_score']:.4f}"] for level in result['rounds']],
+                       headers=["Velas", "Candidatos", "Mejor puntaje"], tablefmt="grid"))
+        print(f"Velas evaluadas: {result['bar_evaluations']} "
+              f"({result['bar_evaluations'] / result['grid_bar_evaluations']:.1%} de evaluar todos en el historial completo)")
+        params, best = result['params'], result['score']
+    else:
+        candidates = expand_grid(DEFAULT_GRID)
+        bank.precompute(candidates)
+        scores = map_with_bank(bank, _score_candidate,
+                               [(params, 0, len(bank), args.objective, {}) for params in candidates], workers)
+        index = int(np.argmax(scores))
+        params, best = candidates[index], scores[index]
+    elapsed = time.perf_counter() - started
+
+    print(f"Mejores parámetros para {args.symbol} {args.interval} ({args.objective} = {best:.4f}) en {elapsed:.1f}s")
+    print(tabulate([[name, value] for name, value in params.items()], headers=["Parámetro", "Valor"], tablefmt="grid"))
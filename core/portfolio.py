@@ -0,0 +1,323 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from tabulate import tabulate
+from backtest import DEFAULT_PARAMS, prioritize, signal_conditions, signal_strength
+from candle_store import CandleStore, interval_to_ms
+from indicators import compute_indicators
+
+
+def load_universe(store, interval, symbols=None, start=None, end=None):
+    """
+    Carga las velas de varios pares desde el almacenamiento local
+
+    Args:
+        store (CandleStore): Almacenamiento local de velas
+        interval (str): Intervalo de las velas
+        symbols (list): Pares a cargar (por defecto, todos los que tienen velas del intervalo)
+        start (int): open_time mínimo en milisegundos (incluido)
+        end (int): open_time máximo en milisegundos (excluido)
+
+    Returns:
+        dict: Registros KLINE_DTYPE por par (se omiten los pares sin velas)
+    """
+    if symbols is None:
+        symbols = [symbol for symbol in store.symbols() if store.exists(symbol, interval)]
+    universe = {}
+    for symbol in symbols:
+        candles = store.load(symbol, interval, start, end)
+        if len(candles):
+            universe[symbol] = candles
+    return universe
+
+
+def _pack(series, field):
+    """
+    Apila las series de un campo alineadas a la izquierda (relleno con NaN al final)
+    """
+    matrix = np.full((len(series), max(len(candles) for candles in series)), np.nan)
+    for row, candles in enumerate(series):
+        matrix[row, :len(candles)] = candles[field]
+    return matrix
+
+
+def _batch_signals(series, params):
+    """
+    Calcula las señales priorizadas de un lote de pares en una sola pasada 2-D
+
+    Cada fila contiene las velas de un par desde su primera vela, por lo que
+    los indicadores son los mismos que en un backtest individual del par.
+
+    Returns:
+        tuple: (buy, sell, buy_strength, sell_strength) matrices pares x velas
+    """
+    close = _pack(series, 'close')
+    indicators = compute_indicators(
+        _pack(series, 'high'), _pack(series, 'low'), close,
+        params['ema_short'], params['ema_medium'], params['ema_long'], params['rsi_period']
+    )
+    buy_conditions, sell_conditions = signal_conditions(
+        indicators, close, params['rsi_oversold'], params['rsi_overbought']
+    )
+    buy_strength = signal_strength(buy_conditions)
+    sell_strength = signal_strength(sell_conditions)
+    buy, sell = prioritize(buy_strength, sell_strength, params['min_conditions'])
+    return buy, sell, buy_strength, sell_strength
+
+
+class PortfolioBacktest:
+    def __init__(self, universe, interval, params=None, initial_capital=10_000.0, fee=0.001,
+                 max_positions=10, position_size=None, workers=None, batch_size=None):
+        """
+        Backtest de la estrategia Peceto sobre un universo de pares con capital compartido
+
+        Las señales de cada par siguen las reglas de PecetoPredictor (prioridad
+        de la señal más fuerte y cooldown por par y tipo de alerta). En cada
+        vela primero se cierran las posiciones con alerta de VENTA y luego se
+        abren las de COMPRA, de mayor a menor fuerza, mientras haya capital y
+        lugar dentro de max_positions.
+
+        Args:
+            universe (dict): Registros KLINE_DTYPE por par
+            interval (str): Intervalo de las velas
+            params (dict): Parámetros de la estrategia (ver DEFAULT_PARAMS)
+            initial_capital (float): Capital inicial en USDT
+            fee (float): Comisión por operación (fracción)
+            max_positions (int): Máximo de posiciones abiertas a la vez
+            position_size (float): Fracción del equity por posición (por defecto 1 / max_positions)
+            workers (int): Procesos para calcular las señales (por defecto, uno por núcleo)
+            batch_size (int): Pares por lote de cálculo (por defecto, un lote por proceso)
+        """
+        if not universe:
+            raise ValueError("El universo no tiene pares con velas")
+        self.symbols = sorted(universe)
+        self.universe = universe
+        self.interval = interval
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.initial_capital = initial_capital
+        self.fee = fee
+        self.max_positions = max_positions
+        self.position_size = position_size if position_size is not None else 1.0 / max_positions
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.batch_size = batch_size or -(-len(self.symbols) // self.workers)
+
+    def align(self):
+        """
+        Construye la grilla de tiempo común y la posición de cada vela en ella
+
+        Returns:
+            tuple: (np.ndarray, list) open_time de la grilla e índices por par
+        """
+        step = interval_to_ms(self.interval)
+        first = min(int(self.universe[symbol]['open_time'][0]) for symbol in self.symbols)
+        last = max(int(self.universe[symbol]['open_time'][-1]) for symbol in self.symbols)
+        grid = np.arange(first, last + step, step, dtype=np.int64)
+        positions = [(self.universe[symbol]['open_time'] - first) // step for symbol in self.symbols]
+        return grid, positions
+
+    def compute_signals(self, grid, positions):
+        """
+        Calcula las señales de todos los pares alineadas a la grilla
+
+        Los lotes de pares se reparten entre procesos; con un solo proceso se
+        calculan en el proceso actual.
+
+        Returns:
+            tuple: (buy, sell, buy_strength, sell_strength) matrices pares x grilla
+        """
+        shape = (len(self.symbols), len(grid))
+        buy, sell = np.zeros(shape, dtype=bool), np.zeros(shape, dtype=bool)
+        buy_strength, sell_strength = np.zeros(shape, dtype=np.int8), np.zeros(shape, dtype=np.int8)
+
+        batches = [
+            range(offset, min(offset + self.batch_size, len(self.symbols)))
+            for offset in range(0, len(self.symbols), self.batch_size)
+        ]
+        series = [[self.universe[self.symbols[row]] for row in batch] for batch in batches]
+
+        if self.workers > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(batches))) as executor:
+                outputs = executor.map(_batch_signals, series, [self.params] * len(batches))
+                results = list(outputs)
+        else:
+            results = [_batch_signals(batch_series, self.params) for batch_series in series]
+
+        for batch, output in zip(batches, results):
+            for local, row in enumerate(batch):
+                count = len(positions[row])
+                for target, source in zip((buy, sell, buy_strength, sell_strength), output):
+                    target[row, positions[row]] = source[local, :count]
+        return buy, sell, buy_strength, sell_strength
+
+    def price_matrix(self, grid, positions):
+        """
+        Cierres alineados a la grilla, arrastrando el último cierre en los huecos
+
+        Returns:
+            np.ndarray: Matriz pares x grilla (0 antes de la primera vela del par)
+        """
+        close = np.full((len(self.symbols), len(grid)), np.nan)
+        for row, symbol in enumerate(self.symbols):
+            close[row, positions[row]] = self.universe[symbol]['close']
+        # Índice de la última vela conocida en cada posición de la grilla
+        index = np.where(np.isnan(close), 0, np.arange(len(grid)))
+        index = np.maximum.accumulate(index, axis=1)
+        close = np.take_along_axis(close, index, axis=1)
+        return np.nan_to_num(close, nan=0.0)
+
+    def run(self):
+        """
+        Ejecuta el backtest del portafolio
+
+        Returns:
+            dict: Métricas y series de equity, exposición y posiciones abiertas
+        """
+        grid, positions = self.align()
+        buy, sell, buy_strength, sell_strength = self.compute_signals(grid, positions)
+        close = self.price_matrix(grid, positions)
+        cooldown_ms = self.params['cooldown_hours'] * 3600 * 1000
+        symbol_count = len(self.symbols)
+
+        cash = self.initial_capital
+        units = np.zeros(symbol_count)
+        entry_price = np.zeros(symbol_count)
+        last_buy_alert = np.full(symbol_count, np.iinfo(np.int64).min // 2, dtype=np.int64)
+        last_sell_alert = last_buy_alert.copy()
+        units_delta = np.zeros((symbol_count, len(grid)))
+        changes, cash_states = [], [cash]
+        trade_returns = []
+        buy_alerts = sell_alerts = skipped = 0
+
+        # Solo se recorren las velas en las que algún par tiene señal
+        for step in np.flatnonzero((buy | sell).any(axis=0)):
+            bar_time = int(grid[step])
+            changed = False
+
+            for row in np.flatnonzero(sell[:, step]):
+                if bar_time - last_sell_alert[row] < cooldown_ms:
+                    continue
+                last_sell_alert[row] = bar_time
+                sell_alerts += 1
+                if units[row] > 0.0:
+                    price = close[row, step]
+                    cash += units[row] * price * (1 - self.fee)
+                    trade_returns.append(price * (1 - self.fee) ** 2 / entry_price[row] - 1)
+                    units_delta[row, step] -= units[row]
+                    units[row] = 0.0
+                    changed = True
+
+            candidates = np.flatnonzero(buy[:, step])
+            if len(candidates):
+                # Las señales más fuertes tienen prioridad sobre el capital disponible
+                candidates = candidates[np.argsort(-buy_strength[candidates, step], kind='stable')]
+                equity = cash + float(units @ close[:, step])
+                open_positions = int(np.count_nonzero(units))
+                for row in candidates:
+                    if bar_time - last_buy_alert[row] < cooldown_ms:
+                        continue
+                    last_buy_alert[row] = bar_time
+                    buy_alerts += 1
+                    if units[row] > 0.0:
+                        continue
+                    allocation = min(cash, equity * self.position_size)
+                    if open_positions >= self.max_positions or allocation <= 0.0:
+                        skipped += 1
+                        continue
+                    price = close[row, step]
+                    units[row] = allocation * (1 - self.fee) / price
+                    entry_price[row] = price
+                    units_delta[row, step] += units[row]
+                    cash -= allocation
+                    open_positions += 1
+                    changed = True
+
+            if changed:
+                changes.append(step)
+                cash_states.append(cash)
+
+        # Series del portafolio a partir de los cambios de posición
+        segment = np.zeros(len(grid), dtype=np.int64)
+        if changes:
+            segment[changes] = np.arange(1, len(changes) + 1)
+            segment = np.maximum.accumulate(segment)
+        held = np.cumsum(units_delta, axis=1)
+        invested = np.einsum('ij,ij->j', held, close)
+        equity = np.asarray(cash_states)[segment] + invested
+        open_counts = np.count_nonzero(held > 0.0, axis=0)
+
+        peak = np.maximum.accumulate(equity)
+        trade_returns = np.asarray(trade_returns)
+        return {
+            'symbols': len(self.symbols),
+            'bars': len(grid),
+            'final_equity': float(equity[-1]),
+            'total_return': float(equity[-1] / self.initial_capital - 1),
+            'max_drawdown': float(np.max(1 - equity / peak)),
+            'trades': len(trade_returns),
+            'win_rate': float(np.mean(trade_returns > 0)) if len(trade_returns) else 0.0,
+            'avg_exposure': float(np.mean(invested / equity)),
+            'max_open_positions': int(open_counts.max()),
+            'buy_alerts': buy_alerts,
+            'sell_alerts': sell_alerts,
+            'skipped_entries': skipped,
+            'open_positions': int(np.count_nonzero(units)),
+            'timestamps': grid,
+            'equity': equity,
+            'exposure': invested / equity,
+            'positions': open_counts,
+        }
+
+
+def run_portfolio_backtest(store, interval, symbols=None, start=None, end=None, **kwargs):
+    """
+    Carga un universo del almacenamiento local y ejecuta el backtest del portafolio
+
+    Args:
+        store (CandleStore): Almacenamiento local de velas
+        interval (str): Intervalo de las velas
+        symbols (list): Pares a incluir (por defecto, todos los almacenados)
+        start (int): open_time mínimo en milisegundos (incluido)
+        end (int): open_time máximo en milisegundos (excluido)
+        **kwargs: Parámetros adicionales de PortfolioBacktest
+
+    Returns:
+        dict: Métricas y series del portafolio
+    """
+    universe = load_universe(store, interval, symbols, start, end)
+    return PortfolioBacktest(universe, interval, **kwargs).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest de portafolio de la estrategia Peceto")
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--symbols', nargs='*', help="Pares a incluir (por defecto, todos los almacenados)")
+    parser.add_argument('--start', help="Inicio del backtest (UTC), por ejemplo 2024-01-01")
+    parser.add_argument('--end', help="Fin del backtest (UTC)")
+    parser.add_argument('--data-dir', default='data/klines', help="Directorio del almacenamiento local de velas")
+    parser.add_argument('--capital', type=float, default=10_000.0, help="Capital inicial en USDT")
+    parser.add_argument('--fee', type=float, default=0.001, help="Comisión por operación")
+    parser.add_argument('--max-positions', type=int, default=10, help="Máximo de posiciones abiertas")
+    parser.add_argument('--workers', type=int, help="Procesos para calcular las señales")
+    args = parser.parse_args()
+
+    to_ms = lambda value: int(np.datetime64(value, 'ms').astype(np.int64)) if value else None
+    started = time.perf_counter()
+    result = run_portfolio_backtest(
+        CandleStore(args.data_dir), args.interval, args.symbols, to_ms(args.start), to_ms(args.end),
+        initial_capital=args.capital, fee=args.fee, max_positions=args.max_positions, workers=args.workers
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f"Portafolio de {result['symbols']} pares {args.interval}: {result['bars']} velas en {elapsed:.1f}s")
+    print(tabulate([
+        ["Equity final", f"{result['final_equity']:.2f}"],
+        ["Retorno total", f"{result['total_return']:.2%}"],
+        ["Máximo drawdown", f"{result['max_drawdown']:.2%}"],
+        ["Operaciones", result['trades']],
+        ["Tasa de acierto", f"{result['win_rate']:.2%}"],
+        ["Exposición media", f"{result['avg_exposure']:.2%}"],
+        ["Máximo de posiciones", result['max_open_positions']],
+        ["Entradas sin capital o cupo", result['skipped_entries']],
+    ], headers=["Métrica", "Valor"], tablefmt="grid"))
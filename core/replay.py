@@ -0,0 +1,224 @@
+import argparse
+import contextlib
+import os
+import time
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+from decouple import config
+from alert_aggregator import AlertAggregator
+from candle_store import CandleStore, array_to_klines, interval_to_ms
+from clock import VirtualClock
+from main import PecetoPredictor, logger
+from signal_journal import SignalJournal
+
+
+class OfflineKlineClient:
+    def __init__(self, candles, clock):
+        """
+        Cliente de Binance simulado que sirve velas almacenadas según un reloj virtual.
+
+        Solo devuelve velas cerradas al instante actual del reloj, por lo que el
+        predictor nunca ve datos del futuro.
+
+        Args:
+            candles (dict): Registros KLINE_DTYPE por (symbol, interval)
+            clock (VirtualClock): Reloj de la simulación
+        """
+        self.candles = candles
+        self.clock = clock
+
+    def _closed(self, symbol, interval):
+        array = self.candles[(symbol, interval)]
+        now_ms = int(self.clock.time() * 1000)
+        return array[:int(np.searchsorted(array['close_time'], now_ms, side='left'))]
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None, endTime=None, **kwargs):
+        array = self._closed(symbol, interval)
+        if endTime is not None:
+            array = array[array['open_time'] <= endTime]
+        # Como la API: desde startTime hacia adelante, o las últimas `limit` velas
+        if startTime is not None:
+            return array_to_klines(array[array['open_time'] >= startTime][:limit])
+        return array_to_klines(array[-limit:])
+
+    def get_symbol_ticker(self, symbol):
+        # Precio de cierre más reciente entre los intervalos disponibles del par
+        latest = None
+        for (candle_symbol, interval), _ in self.candles.items():
+            if candle_symbol != symbol:
+                continue
+            closed = self._closed(symbol, interval)
+            if len(closed) and (latest is None or closed['close_time'][-1] > latest['close_time']):
+                latest = closed[-1]
+        if latest is None:
+            raise ValueError(f"No hay velas cerradas de {symbol} al {self.clock.now()}")
+        return {"symbol": symbol, "price": str(latest['close'])}
+
+
+class CapturingAlertSystem:
+    def __init__(self, clock):
+        """
+        Sistema de alertas que registra los mensajes en lugar de enviarlos
+
+        Args:
+            clock (VirtualClock): Reloj de la simulación
+        """
+        self.clock = clock
+        self.CHAT_ID = 'replay'
+        self.messages = []
+
+    def send_telegram_message(self, message, image_path=None, chat_id=None):
+        self.messages.append({
+            "time": self.clock.now(),
+            "chat_id": chat_id or self.CHAT_ID,
+            "message": str(message),
+            "has_image": image_path is not None,
+        })
+        return True
+
+    def flush(self, timeout=None):
+        return True
+
+    def close(self, timeout=None):
+        pass
+
+
+class ReplayAlertAggregator(AlertAggregator):
+    """
+    Agregador que además registra cada alerta aceptada por el predictor
+    """
+
+    def __init__(self, alert_system, clock, **kwargs):
+        super().__init__(alert_system, **kwargs)
+        self.clock = clock
+        self.signals = []
+
+    def add(self, symbol, interval, signal_type, details, message, image=None, chat_id=None):
+        self.signals.append({
+            "time": self.clock.now(),
+            "symbol": symbol,
+            "interval": interval,
+            "signal_type": signal_type,
+            "candle": details['timestamp'],
+            "price": details['price'],
+            "strength": details['strength'],
+        })
+        super().add(symbol, interval, signal_type, details, message, image=image, chat_id=chat_id)
+
+
+def run_replay(symbol, interval, start=None, end=None, candles=None, store=None,
+               cooldown_store=None, quiet=True, warmup=200, **predictor_kwargs):
+    """
+    Reproduce el bucle real de PecetoPredictor.run() sobre velas almacenadas.
+
+    El reloj virtual reemplaza a time.sleep/datetime.now, el cliente simulado
+    reemplaza a Binance y las alertas se capturan en lugar de enviarse. El
+    camino calculate_indicators → señales → cooldown → alertas es el mismo
+    que en producción.
+
+    Args:
+        symbol (str): Par de trading
+        interval (str): Intervalo de las velas
+        start (datetime): Inicio de la simulación (por defecto, tras `warmup` velas)
+        end (datetime): Fin de la simulación (por defecto, cierre de la última vela)
+        candles (np.ndarray): Velas KLINE_DTYPE; si es None se leen de `store`
+        store (CandleStore): Almacenamiento local de velas
+        cooldown_store (CooldownStore): Almacén de cooldown opcional
+        quiet (bool): Si es True, descarta la salida por consola del bucle
+        warmup (int): Velas previas al inicio por defecto
+        **predictor_kwargs: Parámetros adicionales de PecetoPredictor
+
+    Returns:
+        dict: Señales aceptadas, mensajes capturados y tiempos de la simulación
+    """
+    if candles is None:
+        candles = (store or CandleStore()).load(symbol, interval)
+    if len(candles) <= warmup:
+        raise ValueError(f"Se necesitan más de {warmup} velas de {symbol} {interval} para la simulación")
+
+    if start is None:
+        start = pd.Timestamp(int(candles['close_time'][warmup - 1]) + 1, unit='ms').to_pydatetime()
+    if end is None:
+        end = pd.Timestamp(int(candles['close_time'][-1]) + 1, unit='ms').to_pydatetime()
+
+    clock = VirtualClock(start, end)
+    client = OfflineKlineClient({(symbol, interval): candles}, clock)
+    alert_system = CapturingAlertSystem(clock)
+    aggregator = ReplayAlertAggregator(alert_system, clock)
+
+    predictor = PecetoPredictor(
+        api_key=None,
+        api_secret=None,
+        symbol=symbol,
+        interval=interval,
+        show_chart=False,
+        attach_chart_image=predictor_kwargs.pop('attach_chart_image', False),
+        cooldown_store=cooldown_store,
+        client=client,
+        clock=clock,
+        alert_aggregator=aggregator,
+        **predictor_kwargs
+    )
+    clock.on_expire = predictor.stop
+
+    logger.info(f"Replay de {symbol} {interval} desde {start} hasta {end}")
+    started = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if quiet:
+            devnull = stack.enter_context(open(os.devnull, 'w'))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        predictor.run()
+    aggregator.flush()
+    elapsed = time.perf_counter() - started
+
+    simulated = (end - start).total_seconds()
+    return {
+        "signals": aggregator.signals,
+        "messages": alert_system.messages,
+        "start": start,
+        "end": end,
+        "simulated_seconds": simulated,
+        "elapsed_seconds": elapsed,
+        "speedup": simulated / elapsed if elapsed else float('inf'),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay determinístico del bot Peceto sobre velas almacenadas")
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--start', help="Inicio de la simulación (UTC), por ejemplo 2024-01-01")
+    parser.add_argument('--end', help="Fin de la simulación (UTC)")
+    parser.add_argument('--data-dir', default='data/klines', help="Directorio del almacenamiento local de velas")
+    parser.add_argument('--download', action='store_true', help="Descargar de Binance las velas faltantes antes de simular")
+    parser.add_argument('--journal', help="Directorio del registro de señales donde guardar las alertas")
+    args = parser.parse_args()
+
+    store = CandleStore(args.data_dir)
+    start = pd.Timestamp(args.start).to_pydatetime() if args.start else None
+    end = pd.Timestamp(args.end).to_pydatetime() if args.end else None
+
+    if args.download:
+        from binance.client import Client
+        if start is None:
+            parser.error("--download requiere --start")
+        client = Client(config("BINANCE_API_KEY", default=None), config("BINANCE_API_SECRET", default=None))
+        # Descargar también las velas de calentamiento previas al inicio
+        first = int(pd.Timestamp(args.start).value // 10**6) - 250 * interval_to_ms(args.interval)
+        store.download(client, args.symbol, args.interval, first,
+                       int(pd.Timestamp(args.end).value // 10**6) if args.end else None)
+
+    journal = SignalJournal(args.journal) if args.journal else None
+    result = run_replay(args.symbol, args.interval, start=start, end=end, store=store, signal_journal=journal)
+
+    print(f"Replay {args.symbol} {args.interval}: {result['start']} → {result['end']}")
+    print(f"{len(result['signals'])} alertas en {result['elapsed_seconds']:.1f}s "
+          f"({result['speedup']:.0f}x tiempo real)")
+    if result['signals']:
+        print(tabulate(
+            [[s['time'], s['signal_type'], s['candle'], f"{s['price']:.2f}", f"{s['strength']}/5"]
+             for s in result['signals']],
+            headers=["Tiempo", "Tipo", "Vela", "Precio", "Fuerza"],
+            tablefmt="grid"
+        ))
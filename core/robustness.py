@@ -0,0 +1,299 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from tabulate import tabulate
+from backtest import stream_backtest
+from candle_store import CandleStore
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def bar_returns(equity):
+    """
+    Retornos por vela a partir de una serie de equity
+
+    Args:
+        equity (np.ndarray): Equity al cierre de cada vela
+
+    Returns:
+        np.ndarray: Retorno de cada vela respecto de la anterior
+    """
+    equity = np.asarray(equity, dtype=float)
+    return equity[1:] / equity[:-1] - 1
+
+
+def resample_indices(count, n_sims, rng, block_size=1):
+    """
+    Índices de remuestreo con reemplazo por bloques circulares
+
+    Con block_size=1 es un bootstrap simple; con bloques más largos se
+    conserva la dependencia entre retornos consecutivos (rachas, volatilidad).
+
+    Returns:
+        np.ndarray: Matriz n_sims x count de índices
+    """
+    block_size = max(1, min(block_size, count))
+    blocks = -(-count // block_size)
+    starts = rng.integers(0, count, size=(n_sims, blocks))
+    indices = (starts[:, :, None] + np.arange(block_size)) % count
+    return indices.reshape(n_sims, blocks * block_size)[:, :count]
+
+
+def path_statistics(returns):
+    """
+    Retorno total, máximo drawdown y racha perdedora más larga de cada trayectoria
+
+    Args:
+        returns (np.ndarray): Matriz simulaciones x pasos de retornos
+
+    Returns:
+        tuple: (np.ndarray, np.ndarray, np.ndarray) una métrica por simulación
+    """
+    equity = np.cumprod(1 + returns, axis=1)
+    # El capital inicial (1) también cuenta como máximo previo
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+    max_drawdown = np.max(1 - equity / peak, axis=1)
+
+    # Largo de la racha de pérdidas en cada paso: pérdidas acumuladas desde el último paso sin pérdida
+    losing = returns < 0
+    count = np.cumsum(losing, axis=1)
+    last_reset = np.maximum.accumulate(np.where(losing, 0, count), axis=1)
+    losing_streak = np.max(count - last_reset, axis=1)
+    return equity[:, -1] - 1, max_drawdown, losing_streak
+
+
+def block_statistics(returns, length, rows_per_chunk=None):
+    """
+    Estadísticas de los bloques circulares de `length` retornos que empiezan en cada posición
+
+    Permiten obtener las métricas de una trayectoria remuestreada por bloques
+    combinando un resumen por bloque en lugar de recorrer cada retorno.
+    Todo se mide en escala logarítmica de la equity.
+
+    Args:
+        returns (np.ndarray): Serie de retornos
+        length (int): Largo de los bloques
+
+    Returns:
+        dict: Arreglos por posición de inicio: crecimiento, máximo y mínimo
+            acumulados, drawdown interno y rachas perdedoras (inicial, final y máxima)
+    """
+    count = len(returns)
+    extended = np.concatenate([returns, returns[:length]])
+    windows = np.lib.stride_tricks.sliding_window_view(extended, length)[:count]
+    rows_per_chunk = rows_per_chunk or max(1, 4_000_000 // length)
+
+    stats = {name: np.empty(count) for name in ('growth', 'peak', 'low', 'drawdown')}
+    stats.update({name: np.empty(count, dtype=np.int64) for name in ('prefix', 'suffix', 'streak')})
+    for first in range(0, count, rows_per_chunk):
+        block = windows[first:first + rows_per_chunk]
+        rows = slice(first, first + len(block))
+
+        cumulative = np.cumsum(np.log1p(block), axis=1)
+        running_peak = np.maximum.accumulate(np.maximum(cumulative, 0.0), axis=1)
+        stats['growth'][rows] = cumulative[:, -1]
+        stats['peak'][rows] = running_peak[:, -1]
+        stats['low'][rows] = np.min(cumulative, axis=1)
+        stats['drawdown'][rows] = np.max(running_peak - cumulative, axis=1)
+
+        losing = block < 0
+        losses = np.cumsum(losing, axis=1)
+        runs = losses - np.maximum.accumulate(np.where(losing, 0, losses), axis=1)
+        stats['streak'][rows] = np.max(runs, axis=1)
+        stats['suffix'][rows] = runs[:, -1]
+        stats['prefix'][rows] = np.where(losing.all(axis=1), length, np.argmin(losing, axis=1))
+    stats['length'] = length
+    return stats
+
+
+def combine_blocks(starts, stats, last_stats):
+    """
+    Métricas de trayectorias formadas por bloques concatenados
+
+    Args:
+        starts (np.ndarray): Matriz simulaciones x bloques con la posición de inicio de cada bloque
+        stats (dict): block_statistics() de los bloques completos
+        last_stats (dict): block_statistics() del último bloque (puede ser más corto)
+
+    Returns:
+        tuple: (np.ndarray, np.ndarray, np.ndarray) retorno total, máximo drawdown y racha perdedora
+    """
+    n_sims, blocks = starts.shape
+    level, peak, drawdown = np.zeros(n_sims), np.zeros(n_sims), np.zeros(n_sims)
+    run, streak = np.zeros(n_sims, dtype=np.int64), np.zeros(n_sims, dtype=np.int64)
+    for position in range(blocks):
+        current = last_stats if position == blocks - 1 else stats
+        start = starts[:, position]
+        # Caída desde el máximo previo hasta el mínimo del bloque, o dentro del bloque
+        drawdown = np.maximum(drawdown, np.maximum(current['drawdown'][start], peak - (level + current['low'][start])))
+        peak = np.maximum(peak, level + current['peak'][start])
+        level = level + current['growth'][start]
+
+        prefix = current['prefix'][start]
+        streak = np.maximum(streak, np.maximum(current['streak'][start], run + prefix))
+        run = np.where(prefix == current['length'], run + prefix, current['suffix'][start])
+    return np.expm1(level), -np.expm1(-drawdown), streak
+
+
+def _simulate_batch(returns, n_sims, block_size, seed, stats=None):
+    rng = np.random.default_rng(seed)
+    if stats is None:
+        indices = resample_indices(len(returns), n_sims, rng, block_size)
+        return path_statistics(returns[indices])
+    # Mismo sorteo que resample_indices(), combinando resúmenes de bloque
+    count = len(returns)
+    blocks = -(-count // block_size)
+    starts = rng.integers(0, count, size=(n_sims, blocks))
+    return combine_blocks(starts, *stats)
+
+
+def monte_carlo(returns, n_sims=10_000, block_size=1, seed=None, workers=None, batch_size=250):
+    """
+    Simulación Monte Carlo por remuestreo de una serie de retornos
+
+    Las simulaciones se dividen en lotes vectorizados que se reparten entre
+    procesos. Cada lote tiene su propia semilla derivada de `seed`, por lo
+    que el resultado no depende de la cantidad de procesos.
+
+    Args:
+        returns (np.ndarray): Retornos por operación o por vela
+        n_sims (int): Cantidad de simulaciones
+        block_size (int): Largo de los bloques remuestreados (1 = bootstrap simple)
+        seed (int | np.random.SeedSequence): Semilla para reproducir las simulaciones
+        workers (int): Procesos (por defecto, uno por núcleo)
+        batch_size (int): Simulaciones por lote
+
+    Returns:
+        dict: Arreglos 'total_return', 'max_drawdown' y 'losing_streak' (uno por simulación)
+    """
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) == 0:
+        raise ValueError("No hay retornos para simular")
+    sizes = [min(batch_size, n_sims - offset) for offset in range(0, n_sims, batch_size)]
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(len(sizes))
+    workers = workers if workers is not None else os.cpu_count() or 1
+
+    # Con bloques largos se resumen una vez los bloques posibles y cada
+    # simulación combina resúmenes en lugar de recorrer todos los retornos
+    block_size = max(1, min(block_size, len(returns)))
+    stats = None
+    if block_size > 1:
+        last_size = len(returns) - (-(-len(returns) // block_size) - 1) * block_size
+        full = block_statistics(returns, block_size)
+        stats = (full, full if last_size == block_size else block_statistics(returns, last_size))
+
+    tasks = ([returns] * len(sizes), sizes, [block_size] * len(sizes), seeds, [stats] * len(sizes))
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as executor:
+            batches = list(executor.map(_simulate_batch, *tasks))
+    else:
+        batches = list(map(_simulate_batch, *tasks))
+
+    return {
+        name: np.concatenate([batch[position] for batch in batches])
+        for position, name in enumerate(('total_return', 'max_drawdown', 'losing_streak'))
+    }
+
+
+def summarize(distribution, quantiles=QUANTILES):
+    """
+    Resumen de las distribuciones de una simulación
+
+    Returns:
+        dict: Por métrica, media, desvío y cuantiles; además la probabilidad de pérdida
+    """
+    summary = {
+        name: {
+            'mean': float(np.mean(values)),
+            'std': float(np.std(values)),
+            **{f"q{round(q * 100):02d}": float(np.quantile(values, q)) for q in quantiles},
+        }
+        for name, values in distribution.items()
+    }
+    summary['loss_probability'] = float(np.mean(distribution['total_return'] < 0))
+    return summary
+
+
+def analyze(trade_returns, per_bar_returns=None, n_sims=10_000, trade_block=None, bar_block=None,
+            seed=None, workers=None):
+    """
+    Análisis de robustez de un backtest
+
+    Corre tres simulaciones: bootstrap simple de las operaciones, remuestreo
+    por bloques de las operaciones (conserva rachas) y, si se pasan, remuestreo
+    por bloques de los retornos por vela.
+
+    Args:
+        trade_returns (np.ndarray): Retorno de cada operación cerrada
+        per_bar_returns (np.ndarray): Retornos por vela de la equity (opcional)
+        n_sims (int): Simulaciones por método
+        trade_block (int): Operaciones por bloque (por defecto, raíz de la cantidad)
+        bar_block (int): Velas por bloque (por defecto, raíz de la cantidad)
+        seed (int): Semilla para reproducir las simulaciones
+        workers (int): Procesos (por defecto, uno por núcleo)
+
+    Returns:
+        dict: Resumen y distribuciones por método
+    """
+    trade_returns = np.asarray(trade_returns, dtype=float)
+    seeds = np.random.SeedSequence(seed).spawn(3)
+    runs = {
+        'trades_bootstrap': (trade_returns, 1, seeds[0]),
+        'trades_block': (trade_returns, trade_block or max(2, round(np.sqrt(len(trade_returns)))), seeds[1]),
+    }
+    if per_bar_returns is not None:
+        per_bar_returns = np.asarray(per_bar_returns, dtype=float)
+        runs['bars_block'] = (per_bar_returns, bar_block or max(2, round(np.sqrt(len(per_bar_returns)))), seeds[2])
+
+    report = {}
+    for method, (returns, block_size, method_seed) in runs.items():
+        distribution = monte_carlo(returns, n_sims, block_size, method_seed, workers)
+        report[method] = {
+            'block_size': block_size,
+            'summary': summarize(distribution),
+            'distribution': distribution,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análisis Monte Carlo de robustez de un backtest de la estrategia Peceto")
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--start', help="Inicio del backtest (UTC), por ejemplo 2024-01-01")
+    parser.add_argument('--end', help="Fin del backtest (UTC)")
+    parser.add_argument('--data-dir', default='data/klines', help="Directorio del almacenamiento local de velas")
+    parser.add_argument('--sims', type=int, default=10_000, help="Simulaciones por método")
+    parser.add_argument('--seed', type=int, help="Semilla para reproducir las simulaciones")
+    parser.add_argument('--workers', type=int, help="Procesos (por defecto, uno por núcleo)")
+    args = parser.parse_args()
+
+    to_ms = lambda value: int(np.datetime64(value, 'ms').astype(np.int64)) if value else None
+    equities = []
+    result = stream_backtest(
+        CandleStore(args.data_dir), args.symbol, args.interval, start=to_ms(args.start), end=to_ms(args.end),
+        on_chunk=lambda open_time, equity: equities.append(equity)
+    )
+    if not result['trades']:
+        parser.error("El backtest no tiene operaciones cerradas")
+    trade_returns = [trade['return'] for trade in result['trade_log']]
+
+    started = time.perf_counter()
+    report = analyze(trade_returns, bar_returns(np.concatenate(equities)), args.sims,
+                     seed=args.seed, workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    print(f"Robustez {args.symbol} {args.interval}: {result['trades']} operaciones, "
+          f"retorno {result['total_return']:.2%}, {args.sims} simulaciones por método en {elapsed:.1f}s")
+    rows = []
+    for method, output in report.items():
+        summary = output['summary']
+        for name, label in (('total_return', "Retorno"), ('max_drawdown', "Máx. drawdown")):
+            rows.append([method, label, *(f"{summary[name][key]:.2%}" for key in ('q05', 'q50', 'q95'))])
+        rows.append([method, "Racha perdedora", *(f"{summary['losing_streak'][key]:.0f}" for key in ('q05', 'q50', 'q95'))])
+        rows.append([method, "Prob. de pérdida", f"{summary['loss_probability']:.2%}", "", ""])
+    print(tabulate(rows, headers=["Método", "Métrica", "P5", "Mediana", "P95"], tablefmt="grid"))
@@ -0,0 +1,456 @@
+import argparse
+import ast
+import json
+import time
+import numpy as np
+from tabulate import tabulate
+from indicator_registry import BASE_COLUMNS, indicator_columns
+
+# Reglas de la estrategia Peceto: condiciones por tipo de señal y mínimo de
+# condiciones cumplidas. Los nombres que no son columnas son parámetros.
+PECETO_RULES = {
+    'params': {
+        'rsi_oversold': 30,
+        'rsi_overbought': 70,
+        'support_margin': 0.01,
+        'resistance_margin': 0.01,
+    },
+    'COMPRA': {
+        'min_conditions': 3,
+        'conditions': {
+            'ema_cross_up': 'cross_above(ema_short, ema_medium)',
+            'price_above_long_ema': 'close > ema_long',
+            'rsi_oversold_exit': 'prev(rsi) < rsi_oversold and rsi >= rsi_oversold',
+            'macd_cross_up': 'cross_above(macd, macd_signal)',
+            'near_support': 'close <= lower_band * (1 + support_margin)',
+        },
+    },
+    'VENTA': {
+        'min_conditions': 3,
+        'conditions': {
+            'ema_cross_down': 'cross_below(ema_short, ema_medium)',
+            'price_below_long_ema': 'close < ema_long',
+            'rsi_overbought_entry': 'prev(rsi) > rsi_overbought and rsi <= rsi_overbought',
+            'macd_cross_down': 'cross_below(macd, macd_signal)',
+            'near_resistance': 'close >= upper_band * (1 - resistance_margin)',
+        },
+    },
+}
+
+SIGNAL_TYPES = ('COMPRA', 'VENTA')
+
+
+def rule_columns():
+    """
+    Columnas que pueden usar las reglas: las de velas y las del registro de indicadores
+    """
+    return tuple(BASE_COLUMNS) + tuple(indicator_columns())
+
+
+_COMPARE_OPS = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=', ast.Eq: '==', ast.NotEq: '!='}
+_BINARY_OPS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}
+
+
+class RuleError(ValueError):
+    """
+    Regla con sintaxis o nombres no permitidos
+    """
+
+
+class _Translator:
+    """
+    Traduce una expresión de regla a una expresión de NumPy
+
+    Solo se aceptan comparaciones, and/or/not, aritmética, números,
+    columnas, parámetros y las funciones prev(), cross_above(),
+    cross_below() y abs(). Los parámetros se reemplazan por su valor.
+    Cada nodo se traduce junto con su tipo (booleano o numérico), así que
+    mezclar los dos (por ejemplo `close and rsi`) es un error de la regla.
+    """
+
+    def __init__(self, params):
+        self.params = params
+        self.columns = set()
+        # Mayor desfase pedido con prev() por columna y pares (columna, desfase) usados
+        self.lags = {}
+        self.shifted = set()
+
+    def translate(self, source):
+        try:
+            tree = ast.parse(source, mode='eval')
+        except SyntaxError as e:
+            raise RuleError(f"Regla inválida {source!r}: {e.msg}") from None
+        columns = set(self.columns)
+        self.columns = set()
+        expression = self.boolean(tree.body, source)
+        if not self.columns:
+            raise RuleError(f"La regla {source!r} no lee ninguna columna")
+        self.columns |= columns
+        return expression
+
+    def boolean(self, node, source):
+        expression, is_bool = self.visit(node, source)
+        if not is_bool:
+            raise RuleError(f"Se esperaba una condición (comparación, and/or/not o cruce) en {source!r}: "
+                            f"{ast.unparse(node)!r} es numérico")
+        return expression
+
+    def number(self, node, source):
+        expression, is_bool = self.visit(node, source)
+        if is_bool:
+            raise RuleError(f"Se esperaba un valor numérico en {source!r}: {ast.unparse(node)!r} es una condición")
+        return expression
+
+    @staticmethod
+    def constant(value):
+        # inf y nan no son literales de Python: se emiten como constantes de NumPy
+        value = float(value)
+        if np.isnan(value):
+            return 'np.nan'
+        if np.isinf(value):
+            return 'np.inf' if value > 0 else '(-np.inf)'
+        return repr(value)
+
+    def visit(self, node, source):
+        """
+        Returns:
+            tuple: (str, bool) expresión de NumPy y si es booleana
+        """
+        if isinstance(node, ast.BoolOp):
+            operator = ' & ' if isinstance(node.op, ast.And) else ' | '
+            return '(' + operator.join(self.boolean(value, source) for value in node.values) + ')', True
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return f"(~{self.boolean(node.operand, source)})", True
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return f"(-{self.number(node.operand, source)})", False
+        if isinstance(node, ast.Compare):
+            # a < b < c se evalúa como (a < b) & (b < c)
+            operands = [node.left] + node.comparators
+            parts = []
+            for left, op, right in zip(operands, node.ops, operands[1:]):
+                if type(op) not in _COMPARE_OPS:
+                    raise RuleError(f"Comparación no permitida en {source!r}")
+                parts.append(f"({self.number(left, source)} {_COMPARE_OPS[type(op)]} {self.number(right, source)})")
+            return (parts[0] if len(parts) == 1 else '(' + ' & '.join(parts) + ')'), True
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            return (f"({self.number(node.left, source)} {_BINARY_OPS[type(node.op)]} "
+                    f"{self.number(node.right, source)})"), False
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return self.constant(node.value), False
+        if isinstance(node, ast.Name):
+            return self.name(node.id, source), False
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            return self.call(node.func.id, node.args, source)
+        raise RuleError(f"Expresión no permitida en {source!r}: {ast.dump(node)[:60]}")
+
+    def name(self, name, source, lag=0):
+        if name in rule_columns():
+            self.columns.add(name)
+            if lag:
+                self.lags[name] = max(self.lags.get(name, 0), lag)
+                self.shifted.add((name, lag))
+                return f"{name}__prev{lag}"
+            return name
+        if lag:
+            raise RuleError(f"prev() solo admite columnas en {source!r}")
+        if name in self.params:
+            value = self.params[name]
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise RuleError(f"El parámetro {name} debe ser numérico")
+            return self.constant(value)
+        raise RuleError(f"Nombre desconocido {name!r} en {source!r}")
+
+    def call(self, function, args, source):
+        """
+        Returns:
+            tuple: (str, bool) expresión de NumPy y si es booleana
+        """
+        if function == 'prev':
+            if not 1 <= len(args) <= 2 or not isinstance(args[0], ast.Name):
+                raise RuleError(f"Uso: prev(columna[, velas]) en {source!r}")
+            lag = 1
+            if len(args) == 2:
+                if not (isinstance(args[1], ast.Constant) and isinstance(args[1].value, int) and args[1].value >= 1):
+                    raise RuleError(f"El desfase de prev() debe ser un entero positivo en {source!r}")
+                lag = args[1].value
+            return self.name(args[0].id, source, lag), False
+        if function in ('cross_above', 'cross_below'):
+            if len(args) != 2 or not all(isinstance(arg, ast.Name) for arg in args):
+                raise RuleError(f"Uso: {function}(columna, columna) en {source!r}")
+            a, b = (arg.id for arg in args)
+            # Mismo criterio que el bot: en la vela anterior no estaba del otro lado
+            before, now = ('<=', '>') if function == 'cross_above' else ('>=', '<')
+            return (f"(({self.name(a, source, 1)} {before} {self.name(b, source, 1)}) & "
+                    f"({self.name(a, source)} {now} {self.name(b, source)}))"), True
+        if function == 'abs':
+            if len(args) != 1:
+                raise RuleError(f"Uso: abs(expresión) en {source!r}")
+            return f"np.abs({self.number(args[0], source)})", False
+        raise RuleError(f"Función desconocida {function!r} en {source!r}")
+
+
+def _carried(prev, name, lag, shape):
+    """
+    Últimos `lag` valores de una columna en el bloque anterior (NaN si no hay)
+    """
+    carried = None if prev is None else prev.get(name)
+    if carried is None:
+        return np.full(shape + (lag,), np.nan)
+    # Un escalar (o un valor por serie) vale como el último valor
+    carried = np.asarray(carried, dtype=float)
+    if carried.ndim <= len(shape):
+        carried = carried[..., None]
+    if carried.shape[-1] < lag:
+        padding = np.full(carried.shape[:-1] + (lag - carried.shape[-1],), np.nan)
+        carried = np.concatenate((padding, carried), axis=-1)
+    return np.broadcast_to(carried[..., carried.shape[-1] - lag:], shape + (lag,))
+
+
+def _prev(columns, prev, name, lag):
+    """
+    Valores de una columna `lag` velas antes (con los del bloque anterior al inicio)
+    """
+    values = np.asarray(columns[name], dtype=float)
+    count = values.shape[-1]
+    out = np.empty(values.shape, dtype=float)
+    head = min(lag, count)
+    out[..., :head] = _carried(prev, name, lag, values.shape[:-1])[..., :head]
+    out[..., head:] = values[..., :count - head]
+    return out
+
+
+class RuleSet:
+    def __init__(self, rules=None, params=None):
+        """
+        Reglas de señales compiladas a expresiones de NumPy
+
+        Cada condición se traduce una sola vez a una expresión vectorizada
+        (los parámetros quedan como constantes) y todas las condiciones de un
+        tipo de señal se compilan en una única función. La misma función
+        evalúa una serie completa (backtests, una matriz de pares x velas) o
+        solo las últimas velas (bot en vivo).
+
+        Sintaxis de las condiciones: comparaciones (<, <=, >, >=, ==, !=,
+        encadenadas), and/or/not, + - * /, números, columnas de velas e
+        indicadores, parámetros, prev(columna[, velas]),
+        cross_above(a, b), cross_below(a, b) y abs().
+
+        Args:
+            rules (dict): Reglas con el formato de PECETO_RULES (por defecto, esas)
+            params (dict): Valores que reemplazan a los de rules['params']
+        """
+        rules = PECETO_RULES if rules is None else rules
+        self.rules = rules
+        self.params = {**rules.get('params', {}), **(params or {})}
+        self.conditions = {}
+        self.min_conditions = {}
+        self.columns = {}
+        self.sources = {}
+        self.lags = {}
+        self._functions = {}
+        for signal_type in SIGNAL_TYPES:
+            side = rules.get(signal_type)
+            if side is None:
+                continue
+            conditions = side.get('conditions', {})
+            if not conditions:
+                raise RuleError(f"{signal_type} no tiene condiciones")
+            translator = _Translator(self.params)
+            expressions = [translator.translate(source) for source in conditions.values()]
+            self.conditions[signal_type] = tuple(conditions)
+            self.min_conditions[signal_type] = int(side.get('min_conditions', len(conditions)))
+            self.columns[signal_type] = tuple(name for name in rule_columns() if name in translator.columns)
+            for name, lag in translator.lags.items():
+                self.lags[name] = max(self.lags.get(name, 0), lag)
+            # Cada columna y cada desfase se leen una sola vez por evaluación
+            loads = [f"    {name} = columns[{name!r}]\n" for name in sorted(translator.columns)]
+            loads += [f"    {name}__prev{lag} = _prev(columns, prev, {name!r}, {lag})\n"
+                      for name, lag in sorted(translator.shifted)]
+            self.sources[signal_type] = (
+                "def _conditions(columns, prev):\n" + "".join(loads) + "    return (\n"
+                + "".join(f"        {expression},\n" for expression in expressions)
+                + "    )\n"
+            )
+            namespace = {'np': np, '_prev': _prev}
+            exec(compile(self.sources[signal_type], f"<reglas {signal_type}>", 'exec'), namespace)
+            self._functions[signal_type] = namespace['_conditions']
+        # Velas necesarias para evaluar la última (la propia más el mayor desfase)
+        self.window = 1 + max(self.lags.values(), default=0)
+        self._check()
+
+    def _check(self):
+        """
+        Evalúa las reglas una vez sobre velas de prueba para que los errores
+        aparezcan al cargarlas (como RuleError) y no en la primera vela
+        """
+        columns = {name: np.linspace(1.0, 2.0, self.window + 1) for name in self.all_columns}
+        for signal_type in self.signal_types:
+            try:
+                with np.errstate(all='ignore'):
+                    values = self.evaluate(columns, signal_type)
+            except Exception as e:
+                raise RuleError(f"Las reglas de {signal_type} no pueden evaluarse: {e}") from None
+            for name, value in values.items():
+                if value.dtype != bool:
+                    raise RuleError(f"La condición {name} de {signal_type} no es booleana")
+
+    @classmethod
+    def from_file(cls, path, params=None):
+        """
+        Carga reglas desde un archivo JSON con el formato de PECETO_RULES
+        """
+        with open(path, encoding='utf-8') as file:
+            return cls(json.load(file), params)
+
+    @property
+    def signal_types(self):
+        return tuple(self.conditions)
+
+    @property
+    def all_columns(self):
+        """
+        Columnas que leen todas las reglas, en el orden de rule_columns()
+        """
+        needed = {name for columns in self.columns.values() for name in columns}
+        return tuple(name for name in rule_columns() if name in needed)
+
+    def evaluate(self, columns, signal_type, prev=None):
+        """
+        Condiciones de un tipo de señal en todas las velas
+
+        Args:
+            columns (dict): Arreglos por columna (el tiempo en el último eje)
+            signal_type (str): "COMPRA" o "VENTA"
+            prev (dict): Últimos valores del bloque anterior por columna
+                (ver carry()); None al inicio de la serie
+
+        Returns:
+            dict: Arreglo booleano por condición
+        """
+        values = self._functions[signal_type](columns, prev)
+        shape = np.shape(columns[self.columns[signal_type][0]])
+        return {name: np.broadcast_to(value, shape) for name, value in zip(self.conditions[signal_type], values)}
+
+    def carry(self, columns, prev=None):
+        """
+        Valores a pasar como `prev` al evaluar el bloque siguiente
+
+        Args:
+            columns (dict): Arreglos por columna del bloque actual
+            prev (dict): prev usado con el bloque actual (por si es más corto que el desfase)
+
+        Returns:
+            dict: Últimos valores por columna usada con prev()
+        """
+        carried = {}
+        for name, lag in self.lags.items():
+            values = np.asarray(columns[name], dtype=float)
+            if values.shape[-1] < lag:
+                values = np.concatenate((_carried(prev, name, lag, values.shape[:-1]), values), axis=-1)
+            carried[name] = values[..., values.shape[-1] - lag:]
+        return carried
+
+    def strength(self, conditions):
+        """
+        Cantidad de condiciones cumplidas en cada vela
+        """
+        return np.sum([conditions[name] for name in conditions], axis=0, dtype=np.int64)
+
+    def signals(self, columns, prev=None):
+        """
+        Señales de compra y venta de cada vela tras priorizar la más fuerte
+
+        Returns:
+            tuple: (np.ndarray, np.ndarray) señales booleanas de compra y de venta
+        """
+        shape = np.shape(columns[self.all_columns[0]])
+        strength = {}
+        active = {}
+        for signal_type in SIGNAL_TYPES:
+            if signal_type in self.conditions:
+                strength[signal_type] = self.strength(self.evaluate(columns, signal_type, prev))
+                active[signal_type] = strength[signal_type] >= self.min_conditions[signal_type]
+            else:
+                strength[signal_type] = np.zeros(shape, dtype=np.int64)
+                active[signal_type] = np.zeros(shape, dtype=bool)
+        buy, sell = active['COMPRA'], active['VENTA']
+        both = buy & sell
+        # Ante empate gana la venta, como en process_signals()
+        return (buy & ~(both & (strength['COMPRA'] <= strength['VENTA'])),
+                sell & ~(both & (strength['COMPRA'] > strength['VENTA'])))
+
+    def evaluate_window(self, columns, signal_type):
+        """
+        Condiciones de un tipo de señal en la última posición de arreglos 1-D
+
+        Args:
+            columns (dict): Últimas `window` velas de cada columna
+            signal_type (str): "COMPRA" o "VENTA"
+
+        Returns:
+            tuple: bool por condición, en el orden de conditions[signal_type]
+        """
+        return tuple(bool(value[-1]) for value in self._functions[signal_type](columns, None))
+
+    def evaluate_last(self, data, signal_type):
+        """
+        Condiciones de un tipo de señal en la última vela de un DataFrame
+
+        Solo se evalúan las últimas `window` velas.
+
+        Args:
+            data (pd.DataFrame): DataFrame con velas e indicadores
+            signal_type (str): "COMPRA" o "VENTA"
+
+        Returns:
+            dict: bool por condición
+        """
+        columns = {name: data[name].to_numpy(dtype=float)[-self.window:] for name in self.columns[signal_type]}
+        return dict(zip(self.conditions[signal_type], self.evaluate_window(columns, signal_type)))
+
+
+if __name__ == "__main__":
+    from backtest import signal_conditions
+    from candle_store import CandleStore
+    from indicators import compute_indicators
+
+    parser = argparse.ArgumentParser(description="Compila reglas de señales y las compara con la estrategia Peceto")
+    parser.add_argument('--rules', help="Archivo JSON de reglas (por defecto, las de la estrategia Peceto)")
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--data-dir', default='data/klines', help="Directorio del almacenamiento local de velas")
+    parser.add_argument('--show-code', action='store_true', help="Mostrar el código generado")
+    parser.add_argument('--export', help="Guardar las reglas de la estrategia Peceto en un archivo JSON y salir")
+    args = parser.parse_args()
+
+    if args.export:
+        with open(args.export, 'w', encoding='utf-8') as file:
+            json.dump(PECETO_RULES, file, ensure_ascii=False, indent=2)
+        print(f"Reglas guardadas en {args.export}")
+        raise SystemExit
+
+    rule_set = RuleSet.from_file(args.rules) if args.rules else RuleSet()
+    if args.show_code:
+        for signal_type, source in rule_set.sources.items():
+            print(f"# {signal_type}\n{source}")
+
+    candles = CandleStore(args.data_dir).load(args.symbol, args.interval)
+    columns = compute_indicators(candles['high'], candles['low'], candles['close'])
+    columns.update({name: np.asarray(candles[name], dtype=float) for name in BASE_COLUMNS})
+
+    started = time.perf_counter()
+    compiled = {signal_type: rule_set.evaluate(columns, signal_type) for signal_type in rule_set.signal_types}
+    compiled_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    buy, sell = signal_conditions(columns, columns['close'], rule_set.params.get('rsi_oversold', 30),
+                                  rule_set.params.get('rsi_overbought', 70))
+    manual_ms = (time.perf_counter() - started) * 1000
+
+    rows = []
+    for signal_type, manual in (('COMPRA', buy), ('VENTA', sell)):
+        for name, values in compiled.get(signal_type, {}).items():
+            same = np.array_equal(values, manual[name]) if name in manual else '-'
+            rows.append([signal_type, name, int(np.count_nonzero(values)), same])
+    print(f"{len(candles)} velas de {args.symbol} {args.interval} | reglas: {compiled_ms:.1f} ms | "
+          f"signal_conditions: {manual_ms:.1f} ms")
+    print(tabulate(rows, headers=["Señal", "Condición", "Velas", "Igual a Peceto"], tablefmt="grid"))
@@ -0,0 +1,314 @@
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+from candle_store import CandleStore, interval_to_ms
+from clock import SystemClock
+from indicator_registry import indicator_columns
+from strategies import PecetoStrategy, RuleStrategy
+from symbol_pool import evaluate_symbols
+
+logger = logging.getLogger('prediction_bot')
+
+# Columnas de velas que pueden leer las reglas
+CANDLE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def fetch_universe(client, quote='USDT'):
+    """
+    Lista los pares spot en operación de una moneda de cotización
+
+    Args:
+        client (binance.client.Client): Cliente de Binance
+        quote (str): Moneda de cotización
+
+    Returns:
+        list: Pares ordenados alfabéticamente
+    """
+    info = client.get_exchange_info()
+    return sorted(
+        symbol['symbol'] for symbol in info['symbols']
+        if symbol.get('status') == 'TRADING' and symbol.get('quoteAsset') == quote
+        and symbol.get('isSpotTradingAllowed', True)
+    )
+
+
+class MarketScanner:
+    def __init__(self, store, client=None, interval='15m', limit=200, min_candles=100,
+                 strategy=None, params=None, workers=8, clock=None):
+        """
+        Evalúa la estrategia en la última vela cerrada de todos los pares a la vez
+
+        Las velas salen del almacenamiento local; con cliente, antes de cada
+        escaneo se descargan solo las velas cerradas que faltan (en hilos) y
+        se agregan al almacenamiento, así que después del primer escaneo
+        cada par cuesta a lo sumo una petición corta. Los indicadores de
+        todos los pares se calculan en lotes 2-D (symbol_pool.evaluate_symbols)
+        y las condiciones se evalúan una sola vez sobre matrices pares x velas.
+
+        Args:
+            store (CandleStore): Almacenamiento local de velas
+            client: Cliente con get_klines/get_exchange_info (None para usar solo el almacenamiento)
+            interval (str): Intervalo de las velas
+            limit (int): Velas por par para calcular los indicadores
+            min_candles (int): Los pares con menos velas se omiten
+            strategy (RuleStrategy): Reglas de las señales (por defecto, PecetoStrategy)
+            params (dict): Periodos de EMAs y RSI (por defecto, los de Peceto)
+            workers (int): Hilos para las descargas
+            clock: Reloj con now/time/sleep (por defecto, SystemClock)
+        """
+        self.store = store
+        self.client = client
+        self.interval = interval
+        self.interval_ms = interval_to_ms(interval)
+        self.limit = limit
+        self.min_candles = min_candles
+        self.strategy = strategy if strategy is not None else PecetoStrategy()
+        self.params = params or {}
+        self.workers = workers
+        self.clock = clock if clock is not None else SystemClock()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.running = False
+        self.elapsed = None
+
+        rule_set = self.strategy.rule_set
+        # Indicadores que leen las reglas más los que se muestran en la tabla
+        self.columns = [name for name in indicator_columns()
+                        if name in rule_set.all_columns or name in ('rsi', 'macd')]
+
+    def universe(self, quote='USDT'):
+        """
+        Pares a escanear: los del exchange con cliente, los almacenados sin él
+        """
+        if self.client is not None:
+            return fetch_universe(self.client, quote)
+        return [symbol for symbol in self.store.symbols()
+                if symbol.endswith(quote) and self.store.exists(symbol, self.interval)]
+
+    def refresh(self, symbols):
+        """
+        Descarga las velas cerradas que faltan de cada par (el almacenamiento es la caché)
+
+        Returns:
+            int: Cantidad de pares actualizados desde Binance
+        """
+        if self.client is None:
+            return 0
+        now = int(self.clock.time() * 1000)
+
+        def update(symbol):
+            last = self.store.last_open_time(symbol, self.interval)
+            # Al día si la vela siguiente a la última almacenada todavía no cerró
+            if last is not None and last + 2 * self.interval_ms > now:
+                return False
+            # Desde la vela siguiente a la última almacenada, aunque falten más de `limit`
+            # (empezar en las últimas `limit` dejaría un hueco en el almacenamiento)
+            start = now - (self.limit + 1) * self.interval_ms if last is None else last + self.interval_ms
+            try:
+                # Con el reloj del escáner: la vela en formación no debe quedar almacenada
+                self.store.download(self.client, symbol, self.interval, start, now=now)
+            except Exception as e:
+                logger.error(f"Error al descargar velas de {symbol} {self.interval}: {e}")
+                return False
+            return True
+
+        return sum(self.executor.map(update, symbols))
+
+    def load(self, symbols):
+        """
+        Últimas `limit` velas de cada par desde el almacenamiento local
+
+        La columna 'timestamp' del escaneo muestra la vela usada, por si el
+        almacenamiento de un par quedó atrasado.
+
+        Returns:
+            dict: Registros KLINE_DTYPE por par (sin los pares con pocas velas)
+        """
+        candles = {}
+        for symbol in symbols:
+            # Vista mapeada en memoria: solo se copian las últimas velas
+            rows = self.store.load(symbol, self.interval)[-self.limit:]
+            if len(rows) >= self.min_candles:
+                candles[symbol] = np.array(rows)
+        return candles
+
+    def evaluate(self, candles):
+        """
+        Condiciones de compra y venta en la última vela de todos los pares
+
+        Args:
+            candles (dict): Registros KLINE_DTYPE por par
+
+        Returns:
+            pd.DataFrame: Una fila por par con fuerza, condiciones (bits), señal e indicadores
+        """
+        symbols = list(candles)
+        # En este proceso: levantar un pool en cada escaneo cuesta más que el cálculo
+        values = evaluate_symbols(candles, self.params, self.columns, workers=1)
+        rule_set = self.strategy.rule_set
+        window = rule_set.window
+
+        # Matrices pares x últimas velas con todo lo que leen las reglas
+        columns = {name: np.stack([candles[symbol][name][-window:] for symbol in symbols]).astype(float)
+                   for name in CANDLE_FIELDS}
+        columns.update((name, np.stack([values[symbol][name][-window:] for symbol in symbols]))
+                       for name in self.columns)
+
+        result = pd.DataFrame({
+            'symbol': symbols,
+            'timestamp': pd.to_datetime([int(candles[symbol]['open_time'][-1]) for symbol in symbols], unit='ms'),
+            'price': columns['close'][:, -1],
+        })
+        for signal_type, prefix in (('COMPRA', 'buy'), ('VENTA', 'sell')):
+            if signal_type not in rule_set.conditions:
+                result[f'{prefix}_strength'] = 0
+                result[f'{prefix}_conditions'] = 0
+                continue
+            conditions = [value[:, -1] for value in rule_set.evaluate(columns, signal_type).values()]
+            result[f'{prefix}_strength'] = np.sum(conditions, axis=0, dtype=np.int64)
+            result[f'{prefix}_conditions'] = np.sum(
+                [condition.astype(np.int64) << position for position, condition in enumerate(conditions)],
+                axis=0, dtype=np.int64
+            )
+        buy, sell = (signal[:, -1] for signal in rule_set.signals(columns))
+        result['signal'] = np.where(buy, 'COMPRA', np.where(sell, 'VENTA', None))
+        result['rsi'] = columns['rsi'][:, -1]
+        result['macd'] = columns['macd'][:, -1]
+        result['quote_volume'] = [float(candles[symbol]['quote_asset_volume'].sum()) for symbol in symbols]
+        return result
+
+    def scan(self, symbols=None, side=None, min_strength=None):
+        """
+        Escanea los pares y los ordena por fuerza de la señal
+
+        Args:
+            symbols (list): Pares a escanear (por defecto, todo el universo)
+            side (str): "COMPRA" o "VENTA" para ordenar y filtrar por ese lado
+                (por defecto, la mayor fuerza de los dos)
+            min_strength (int): Fuerza mínima para aparecer en el resultado
+
+        Returns:
+            pd.DataFrame: Pares ordenados por fuerza y, a igual fuerza, por volumen
+        """
+        started = time.perf_counter()
+        symbols = self.universe() if symbols is None else symbols
+        self.refresh(symbols)
+        candles = self.load(symbols)
+        if not candles:
+            self.elapsed = time.perf_counter() - started
+            return pd.DataFrame(columns=['symbol', 'timestamp', 'price', 'buy_strength', 'buy_conditions',
+                                         'sell_strength', 'sell_conditions', 'signal', 'rsi', 'macd',
+                                         'quote_volume', 'strength'])
+
+        result = self.evaluate(candles)
+        if side == 'COMPRA':
+            result['strength'] = result['buy_strength']
+        elif side == 'VENTA':
+            result['strength'] = result['sell_strength']
+        else:
+            result['strength'] = result[['buy_strength', 'sell_strength']].max(axis=1)
+        if min_strength is not None:
+            result = result[result['strength'] >= min_strength]
+        result = result.sort_values(['strength', 'quote_volume'], ascending=False, ignore_index=True)
+        self.elapsed = time.perf_counter() - started
+        return result
+
+    def next_delay(self):
+        """
+        Segundos hasta unos instantes después del cierre de la próxima vela
+        """
+        now = self.clock.time()
+        interval = self.interval_ms / 1000
+        return interval - now % interval + 2
+
+    def stop(self):
+        """
+        Detiene el escaneo periódico al terminar el ciclo en curso
+        """
+        self.running = False
+
+    def run(self, callback, symbols=None, side=None, min_strength=None):
+        """
+        Escanea después de cada cierre de vela hasta que se llame a stop()
+
+        Args:
+            callback (callable): Función que recibe el resultado de cada escaneo
+        """
+        self.running = True
+        try:
+            while self.running:
+                try:
+                    callback(self.scan(symbols, side, min_strength))
+                except Exception as e:
+                    logger.error(f"Error en el escaneo de {self.interval}: {e}")
+                if self.running:
+                    self.clock.sleep(self.next_delay())
+        except KeyboardInterrupt:
+            print("\n\nEscaneo detenido manualmente.")
+        finally:
+            self.executor.shutdown(wait=False)
+
+
+def format_scan(result, top=20):
+    """
+    Tabla de los primeros pares de un escaneo
+
+    Returns:
+        str: Tabla en formato grid
+    """
+    rows = []
+    for position, row in enumerate(result.head(top).itertuples(), start=1):
+        rows.append([
+            position, row.symbol, row.timestamp, f"{row.price:.6g}",
+            f"{row.buy_strength}", f"{row.sell_strength}", row.signal or "-",
+            f"{row.rsi:.2f}", f"{row.quote_volume:,.0f}",
+        ])
+    return tabulate(rows, headers=["#", "Par", "Vela", "Precio", "Compra", "Venta", "Señal", "RSI",
+                                   "Volumen (USDT)"], tablefmt="grid")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Escáner de la estrategia Peceto sobre todos los pares")
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--symbols', nargs='+', help="Pares a escanear (por defecto, todos los del exchange)")
+    parser.add_argument('--quote', default='USDT', help="Moneda de cotización del universo")
+    parser.add_argument('--side', choices=['COMPRA', 'VENTA'], help="Ordenar y filtrar por un lado")
+    parser.add_argument('--min-strength', type=int, help="Fuerza mínima para mostrar un par")
+    parser.add_argument('--top', type=int, default=20, help="Pares a mostrar")
+    parser.add_argument('--rules', help="Archivo JSON de reglas (por defecto, Peceto)")
+    parser.add_argument('--limit', type=int, default=200, help="Velas por par")
+    parser.add_argument('--workers', type=int, default=8, help="Hilos para las descargas")
+    parser.add_argument('--data-dir', default='data/klines', help="Directorio del almacenamiento local de velas")
+    parser.add_argument('--offline', action='store_true', help="Usar solo las velas almacenadas")
+    parser.add_argument('--watch', action='store_true', help="Repetir el escaneo en cada cierre de vela")
+    args = parser.parse_args()
+
+    client = None
+    if not args.offline:
+        from binance.client import Client
+        from decouple import config
+        client = Client(config("BINANCE_API_KEY", default=None), config("BINANCE_API_SECRET", default=None))
+    strategy = None
+    if args.rules:
+        strategy = RuleStrategy(os.path.splitext(os.path.basename(args.rules))[0], args.rules)
+
+    scanner = MarketScanner(CandleStore(args.data_dir), client, args.interval, args.limit,
+                            strategy=strategy, workers=args.workers)
+    symbols = args.symbols
+    if symbols is None:
+        symbols = scanner.universe(args.quote)
+
+    def show(result):
+        print(f"\n[{scanner.clock.now().strftime('%Y-%m-%d %H:%M:%S')}] {len(result)} pares "
+              f"en {scanner.elapsed:.2f}s")
+        if len(result):
+            print(format_scan(result, args.top))
+
+    if args.watch:
+        scanner.run(show, symbols, args.side, args.min_strength)
+    else:
+        show(scanner.scan(symbols, args.side, args.min_strength))
@@ -0,0 +1,351 @@
+import argparse
+import bisect
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+from signal_record import SignalRecord
+from strategies import DISPLAY_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Código del lado de la señal en el registro
+SIDE_CODES = {'COMPRA': 1, 'VENTA': -1}
+SIDE_NAMES = {code: name for name, code in SIDE_CODES.items()}
+
+# Registro binario de ancho fijo de una señal; el par y el intervalo los da el archivo
+SIGNAL_DTYPE = np.dtype([
+    ('open_time', '<i8'),       # Vela de la señal (ms)
+    ('recorded_at', '<i8'),     # Momento en que se registró (ms)
+    ('side', 'i1'),             # 1 = COMPRA, -1 = VENTA
+    ('strength', 'u1'),
+    ('max_strength', 'u1'),
+    ('condition_bits', '<u4'),  # Bit i: i-ésima condición de la estrategia
+    ('price', '<f8'),
+] + [(name, '<f8') for name in DISPLAY_COLUMNS] + [
+    ('strategy', 'S48'),        # Nombre en UTF-8 (make_record rechaza los más largos)
+])
+
+
+def to_ms(value):
+    """
+    Convierte un instante (ms, datetime, Timestamp o texto) a milisegundos
+
+    Returns:
+        int: Timestamp en milisegundos, o None si value es None
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).value // 10**6)
+
+
+class SignalJournal:
+    def __init__(self, root='data/signals'):
+        """
+        Registro persistente de señales: un archivo binario por par e intervalo.
+
+        Igual que CandleStore, cada archivo es una secuencia de registros
+        SIGNAL_DTYPE ordenados por open_time y sin cabecera. Registrar una
+        señal es escribir un registro al final; consultar es mapear el
+        archivo en memoria, acotar el rango de tiempo con búsqueda binaria
+        y filtrar lado, fuerza y estrategia con operaciones vectorizadas.
+
+        Args:
+            root (str): Directorio raíz del registro
+        """
+        self.root = root
+
+    def path(self, symbol, interval):
+        return os.path.join(self.root, symbol, f"{interval}.bin")
+
+    def symbols(self):
+        """
+        Lista los pares con señales registradas
+        """
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def intervals(self, symbol):
+        """
+        Lista los intervalos con señales registradas de un par
+        """
+        directory = os.path.join(self.root, symbol)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.bin'))
+
+    def count(self, symbol, interval):
+        """
+        Cantidad de señales registradas para un par e intervalo
+        """
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // SIGNAL_DTYPE.itemsize
+
+    def last_open_time(self, symbol, interval):
+        """
+        Obtiene la vela de la última señal registrada
+
+        Returns:
+            int: Timestamp en milisegundos, o None si no hay señales
+        """
+        count = self.count(symbol, interval)
+        if count == 0:
+            return None
+        with open(self.path(symbol, interval), 'rb') as file:
+            file.seek((count - 1) * SIGNAL_DTYPE.itemsize)
+            return int(np.frombuffer(file.read(SIGNAL_DTYPE.itemsize), dtype=SIGNAL_DTYPE)['open_time'][0])
+
+    def _tail(self, symbol, interval, count=64):
+        """
+        Últimos registros del archivo, leídos con una sola lectura
+        """
+        path = self.path(symbol, interval)
+        try:
+            with open(path, 'rb') as file:
+                size = file.seek(0, os.SEEK_END)
+                size -= size % SIGNAL_DTYPE.itemsize
+                file.seek(max(0, size - count * SIGNAL_DTYPE.itemsize))
+                data = file.read(min(size, count * SIGNAL_DTYPE.itemsize))
+        except FileNotFoundError:
+            return np.empty(0, dtype=SIGNAL_DTYPE)
+        return np.frombuffer(data, dtype=SIGNAL_DTYPE)
+
+    @staticmethod
+    def check_strategy(strategy):
+        """
+        Verifica que el nombre de una estrategia entre en el registro
+
+        Recortarlo haría que las consultas y la deduplicación lo confundan con
+        otro, así que los nombres largos se rechazan al armar la estrategia.
+
+        Returns:
+            bytes: Nombre codificado en UTF-8
+
+        Raises:
+            ValueError: Si el nombre ocupa más bytes que el campo 'strategy'
+        """
+        encoded = strategy.encode()
+        if len(encoded) > SIGNAL_DTYPE['strategy'].itemsize:
+            raise ValueError(f"Nombre de estrategia demasiado largo para el registro "
+                             f"({len(encoded)} > {SIGNAL_DTYPE['strategy'].itemsize} bytes): {strategy!r}")
+        return encoded
+
+    @staticmethod
+    def make_record(signal_type, details, strategy=None, recorded_at=None):
+        """
+        Convierte los detalles de una señal en un registro SIGNAL_DTYPE
+
+        Args:
+            signal_type (str): "COMPRA" o "VENTA"
+            details (SignalRecord | dict): Detalles de la señal
+            strategy (str): Estrategia que generó la señal (por defecto, la de los detalles)
+            recorded_at: Momento del registro (por defecto, ahora)
+
+        Returns:
+            np.ndarray: Arreglo de un registro
+
+        Raises:
+            ValueError: Si el nombre de la estrategia no entra en el registro
+        """
+        if isinstance(details, SignalRecord):
+            bits = details.condition_bits
+            indicators = dict(zip(details.indicator_names, details.indicator_values))
+        else:
+            bits = SignalRecord.pack(details['conditions'].values())
+            indicators = details['indicators']
+        if strategy is None:
+            strategy = details.get('strategy') or ''
+        encoded = SignalJournal.check_strategy(strategy)
+
+        record = np.zeros(1, dtype=SIGNAL_DTYPE)
+        row = record[0]
+        row['open_time'] = to_ms(details['timestamp'])
+        row['recorded_at'] = int(time.time() * 1000) if recorded_at is None else to_ms(recorded_at)
+        row['side'] = SIDE_CODES[signal_type]
+        row['strength'] = details['strength']
+        row['max_strength'] = details['max_strength']
+        row['condition_bits'] = bits
+        row['price'] = details['price']
+        for name in DISPLAY_COLUMNS:
+            row[name] = indicators.get(name, np.nan)
+        row['strategy'] = encoded
+        return record
+
+    def append(self, symbol, interval, signal_type, details, strategy=None, recorded_at=None):
+        """
+        Registra una señal al final del archivo del par e intervalo
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo de las velas
+            signal_type (str): "COMPRA" o "VENTA"
+            details (SignalRecord | dict): Detalles de la señal
+            strategy (str): Estrategia que generó la señal
+            recorded_at: Momento del registro (por defecto, ahora)
+
+        Returns:
+            bool: True si se registró
+        """
+        record = self.make_record(signal_type, details, strategy, recorded_at)
+        return self.extend(symbol, interval, record) == 1
+
+    def extend(self, symbol, interval, records):
+        """
+        Agrega registros ya armados, manteniendo el archivo ordenado por vela
+
+        Los registros de velas anteriores a la última registrada, y los que
+        repiten lado y estrategia en esa misma vela, se descartan (por
+        ejemplo, al repetir un replay sobre el mismo período).
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo de las velas
+            records (np.ndarray): Registros SIGNAL_DTYPE ordenados por open_time
+
+        Returns:
+            int: Cantidad de registros agregados
+        """
+        records = np.asarray(records, dtype=SIGNAL_DTYPE)
+        tail = self._tail(symbol, interval)
+        if len(tail):
+            last = int(tail['open_time'][-1])
+            older = records['open_time'] < last
+            if older.any():
+                logger.warning(f"{int(older.sum())} señales de {symbol} {interval} anteriores a la última "
+                               f"registrada: descartadas")
+                records = records[~older]
+            stored = {(int(row['side']), bytes(row['strategy'])) for row in tail[tail['open_time'] == last]}
+            repeated = np.array([row['open_time'] == last and (int(row['side']), bytes(row['strategy'])) in stored
+                                 for row in records], dtype=bool)
+            records = records[~repeated]
+        if not len(records):
+            return 0
+
+        path = self.path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as file:
+            file.write(np.ascontiguousarray(records).tobytes())
+        return len(records)
+
+    def load(self, symbol, interval, start=None, end=None):
+        """
+        Obtiene las señales de un rango de tiempo como vista mapeada en memoria
+
+        Args:
+            symbol (str): Par de trading
+            interval (str): Intervalo de las velas
+            start: Vela mínima (incluida), en ms o como fecha
+            end: Vela máxima (excluida), en ms o como fecha
+
+        Returns:
+            np.ndarray: Registros SIGNAL_DTYPE (vacío si no hay señales)
+        """
+        if self.count(symbol, interval) == 0:
+            return np.empty(0, dtype=SIGNAL_DTYPE)
+        array = np.memmap(self.path(symbol, interval), dtype=SIGNAL_DTYPE, mode='r')
+        # bisect lee solo ~log2(n) registros; np.searchsorted copiaría la columna entera
+        # porque los campos de un arreglo estructurado no son contiguos
+        open_times = array['open_time']
+        start, end = to_ms(start), to_ms(end)
+        first = 0 if start is None else bisect.bisect_left(open_times, start)
+        last = len(array) if end is None else bisect.bisect_left(open_times, end)
+        return array[first:last]
+
+    def select(self, symbol, interval, start=None, end=None, side=None, min_strength=None, strategy=None):
+        """
+        Señales de un par e intervalo que cumplen los filtros
+
+        Returns:
+            np.ndarray: Copia de los registros SIGNAL_DTYPE seleccionados
+        """
+        array = self.load(symbol, interval, start, end)
+        mask = np.ones(len(array), dtype=bool)
+        if side is not None:
+            mask &= array['side'] == SIDE_CODES[side]
+        if min_strength is not None:
+            mask &= array['strength'] >= min_strength
+        if strategy is not None:
+            mask &= array['strategy'] == strategy.encode()
+        return array[mask]
+
+    def query(self, symbols=None, intervals=None, start=None, end=None, side=None,
+              min_strength=None, strategy=None):
+        """
+        Consulta señales de varios pares e intervalos
+
+        Args:
+            symbols (list): Pares a consultar (por defecto, todos)
+            intervals (list): Intervalos a consultar (por defecto, todos)
+            start: Vela mínima (incluida), en ms o como fecha
+            end: Vela máxima (excluida), en ms o como fecha
+            side (str): "COMPRA" o "VENTA" (por defecto, ambos)
+            min_strength (int): Fuerza mínima
+            strategy (str): Nombre de la estrategia
+
+        Returns:
+            pd.DataFrame: Una fila por señal, ordenadas por vela
+        """
+        selected, keys, counts = [], [], []
+        for symbol in symbols or self.symbols():
+            for interval in intervals or self.intervals(symbol):
+                records = self.select(symbol, interval, start, end, side, min_strength, strategy)
+                if len(records):
+                    selected.append(records)
+                    keys.append((symbol, interval))
+                    counts.append(len(records))
+
+        records = np.concatenate(selected) if selected else np.empty(0, dtype=SIGNAL_DTYPE)
+        source = np.repeat(np.arange(len(keys)), counts)
+        order = np.argsort(records['open_time'], kind='stable')
+        records, source = records[order], source[order]
+
+        columns = {
+            'symbol': np.array([symbol for symbol, _ in keys], dtype=object)[source],
+            'interval': np.array([interval for _, interval in keys], dtype=object)[source],
+        }
+        columns.update((name, records[name]) for name in SIGNAL_DTYPE.names)
+        columns['open_time'] = records['open_time'].astype('datetime64[ms]')
+        columns['recorded_at'] = records['recorded_at'].astype('datetime64[ms]')
+        columns['side'] = np.where(records['side'] == SIDE_CODES['COMPRA'], 'COMPRA', 'VENTA').astype(object)
+        names = {name: name.decode() for name in set(records['strategy'].tolist())}
+        columns['strategy'] = np.array([names[name] for name in records['strategy'].tolist()], dtype=object)
+        frame = pd.DataFrame(columns).rename(columns={'open_time': 'timestamp'})
+        return frame
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consulta el registro de señales del bot Peceto")
+    parser.add_argument('--symbols', nargs='+', help="Pares a consultar (por defecto, todos)")
+    parser.add_argument('--intervals', nargs='+', help="Intervalos a consultar (por defecto, todos)")
+    parser.add_argument('--start', help="Vela mínima (UTC), por ejemplo 2024-01-01")
+    parser.add_argument('--end', help="Vela máxima (UTC, excluida)")
+    parser.add_argument('--side', choices=sorted(SIDE_CODES))
+    parser.add_argument('--min-strength', type=int)
+    parser.add_argument('--strategy')
+    parser.add_argument('--limit', type=int, default=50, help="Señales a mostrar (las más recientes)")
+    parser.add_argument('--data-dir', default='data/signals', help="Directorio del registro de señales")
+    args = parser.parse_args()
+
+    journal = SignalJournal(args.data_dir)
+    started = time.perf_counter()
+    result = journal.query(args.symbols, args.intervals, args.start, args.end, args.side,
+                           args.min_strength, args.strategy)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(result)} señales en {elapsed * 1000:.1f} ms")
+    if len(result):
+        shown = result.tail(args.limit)
+        print(tabulate(
+            [[row.timestamp, row.symbol, row.interval, row.side, f"{row.price:.2f}",
+              f"{row.strength}/{row.max_strength}", f"{row.rsi:.2f}", row.strategy]
+             for row in shown.itertuples()],
+            headers=["Vela", "Par", "Intervalo", "Tipo", "Precio", "Fuerza", "RSI", "Estrategia"],
+            tablefmt="grid"
+        ))
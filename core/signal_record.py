@@ -0,0 +1,113 @@
+from collections.abc import Mapping
+
+
+class SignalRecord(Mapping):
+    """
+    Resultado compacto de la evaluación de un tipo de señal en una vela
+
+    Las condiciones se guardan como bits de un entero y los indicadores
+    como una tupla de floats; los nombres de ambos son tuplas compartidas
+    por todas las evaluaciones de la misma estrategia, así que cada registro
+    ocupa unos pocos objetos. Se lee como el dict de detalles de antes
+    (record['price'], record['conditions'], record['indicators'], ...):
+    los sub-diccionarios se arman solo cuando se piden (al formatear una
+    alerta, por ejemplo).
+    """
+
+    __slots__ = ('signal_type', 'timestamp', 'price', 'strength', 'max_strength', 'condition_bits',
+                 'condition_names', 'indicator_names', 'indicator_values', 'strategy')
+
+    _KEYS = ('price', 'timestamp', 'strength', 'max_strength', 'conditions', 'indicators')
+
+    def __init__(self, signal_type, timestamp, price, condition_bits, condition_names,
+                 indicator_names=(), indicator_values=(), strategy=None):
+        """
+        Args:
+            signal_type (str): "COMPRA" o "VENTA"
+            timestamp (pd.Timestamp): Vela evaluada
+            price (float): Precio de cierre de la vela
+            condition_bits (int): Bit i encendido si se cumple condition_names[i]
+            condition_names (tuple): Nombres de las condiciones
+            indicator_names (tuple): Nombres de los indicadores informados
+            indicator_values (tuple): Valores de los indicadores en la vela
+            strategy (str): Estrategia que evaluó la señal (opcional)
+        """
+        self.signal_type = signal_type
+        self.timestamp = timestamp
+        self.price = price
+        self.condition_bits = condition_bits
+        self.condition_names = condition_names
+        self.indicator_names = indicator_names
+        self.indicator_values = indicator_values
+        self.strength = bin(condition_bits).count('1')
+        self.max_strength = len(condition_names)
+        self.strategy = strategy
+
+    @staticmethod
+    def pack(values):
+        """
+        Empaqueta booleanos en un entero (el primero en el bit 0)
+        """
+        bits = 0
+        for position, value in enumerate(values):
+            if value:
+                bits |= 1 << position
+        return bits
+
+    @property
+    def conditions(self):
+        return {name: bool(self.condition_bits >> position & 1)
+                for position, name in enumerate(self.condition_names)}
+
+    @property
+    def indicators(self):
+        return dict(zip(self.indicator_names, self.indicator_values))
+
+    def is_met(self, condition):
+        """
+        Indica si se cumple una condición por nombre
+        """
+        return bool(self.condition_bits >> self.condition_names.index(condition) & 1)
+
+    def replace(self, **changes):
+        """
+        Copia del registro con algunos campos cambiados (por ejemplo, strategy)
+        """
+        fields = {
+            'signal_type': self.signal_type,
+            'timestamp': self.timestamp,
+            'price': self.price,
+            'condition_bits': self.condition_bits,
+            'condition_names': self.condition_names,
+            'indicator_names': self.indicator_names,
+            'indicator_values': self.indicator_values,
+            'strategy': self.strategy,
+        }
+        fields.update(changes)
+        return SignalRecord(**fields)
+
+    def to_dict(self):
+        """
+        Detalles como dict con tipos de Python (para JSON o para código que espera el formato anterior)
+        """
+        details = {key: self[key] for key in self}
+        details['price'] = float(self.price)
+        return details
+
+    def __getitem__(self, key):
+        if key in self._KEYS or (key == 'strategy' and self.strategy is not None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self._KEYS
+        if self.strategy is not None:
+            yield 'strategy'
+
+    def __len__(self):
+        return len(self._KEYS) + (self.strategy is not None)
+
+    def __repr__(self):
+        strategy = f", strategy={self.strategy!r}" if self.strategy is not None else ""
+        return (f"SignalRecord({self.signal_type}, {self.timestamp}, price={self.price}, "
+                f"strength={self.strength}/{self.max_strength}{strategy})")
@@ -0,0 +1,377 @@
+import argparse
+import logging
+import os
+from abc import ABC, abstractmethod
+from indicator_registry import indicator_columns
+from rules import PECETO_RULES, RuleSet, rule_columns
+from signal_record import SignalRecord
+
+logger = logging.getLogger('prediction_bot')
+
+# Tipos de señal que puede alertar una estrategia
+SIDES = ('COMPRA', 'VENTA')
+
+# Indicadores que muestran siempre los mensajes de alerta (format_signal_message)
+DISPLAY_COLUMNS = ('ema_short', 'ema_medium', 'ema_long', 'rsi', 'macd', 'macd_signal')
+
+
+class Strategy(ABC):
+    def __init__(self, name, sides=SIDES, cooldown_hours=2):
+        """
+        Base de las estrategias evaluadas sobre un DataFrame de indicadores
+
+        Una estrategia solo decide si hay señal en la última vela: no descarga
+        velas ni calcula indicadores. Las subclases definen `columns` (los
+        indicadores que leen) y deben implementar check_buy_signal y
+        check_sell_signal, con el mismo formato de detalles que
+        PecetoPredictor; si falta alguno, la estrategia no puede crearse.
+
+        Args:
+            name (str): Nombre de la estrategia (se usa en alertas y cooldown)
+            sides (tuple): Tipos de señal que alerta ("COMPRA", "VENTA")
+            cooldown_hours (float): Horas de espera entre alertas del mismo tipo
+        """
+        self.name = name
+        self.sides = tuple(sides)
+        self.cooldown_hours = cooldown_hours
+        self.columns = ()
+
+    @abstractmethod
+    def check_buy_signal(self, data):
+        """
+        Verifica si hay señal de compra en la última vela
+
+        Returns:
+            tuple: (bool, dict) True si hay señal y detalles de la señal
+        """
+
+    @abstractmethod
+    def check_sell_signal(self, data):
+        """
+        Verifica si hay señal de venta en la última vela
+
+        Returns:
+            tuple: (bool, dict) True si hay señal y detalles de la señal
+        """
+
+    def check_signals(self, data):
+        """
+        Verifica compra y venta en la última vela
+
+        Returns:
+            tuple: (bool, dict, bool, dict) señal y detalles de compra y de venta
+        """
+        return self.check_buy_signal(data) + self.check_sell_signal(data)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name!r})"
+
+
+class RuleStrategy(Strategy):
+    def __init__(self, name, rules, params=None, sides=SIDES, cooldown_hours=2):
+        """
+        Estrategia definida por reglas declarativas (ver rules.py)
+
+        Las condiciones se compilan una vez; en cada vela solo se evalúan
+        las últimas velas necesarias (la actual y los desfases de prev()).
+
+        Args:
+            name (str): Nombre de la estrategia
+            rules (dict | RuleSet | str): Reglas, reglas compiladas o ruta a un archivo JSON
+            params (dict): Valores que reemplazan a los parámetros de las reglas
+            sides (tuple): Tipos de señal que alerta
+            cooldown_hours (float): Horas de espera entre alertas del mismo tipo
+        """
+        super().__init__(name, sides, cooldown_hours)
+        if isinstance(rules, str):
+            rules = RuleSet.from_file(rules, params)
+        elif not isinstance(rules, RuleSet):
+            rules = RuleSet(rules, params)
+        self.rule_set = rules
+        # Los mensajes de alerta muestran siempre EMAs, RSI y MACD
+        order = indicator_columns()
+        self.columns = tuple(name for name in order
+                             if name in DISPLAY_COLUMNS or name in rules.all_columns)
+        self.detail_columns = {
+            signal_type: tuple(name for name in order
+                               if name in DISPLAY_COLUMNS or name in rules.columns[signal_type])
+            for signal_type in rules.signal_types
+        }
+        # Columnas que se leen del DataFrame en cada evaluación
+        self.read_columns = tuple(name for name in rule_columns()
+                                  if name == 'close' or name in rules.all_columns or name in self.columns)
+
+    def check_signals(self, data):
+        """
+        Verifica compra y venta en la última vela leyendo las columnas una sola vez
+
+        Args:
+            data (pd.DataFrame): DataFrame con indicadores
+
+        Returns:
+            tuple: (bool, SignalRecord, bool, SignalRecord) señal y detalles de compra
+                y de venta (detalles None si las reglas no definen ese tipo de señal)
+        """
+        rule_set = self.rule_set
+        columns = {name: data[name].to_numpy(dtype=float)[-rule_set.window:] for name in self.read_columns}
+        timestamp = data['timestamp'].iloc[-1]
+        price = float(columns['close'][-1])
+        result = []
+        for signal_type in SIDES:
+            if signal_type not in rule_set.conditions:
+                result += [False, None]
+                continue
+            record = SignalRecord(
+                signal_type, timestamp, price,
+                SignalRecord.pack(rule_set.evaluate_window(columns, signal_type)),
+                rule_set.conditions[signal_type],
+                self.detail_columns[signal_type],
+                tuple(float(columns[name][-1]) for name in self.detail_columns[signal_type]),
+            )
+            result += [record.strength >= rule_set.min_conditions[signal_type], record]
+        return tuple(result)
+
+    def check_buy_signal(self, data):
+        return self.check_signals(data)[:2]
+
+    def check_sell_signal(self, data):
+        return self.check_signals(data)[2:]
+
+
+class PecetoStrategy(RuleStrategy):
+    def __init__(self, name='peceto', rsi_oversold=30, rsi_overbought=70, min_conditions=3,
+                 support_margin=0.01, resistance_margin=0.01, sides=SIDES, cooldown_hours=2):
+        """
+        Estrategia Peceto: 5 condiciones por lado y un mínimo de condiciones cumplidas
+
+        Usa las reglas de rules.PECETO_RULES; con los valores por defecto es
+        la estrategia original del bot.
+
+        Args:
+            name (str): Nombre de la estrategia
+            rsi_oversold (float): Nivel de sobreventa para RSI
+            rsi_overbought (float): Nivel de sobrecompra para RSI
+            min_conditions (int): Condiciones cumplidas necesarias para la señal (de 5)
+            support_margin (float): Distancia máxima a la banda inferior (fracción)
+            resistance_margin (float): Distancia máxima a la banda superior (fracción)
+            sides (tuple): Tipos de señal que alerta (('COMPRA',) para solo largos)
+            cooldown_hours (float): Horas de espera entre alertas del mismo tipo
+        """
+        rules = {
+            'params': PECETO_RULES['params'],
+            **{signal_type: {**PECETO_RULES[signal_type], 'min_conditions': min_conditions}
+               for signal_type in SIDES},
+        }
+        params = {
+            'rsi_oversold': rsi_oversold,
+            'rsi_overbought': rsi_overbought,
+            'support_margin': support_margin,
+            'resistance_margin': resistance_margin,
+        }
+        super().__init__(name, rules, params, sides, cooldown_hours)
+        self.rsi_oversold = rsi_oversold
+        self.rsi_overbought = rsi_overbought
+        self.min_conditions = min_conditions
+        self.support_margin = support_margin
+        self.resistance_margin = resistance_margin
+
+
+class StrategyGroup:
+    def __init__(self, predictor, strategies):
+        """
+        Varias estrategias sobre las velas e indicadores de un mismo predictor
+
+        El predictor descarga las velas y calcula una sola vez por ciclo la
+        unión de los indicadores que leen las estrategias; cada estrategia
+        decide sus señales sobre ese DataFrame y lleva su propio cooldown y
+        sus alertas (etiquetadas con su nombre). Los periodos de EMAs y RSI
+        son los del predictor, compartidos por todas.
+
+        Args:
+            predictor (PecetoPredictor): Predictor que aporta velas, indicadores y alertas
+            strategies (list): Instancias de Strategy (nombres únicos)
+        """
+        names = [strategy.name for strategy in strategies]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Nombres de estrategia repetidos: {names}")
+        if predictor.signal_journal is not None:
+            for name in names:
+                predictor.signal_journal.check_strategy(name)
+        self.predictor = predictor
+        self.strategies = list(strategies)
+        self.running = False
+        # Último envío por (estrategia, tipo de señal) cuando no hay almacén compartido
+        self.last_alerts = {}
+        self.last_signals = {}
+
+        needed = set(predictor.required_columns)
+        for strategy in self.strategies:
+            needed.update(strategy.columns)
+        predictor.required_columns = [name for name in indicator_columns() if name in needed]
+
+    def claim_alert(self, strategy, signal_type, details):
+        """
+        Verifica el cooldown de la estrategia y reserva el envío de una alerta
+
+        Returns:
+            bool: True si la alerta debe enviarse
+        """
+        predictor = self.predictor
+        now = predictor.clock.now()
+        cooldown_seconds = strategy.cooldown_hours * 3600
+        if predictor.cooldown_store is not None:
+            # Cada estrategia tiene su propio cooldown en el almacén compartido
+            return predictor.cooldown_store.try_acquire(
+                predictor.symbol, predictor.interval, f"{signal_type}:{strategy.name}",
+                details['timestamp'], now, cooldown_seconds
+            )
+        last = self.last_alerts.get((strategy.name, signal_type))
+        if last is not None and (now - last).total_seconds() < cooldown_seconds:
+            return False
+        self.last_alerts[(strategy.name, signal_type)] = now
+        return True
+
+    def evaluate(self, strategy, data):
+        """
+        Señales de una estrategia sobre la última vela
+
+        Returns:
+            tuple: (str, dict) tipo de señal a alertar (o None) y sus detalles
+        """
+        buy_signal, buy_details, sell_signal, sell_details = strategy.check_signals(data)
+        buy_signal = buy_signal and 'COMPRA' in strategy.sides
+        sell_signal = sell_signal and 'VENTA' in strategy.sides
+
+        # Priorizar la señal más fuerte si ambas están presentes
+        if buy_signal and sell_signal:
+            if buy_details['strength'] > sell_details['strength']:
+                sell_signal = False
+            else:
+                buy_signal = False
+        if buy_signal:
+            return "COMPRA", buy_details
+        if sell_signal:
+            return "VENTA", sell_details
+        return None, None
+
+    def process_signals(self, data):
+        """
+        Evalúa todas las estrategias sobre datos con indicadores y procesa sus alertas
+
+        Args:
+            data (pd.DataFrame): DataFrame con los indicadores de predictor.required_columns
+
+        Returns:
+            dict: Tipo de señal alertada (o None) por estrategia
+        """
+        predictor = self.predictor
+        alerted = {}
+        for strategy in self.strategies:
+            try:
+                signal_type, details = self.evaluate(strategy, data)
+            except Exception as e:
+                logger.error(f"Error en la estrategia {strategy.name} de {predictor.symbol}: {e}")
+                signal_type, details = None, None
+            alerted[strategy.name] = None
+            if signal_type is None or not self.claim_alert(strategy, signal_type, details):
+                continue
+            if isinstance(details, SignalRecord):
+                details = details.replace(strategy=strategy.name)
+            else:
+                details = dict(details, strategy=strategy.name)
+            message = f"🧩 Estrategia: {strategy.name}\n" + predictor.format_signal_message(signal_type, details)
+            image = predictor.render_chart_image(data, signal_type, details)
+            predictor.alert_aggregator.add(predictor.symbol, predictor.interval, signal_type, details, message, image=image)
+            predictor.record_signal(signal_type, details, strategy=strategy.name)
+            alerted[strategy.name] = signal_type
+            self.last_signals[strategy.name] = signal_type
+            logger.info(f"Señal de {signal_type} de la estrategia {strategy.name} en {predictor.symbol}")
+
+        # Las señales de la vela se agrupan hasta que todos los símbolos la evaluaron
+        predictor.alert_aggregator.mark_evaluated(predictor.symbol, predictor.interval, data['timestamp'].iloc[-1])
+        return alerted
+
+    def run_cycle(self):
+        """
+        Ejecuta un ciclo: datos e indicadores una vez, señales por estrategia y espera
+        """
+        predictor = self.predictor
+        data = predictor.get_historical_klines()
+        if data is None:
+            logger.error("No se pudieron obtener datos históricos. Esperando 1 minuto...")
+            predictor.clock.sleep(60)
+            return
+
+        data = predictor.calculate_indicators(data, predictor.required_columns)
+        self.process_signals(data)
+
+        current_time = predictor.clock.now().strftime("%Y-%m-%d %H:%M:%S")
+        signals = ", ".join(f"{name}: {signal}" for name, signal in self.last_signals.items()) or "Ninguna"
+        print(f"\r[{current_time}] Precio: {data['close'].iloc[-1]:.2f} | {len(self.strategies)} estrategias | "
+              f"Últimas señales: {signals}", end="")
+
+        predictor.clock.sleep(predictor.cycle_delay())
+
+    def stop(self):
+        """
+        Detiene el bucle principal al terminar el ciclo en curso
+        """
+        self.running = False
+
+    def run(self):
+        """
+        Ejecuta el bucle principal con todas las estrategias
+        """
+        predictor = self.predictor
+        logger.info(f"Iniciando {len(self.strategies)} estrategias para {predictor.symbol} {predictor.interval}")
+        print(f"Estrategias {', '.join(strategy.name for strategy in self.strategies)} iniciadas para "
+              f"{predictor.symbol} en intervalos de {predictor.interval}")
+        print(f"Presiona Ctrl+C para detener el bot")
+        print("-"*50)
+
+        self.running = True
+        try:
+            while self.running:
+                try:
+                    self.run_cycle()
+                except Exception as e:
+                    logger.error(f"Error en el ciclo principal: {e}")
+                    predictor.clock.sleep(60)
+        except KeyboardInterrupt:
+            print("\n\nBot detenido manualmente.")
+            logger.info("Bot detenido manualmente")
+
+
+# Variantes de la estrategia Peceto listas para usar desde la línea de comandos
+PRESETS = {
+    'peceto': lambda: PecetoStrategy(),
+    'peceto_4de5': lambda: PecetoStrategy('peceto_4de5', min_conditions=4),
+    'peceto_largos': lambda: PecetoStrategy('peceto_largos', sides=('COMPRA',)),
+    'peceto_rsi_estricto': lambda: PecetoStrategy('peceto_rsi_estricto', rsi_oversold=25, rsi_overbought=75),
+}
+
+
+if __name__ == "__main__":
+    from decouple import config
+    from main import PecetoPredictor
+
+    parser = argparse.ArgumentParser(description="Varias estrategias sobre las velas e indicadores de un par")
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--strategies', nargs='*', default=list(PRESETS), choices=list(PRESETS))
+    parser.add_argument('--rules', nargs='+', default=[],
+                        help="Archivos JSON de reglas (rules.py); cada uno es una estrategia con el nombre del archivo")
+    parser.add_argument('--telegram', action='store_true', help="Enviar alertas por Telegram")
+    args = parser.parse_args()
+
+    predictor = PecetoPredictor(
+        api_key=config("BINANCE_API_KEY"),
+        api_secret=config("BINANCE_API_SECRET"),
+        symbol=args.symbol,
+        interval=args.interval,
+        use_telegram=args.telegram,
+        show_chart=False,
+    )
+    strategies = [PRESETS[name]() for name in args.strategies]
+    strategies += [RuleStrategy(os.path.splitext(os.path.basename(path))[0], path) for path in args.rules]
+    StrategyGroup(predictor, strategies).run()
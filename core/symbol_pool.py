@@ -0,0 +1,320 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from binance.client import Client
+from decouple import config
+from candle_aggregator import AggregatedKlineClient, CandleAggregator
+from indicator_kernels import FUSED_COLUMNS, fused_indicators
+from indicator_registry import indicator_columns, indicator_registry
+from main import PecetoPredictor, logger
+
+# Columnas de velas que necesitan los kernels
+PRICE_FIELDS = ('high', 'low', 'close')
+
+# Tamaño mínimo (pares x velas) de un grupo para repartirlo entre procesos: con
+# menos, pasar las series por memoria compartida cuesta más que calcularlas
+MIN_POOL_CELLS = 50_000
+
+
+def process_executor(workers):
+    """
+    Pool de procesos para evaluate_symbols(processes=True)
+
+    Los procesos se inician con forkserver (o spawn si no está disponible):
+    un fork del proceso principal copiaría los hilos de descarga y los locks
+    que tuvieran tomados en ese momento.
+
+    Args:
+        workers (int): Procesos del pool
+
+    Returns:
+        ProcessPoolExecutor: Pool a reutilizar entre ciclos
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+def _evaluate_shared(block_name, shape, start, stop, params, columns):
+    """
+    Calcula los indicadores de un lote de pares en un proceso del pool
+
+    El bloque de memoria compartida tiene una matriz (pares x velas) por campo
+    de PRICE_FIELDS seguida de una por columna pedida; el lote son las filas
+    [start, stop) y sus resultados se escriben en el mismo bloque, así que
+    entre procesos no se serializa ninguna serie.
+    """
+    block = shared_memory.SharedMemory(block_name)
+    matrix = None
+    try:
+        matrix = np.ndarray(shape, dtype=float, buffer=block.buf)
+        high, low, close = matrix[:len(PRICE_FIELDS), start:stop]
+        values = fused_indicators(high, low, close, columns=columns, **params)
+        for position, name in enumerate(columns, start=len(PRICE_FIELDS)):
+            matrix[position, start:stop] = values[name]
+    finally:
+        # Las vistas del bloque deben liberarse antes de cerrarlo
+        matrix = high = low = close = None
+        block.close()
+
+
+def _evaluate_in_processes(prices, params, columns, pool, size):
+    """
+    Reparte un grupo entre los procesos del pool a través de un bloque de memoria compartida
+    """
+    rows = prices[0].shape[0]
+    shape = (len(PRICE_FIELDS) + len(columns),) + prices[0].shape
+    block = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    matrix = None
+    try:
+        matrix = np.ndarray(shape, dtype=float, buffer=block.buf)
+        matrix[:len(PRICE_FIELDS)] = prices
+        futures = [pool.submit(_evaluate_shared, block.name, shape, start, min(start + size, rows), params, columns)
+                   for start in range(0, rows, size)]
+        for future in futures:
+            future.result()
+        return dict(zip(columns, matrix[len(PRICE_FIELDS):].copy()))
+    finally:
+        matrix = None
+        block.close()
+        block.unlink()
+
+
+def _evaluate_group(prices, params, columns, pool, workers):
+    """
+    Calcula los indicadores de un grupo de pares con velas de igual largo y parámetros
+
+    Las series se apilan en matrices contiguas (pares x velas) para que cada
+    operación de NumPy recorra todo el lote de una vez, y el grupo se parte en
+    un lote contiguo por hilo: los kernels de fused_indicators() liberan el
+    GIL casi todo el tiempo, así que los lotes avanzan en paralelo. Con un
+    ProcessPoolExecutor los lotes pasan por memoria compartida.
+
+    Returns:
+        dict: Matriz (pares x velas) por columna
+    """
+    rows = prices[0].shape[0]
+    if pool is None or workers < 2 or rows < 2:
+        return fused_indicators(*prices, columns=columns, **params)
+
+    size = -(-rows // workers)
+    if isinstance(pool, ProcessPoolExecutor):
+        if prices[0].size < MIN_POOL_CELLS:
+            return fused_indicators(*prices, columns=columns, **params)
+        return _evaluate_in_processes(prices, params, columns, pool, size)
+
+    futures = [pool.submit(fused_indicators, *(field[start:start + size] for field in prices),
+                           columns=columns, **params)
+               for start in range(0, rows, size)]
+    parts = [future.result() for future in futures]
+    return {name: np.concatenate([part[name] for part in parts]) for name in columns}
+
+
+def evaluate_symbols(frames, params=None, columns=None, workers=None, executor=None, processes=False):
+    """
+    Calcula los indicadores de muchos pares repartidos entre hilos
+
+    Los pares se agrupan por largo de la serie y parámetros, y cada grupo se
+    parte en un lote contiguo por hilo (ver _evaluate_group). Las columnas de
+    FUSED_COLUMNS son las del backend 'fused' de indicator_registry; las demás
+    columnas del registro se calculan par por par con indicator_registry.compute().
+
+    Args:
+        frames (dict): DataFrame (o dict de arreglos) de velas por clave (par, o par e intervalo)
+        params (dict | callable): Periodos de EMAs y RSI, o función clave -> periodos
+        columns (list): Columnas del registro a devolver (por defecto, todas)
+        workers (int): Hilos (por defecto, uno por núcleo; con 1 se calcula en este hilo)
+        executor (ThreadPoolExecutor | ProcessPoolExecutor): Pool existente a reutilizar entre ciclos
+        processes (bool): Sin executor, repartir los lotes entre procesos (ver process_executor)
+            en lugar de hilos
+
+    Returns:
+        dict: Columnas de indicadores por clave
+    """
+    columns = indicator_columns() if columns is None else tuple(columns)
+    fused_columns = tuple(name for name in columns if name in FUSED_COLUMNS)
+    extra_columns = [name for name in columns if name not in FUSED_COLUMNS]
+    workers = workers if workers is not None else os.cpu_count() or 1
+    params_for = params if callable(params) else (lambda symbol: params or {})
+
+    groups = {}
+    for symbol, frame in frames.items():
+        symbol_params = params_for(symbol)
+        key = (len(frame['close']), tuple(sorted(symbol_params.items())))
+        groups.setdefault(key, []).append(symbol)
+
+    pool = executor
+    if pool is None and workers > 1 and len(frames) > 1:
+        pool = process_executor(workers) if processes else ThreadPoolExecutor(max_workers=workers)
+    try:
+        results = {}
+        for (_, symbol_params), symbols in groups.items():
+            symbol_params = dict(symbol_params)
+            values = {}
+            if fused_columns:
+                prices = [np.stack([np.asarray(frames[symbol][field], dtype=float) for symbol in symbols])
+                          for field in PRICE_FIELDS]
+                values = _evaluate_group(prices, symbol_params, fused_columns, pool, workers)
+            # Resultados de vuelta por par
+            for row, symbol in enumerate(symbols):
+                results[symbol] = {name: values[name][row] for name in fused_columns}
+                if extra_columns:
+                    results[symbol].update(indicator_registry.compute(frames[symbol], extra_columns, symbol_params))
+        return results
+    finally:
+        if pool is not executor:
+            pool.shutdown()
+
+
+class SymbolPool:
+    def __init__(self, predictors, workers=None, processes=False):
+        """
+        Ejecuta el ciclo de varios predictores desde un solo proceso
+
+        En cada ciclo las velas se descargan en paralelo con hilos, los
+        indicadores de todos los pares se calculan en lotes repartidos entre
+        los mismos hilos y las señales se procesan par por par (gráficos,
+        cooldown y alertas siguen en el hilo principal, como con un predictor solo).
+
+        Args:
+            predictors (list): Instancias de PecetoPredictor (una por par e intervalo)
+            workers (int): Hilos para descargas e indicadores (por defecto, uno por núcleo)
+            processes (bool): Calcular los indicadores en un pool de procesos en lugar de hilos
+        """
+        self.predictors = {(predictor.symbol, predictor.interval): predictor for predictor in predictors}
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.processes = processes
+        # Con processes, el pool se crea en el primer ciclo y se reutiliza en los siguientes
+        self.process_pool = None
+        self.running = False
+        first = next(iter(self.predictors.values()))
+        self.clock = first.clock
+
+    def _params(self, key):
+        predictor = self.predictors[key]
+        return {
+            'ema_short': predictor.ema_short,
+            'ema_medium': predictor.ema_medium,
+            'ema_long': predictor.ema_long,
+            'rsi_period': predictor.rsi_period,
+        }
+
+    def _indicator_executor(self):
+        if not self.processes:
+            return self.executor
+        if self.process_pool is None and self.workers > 1:
+            self.process_pool = process_executor(self.workers)
+        return self.process_pool
+
+    def fetch(self):
+        """
+        Descarga las velas de todos los pares en paralelo
+
+        Returns:
+            dict: DataFrame por (par, intervalo) (se omiten los que fallaron)
+        """
+        keys = list(self.predictors)
+        frames = self.executor.map(lambda key: self.predictors[key].get_historical_klines(), keys)
+        return {key: data for key, data in zip(keys, frames) if data is not None}
+
+    def run_cycle(self):
+        """
+        Ejecuta un ciclo para todos los pares: datos, indicadores, señales y alertas
+        """
+        started = time.perf_counter()
+        frames = self.fetch()
+        if not frames:
+            logger.error("No se pudieron obtener datos históricos. Esperando 1 minuto...")
+            self.clock.sleep(60)
+            return
+
+        columns = sorted({name for predictor in self.predictors.values() for name in predictor.required_columns},
+                         key=indicator_columns().index)
+        values = evaluate_symbols(frames, self._params, columns, self.workers, self._indicator_executor())
+
+        for key, data in frames.items():
+            predictor = self.predictors[key]
+            # Todas las columnas en una sola operación (insertarlas una a una cuesta más que calcularlas)
+            data = pd.concat([data, pd.DataFrame(
+                {name: values[key][name] for name in predictor.required_columns}, index=data.index
+            )], axis=1)
+            try:
+                predictor.process_signals(data)
+            except Exception as e:
+                logger.error(f"Error al procesar las señales de {key[0]} {key[1]}: {e}")
+
+        current_time = self.clock.now().strftime("%Y-%m-%d %H:%M:%S")
+        signals = sum(1 for predictor in self.predictors.values() if predictor.last_signal)
+        print(f"\r[{current_time}] {len(frames)}/{len(self.predictors)} pares evaluados en "
+              f"{time.perf_counter() - started:.2f}s | Pares con señal: {signals}", end="")
+
+        self.clock.sleep(min(predictor.cycle_delay() for predictor in self.predictors.values()))
+
+    def stop(self):
+        """
+        Detiene el bucle principal al terminar el ciclo en curso
+        """
+        self.running = False
+
+    def run(self):
+        """
+        Ejecuta el bucle principal para todos los pares
+        """
+        logger.info(f"Iniciando el bot de predicción para {len(self.predictors)} pares con {self.workers} hilos")
+        print(f"Bot de predicción iniciado para {', '.join(f'{symbol} {interval}' for symbol, interval in self.predictors)}")
+        print(f"Presiona Ctrl+C para detener el bot")
+        print("-"*50)
+
+        self.running = True
+        try:
+            while self.running:
+                try:
+                    self.run_cycle()
+                except Exception as e:
+                    logger.error(f"Error en el ciclo principal: {e}")
+                    self.clock.sleep(60)
+        except KeyboardInterrupt:
+            print("\n\nBot detenido manualmente.")
+            logger.info("Bot detenido manualmente")
+        finally:
+            self.executor.shutdown(wait=False)
+            if self.process_pool is not None:
+                self.process_pool.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bot de predicción Peceto para varios pares desde un solo proceso")
+    parser.add_argument('--symbols', nargs='+', default=['BTCUSDT', 'ETHUSDT', 'BNBUSDT'])
+    parser.add_argument('--intervals', nargs='+', default=['15m'])
+    parser.add_argument('--workers', type=int, help="Hilos de descarga e indicadores (por defecto, uno por núcleo)")
+    parser.add_argument('--processes', action='store_true',
+                        help="Calcular los indicadores en un pool de procesos en lugar de hilos")
+    parser.add_argument('--aggregate', action='store_true',
+                        help="Consultar solo velas de 1m y armar localmente los demás intervalos")
+    parser.add_argument('--telegram', action='store_true', help="Enviar alertas por Telegram")
+    args = parser.parse_args()
+
+    client = None
+    if args.aggregate:
+        client = AggregatedKlineClient(CandleAggregator(Client(config("BINANCE_API_KEY"), config("BINANCE_API_SECRET"))))
+    predictors = [
+        PecetoPredictor(
+            api_key=config("BINANCE_API_KEY"),
+            api_secret=config("BINANCE_API_SECRET"),
+            symbol=symbol,
+            interval=interval,
+            use_telegram=args.telegram,
+            show_chart=False,
+            # Una figura de matplotlib por par e intervalo no escala con muchos pares
+            attach_chart_image=False,
+            client=client,
+        )
+        for symbol in args.symbols
+        for interval in args.intervals
+    ]
+    SymbolPool(predictors, args.workers, args.processes).run()
@@ -0,0 +1,441 @@
+import argparse
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from tabulate import tabulate
+from candle_aggregator import aggregate, bucket_start
+from candle_store import KLINE_DTYPE, CandleStore, array_to_klines, interval_to_ms
+from clock import SystemClock
+
+# Regímenes de precio: deriva y volatilidad del retorno logarítmico por vela
+# (en unidades de la volatilidad base) y multiplicador de volumen
+DEFAULT_REGIMES = {
+    'alcista': {'drift': 0.05, 'volatility': 1.0, 'volume': 1.2},
+    'bajista': {'drift': -0.05, 'volatility': 1.2, 'volume': 1.4},
+    'lateral': {'drift': 0.0, 'volatility': 0.6, 'volume': 0.7},
+    'volatil': {'drift': 0.0, 'volatility': 2.5, 'volume': 2.0},
+}
+
+# Patrones que disparan señales de Peceto: retornos en unidades de la volatilidad
+# base. Una caída escalonada (RSI bajo 30, precio sobre la banda inferior), un
+# tramo que se frena y un rebote: en la última vela el RSI sale de sobreventa y
+# el MACD cruza su señal cerca del soporte. La venta es el simétrico.
+_PULLBACK = np.concatenate([np.tile([-1.5, 0.9], 24), np.full(6, -0.5), [2.0]])
+SIGNAL_PATTERNS = {
+    'COMPRA': _PULLBACK,
+    'VENTA': -_PULLBACK,
+}
+
+# Monedas de cotización reconocidas en los nombres de los pares
+QUOTE_ASSETS = ('USDT', 'FDUSD', 'USDC', 'BUSD', 'TUSD', 'BTC', 'ETH', 'BNB', 'EUR', 'TRY')
+
+# Unidad máxima de los retornos de los patrones (volatilidad por defecto de 15m)
+PATTERN_MAX_UNIT = 0.004
+
+
+def symbol_seed(seed, symbol):
+    """
+    Semilla reproducible e independiente para cada par
+    """
+    return np.random.SeedSequence([0 if seed is None else seed, zlib.crc32(symbol.encode())])
+
+
+class SyntheticMarket:
+    def __init__(self, interval='15m', volatility=None, regimes=None, mean_regime_length=500,
+                 tail_df=4.0, gap_probability=0.0005, gap_size=3.0, missing_probability=0.0,
+                 pattern_rate=0.002, base_volume=1000.0, seed=None):
+        """
+        Generador vectorizado de velas sintéticas con el formato de Binance
+
+        El precio sigue un proceso con cambios de régimen (cadena de Markov
+        con duraciones geométricas): cada régimen tiene su deriva, su
+        volatilidad y su nivel de volumen. Los retornos tienen colas pesadas
+        (t de Student), hay saltos de precio entre velas, velas faltantes
+        opcionales y patrones insertados a propósito que disparan señales de
+        compra y de venta. Todo se calcula con operaciones de NumPy sobre la
+        serie completa, sin bucles por vela.
+
+        Args:
+            interval (str): Intervalo de las velas
+            volatility (float): Desvío del retorno logarítmico por vela en régimen de volatilidad 1
+                (por defecto, 0.4% en 15m escalado con la raíz de la duración del intervalo)
+            regimes (dict): Regímenes con 'drift', 'volatility' y 'volume' (ver DEFAULT_REGIMES)
+            mean_regime_length (float): Duración media de un régimen en velas
+            tail_df (float): Grados de libertad de la t de Student (None para retornos normales)
+            gap_probability (float): Probabilidad de un salto de precio en la apertura de una vela
+            gap_size (float): Desvío de los saltos en unidades de volatility
+            missing_probability (float): Probabilidad de que falte una vela (huecos en la serie)
+            pattern_rate (float): Patrones de señal por vela (0 para no insertarlos)
+            base_volume (float): Volumen medio por vela en unidades del activo
+            seed (int): Semilla (cada par deriva la suya a partir de esta)
+        """
+        self.interval = interval
+        self.interval_ms = interval_to_ms(interval)
+        if volatility is None:
+            volatility = 0.004 * np.sqrt(self.interval_ms / interval_to_ms('15m'))
+        self.volatility = volatility
+        self.regimes = regimes if regimes is not None else DEFAULT_REGIMES
+        self.mean_regime_length = mean_regime_length
+        self.tail_df = tail_df
+        self.gap_probability = gap_probability
+        self.gap_size = gap_size
+        self.missing_probability = missing_probability
+        self.pattern_rate = pattern_rate
+        self.base_volume = base_volume
+        self.seed = seed
+
+        self._drift = np.array([regime['drift'] for regime in self.regimes.values()]) * volatility
+        self._sigma = np.array([regime['volatility'] for regime in self.regimes.values()]) * volatility
+        self._volume = np.array([regime['volume'] for regime in self.regimes.values()])
+
+    def start_state(self, symbol, start=None, count=None, start_price=None):
+        """
+        Estado inicial de la serie de un par
+
+        Args:
+            symbol (str): Par de trading
+            start (int): open_time de la primera vela en ms (por defecto, tal que
+                `count` velas terminen en la vela en formación actual)
+            count (int): Velas previstas, para calcular el inicio por defecto
+            start_price (float): Precio inicial (por defecto, entre 0.01 y 50000 según el par)
+
+        Returns:
+            dict: Estado que consume y actualiza generate()
+        """
+        rng = np.random.default_rng(symbol_seed(self.seed, symbol))
+        if start is None:
+            now = int(time.time() * 1000)
+            start = now - now % self.interval_ms - max((count or 1) - 1, 0) * self.interval_ms
+        if start_price is None:
+            start_price = float(np.exp(rng.uniform(np.log(0.01), np.log(50_000))))
+        return {
+            'rng': rng,
+            'open_time': int(start),
+            'log_price': float(np.log(start_price)),
+            'regime': int(rng.integers(len(self.regimes))),
+            'regime_left': int(rng.geometric(1 / self.mean_regime_length)),
+        }
+
+    def _regime_path(self, rng, n, state):
+        """
+        Régimen de cada vela: segmentos de duración geométrica, cada uno distinto del anterior
+        """
+        count = len(self.regimes)
+        first = min(state['regime_left'], n)
+        segments = max(int((n - first) / self.mean_regime_length * 2) + 2, 1)
+        lengths = rng.geometric(1 / self.mean_regime_length, segments)
+        while first + lengths.sum() < n:
+            lengths = np.concatenate([lengths, rng.geometric(1 / self.mean_regime_length, segments)])
+        if count > 1:
+            steps = rng.integers(1, count, len(lengths))
+        else:
+            steps = np.zeros(len(lengths), dtype=np.int64)
+        regimes = (state['regime'] + np.cumsum(steps)) % count
+
+        path = np.empty(n, dtype=np.int64)
+        path[:first] = state['regime']
+        path[first:] = np.repeat(regimes, lengths)[:n - first]
+
+        # Estado al final del bloque
+        if first >= n:
+            state['regime_left'] -= n
+        else:
+            ends = first + np.cumsum(lengths)
+            last = int(np.searchsorted(ends, n, side='right'))
+            state['regime'] = int(regimes[last])
+            state['regime_left'] = int(ends[last] - n)
+        return path
+
+    def _shocks(self, rng, n):
+        """
+        Retornos estandarizados (varianza 1), con colas pesadas si tail_df está definido
+        """
+        if self.tail_df is None:
+            return rng.standard_normal(n)
+        return rng.standard_t(self.tail_df, n) * np.sqrt((self.tail_df - 2) / self.tail_df)
+
+    def generate(self, n, state, with_patterns=False):
+        """
+        Genera las próximas `n` velas de una serie y avanza su estado
+
+        Args:
+            n (int): Cantidad de velas
+            state (dict): Estado de la serie (ver start_state())
+            with_patterns (bool): Devolver también dónde termina cada patrón de señal
+
+        Returns:
+            np.ndarray: Registros KLINE_DTYPE (menos de `n` si hay velas faltantes);
+                con with_patterns, (velas, marcas) con 1 en la vela final de un
+                patrón de compra, -1 en la de uno de venta y 0 en el resto
+        """
+        rng = state['rng']
+        regime = self._regime_path(rng, n, state)
+        sigma = self._sigma[regime]
+
+        # Retorno dentro de la vela y salto entre el cierre anterior y la apertura
+        returns = self._drift[regime] + sigma * self._shocks(rng, n)
+        gaps = np.zeros(n)
+        # Los eventos raros se sortean por cantidad y posición, sin un número aleatorio por vela
+        positions = rng.integers(0, n, rng.binomial(n, self.gap_probability))
+        gaps[positions] = rng.standard_normal(len(positions)) * self.gap_size * self.volatility
+
+        # Patrones de señal insertados sobre los retornos, sin superponerse
+        patterns = np.zeros(n, dtype=np.int8)
+        length = len(SIGNAL_PATTERNS['COMPRA'])
+        if self.pattern_rate > 0 and n > length:
+            starts = np.unique(rng.integers(0, n - length, rng.binomial(n - length, self.pattern_rate)))
+            starts = starts[np.diff(starts, prepend=-length) >= length]
+            sides = rng.integers(0, 2, len(starts))
+            # Los márgenes de soporte y resistencia de Peceto son porcentuales (1%):
+            # con más volatilidad el patrón se achica para seguir dentro del margen
+            unit = min(self.volatility, PATTERN_MAX_UNIT)
+            templates = np.stack([SIGNAL_PATTERNS['COMPRA'], SIGNAL_PATTERNS['VENTA']]) * unit
+            index = starts[:, None] + np.arange(length)
+            returns[index] = templates[sides]
+            gaps[index] = 0.0
+            patterns[starts + length - 1] = np.where(sides == 0, 1, -1)
+
+        log_close = state['log_price'] + np.cumsum(gaps + returns)
+        log_open = log_close - returns
+        state['log_price'] = float(log_close[-1])
+
+        # Mechas proporcionales a la volatilidad del régimen
+        upper = rng.standard_exponential(n) * sigma * 0.4
+        lower = rng.standard_exponential(n) * sigma * 0.4
+        close = np.exp(log_close)
+        open_ = np.exp(log_open)
+        high = np.maximum(open_, close) * (1 + upper)
+        low = np.minimum(open_, close) * (1 - lower)
+
+        # Volumen: nivel del régimen, más alto en velas de mucho movimiento
+        intensity = np.abs(returns) / sigma
+        volume = self.base_volume * self._volume[regime] * (0.5 + intensity) * np.exp(0.3 * rng.standard_normal(n))
+        taker_share = np.clip(0.5 + 0.25 * np.tanh(returns / sigma) + 0.05 * rng.standard_normal(n), 0.0, 1.0)
+        typical = (high + low + close) / 3
+
+        array = np.empty(n, dtype=KLINE_DTYPE)
+        array['open_time'] = state['open_time'] + np.arange(n, dtype=np.int64) * self.interval_ms
+        array['open'] = open_
+        array['high'] = high
+        array['low'] = low
+        array['close'] = close
+        array['volume'] = volume
+        array['close_time'] = array['open_time'] + self.interval_ms - 1
+        array['quote_asset_volume'] = volume * typical
+        array['number_of_trades'] = np.maximum(volume / self.base_volume * 200, 1).astype(np.int64)
+        array['taker_buy_base_asset_volume'] = volume * taker_share
+        array['taker_buy_quote_asset_volume'] = array['quote_asset_volume'] * taker_share
+        state['open_time'] += n * self.interval_ms
+
+        if self.missing_probability > 0:
+            # Nunca se borra la vela final de un patrón
+            keep = np.ones(n, dtype=bool)
+            keep[rng.integers(0, n, rng.binomial(n, self.missing_probability))] = False
+            keep |= patterns != 0
+            array, patterns = array[keep], patterns[keep]
+        if with_patterns:
+            return array, patterns
+        return array
+
+    def klines(self, symbol, n, start=None, start_price=None, with_patterns=False):
+        """
+        Serie completa de un par
+
+        Args:
+            symbol (str): Par de trading
+            n (int): Cantidad de velas
+            start (int): open_time de la primera vela en ms (por defecto, terminar ahora)
+            start_price (float): Precio inicial
+            with_patterns (bool): Devolver también las marcas de los patrones (ver generate())
+
+        Returns:
+            np.ndarray: Registros KLINE_DTYPE
+        """
+        return self.generate(n, self.start_state(symbol, start, n, start_price), with_patterns)
+
+    def iter_chunks(self, symbol, n, chunk_size=1_000_000, start=None, start_price=None):
+        """
+        Recorre una serie larga en bloques contiguos (memoria proporcional a chunk_size)
+
+        Yields:
+            np.ndarray: Bloques de registros KLINE_DTYPE
+        """
+        state = self.start_state(symbol, start, n, start_price)
+        for offset in range(0, n, chunk_size):
+            yield self.generate(min(chunk_size, n - offset), state)
+
+    def universe(self, symbols, n, start=None):
+        """
+        Series de varios pares con las mismas velas
+
+        Returns:
+            dict: Registros KLINE_DTYPE por par
+        """
+        return {symbol: self.klines(symbol, n, start) for symbol in symbols}
+
+    def write_store(self, store, symbols, n, chunk_size=1_000_000, start=None, workers=1):
+        """
+        Genera series y las escribe en un almacenamiento de velas por bloques
+
+        Cada par tiene su propio archivo y su propia semilla, así que con
+        workers > 1 los pares se generan en procesos separados con el mismo
+        resultado.
+
+        Args:
+            store (CandleStore): Almacenamiento local de velas
+            symbols (list): Pares a generar
+            n (int): Velas por par
+            chunk_size (int): Velas por bloque
+            start (int): open_time de la primera vela en ms
+            workers (int): Procesos
+
+        Returns:
+            int: Velas escritas
+        """
+        if start is None:
+            # Mismo inicio para todos los pares aunque se generen en momentos distintos
+            now = int(time.time() * 1000)
+            start = now - now % self.interval_ms - (n - 1) * self.interval_ms
+        jobs = [(self, store, symbol, n, chunk_size, start) for symbol in symbols]
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                return sum(pool.map(_write_symbol, jobs))
+        return sum(map(_write_symbol, jobs))
+
+
+def _write_symbol(job):
+    market, store, symbol, n, chunk_size, start = job
+    return sum(store.append(symbol, market.interval, chunk)
+               for chunk in market.iter_chunks(symbol, n, chunk_size, start))
+
+
+class SyntheticClient:
+    def __init__(self, symbols=('BTCUSDT',), intervals=('15m',), history=1000, clock=None, **market_kwargs):
+        """
+        Cliente de Binance simulado sobre velas sintéticas
+
+        Expone get_klines, get_symbol_ticker y get_exchange_info con las mismas
+        formas que python-binance, así que puede pasarse como `client` a
+        PecetoPredictor, SymbolPool, CandleStore.download o MarketScanner.
+        Solo se genera el intervalo más corto; los demás se arman agrupando
+        esas velas, así que los precios coinciden entre intervalos como en el
+        exchange. Cada par arranca con `history` velas del intervalo más
+        largo, termina en la vela en formación y la serie se extiende sola a
+        medida que avanza el reloj (real o virtual).
+
+        Args:
+            symbols (list): Pares disponibles
+            intervals (list): Intervalos disponibles (múltiplos del más corto)
+            history (int): Velas iniciales por par en el intervalo más largo
+            clock: Reloj con time() (por defecto, SystemClock)
+            **market_kwargs: Parámetros de SyntheticMarket (seed, volatility, pattern_rate, ...)
+        """
+        self.clock = clock if clock is not None else SystemClock()
+        self.intervals = sorted(intervals, key=interval_to_ms)
+        self.market = SyntheticMarket(self.intervals[0], **market_kwargs)
+        step = self.market.interval_ms
+        for interval in self.intervals:
+            if interval_to_ms(interval) % step:
+                raise ValueError(f"{interval} no es múltiplo de {self.intervals[0]}")
+
+        # Inicio alineado a una vela del intervalo más largo para que la primera esté completa
+        now = int(self.clock.time() * 1000)
+        longest = self.intervals[-1]
+        start = bucket_start(now - (history - 1) * interval_to_ms(longest), longest)
+        count = (now - start) // step + 1
+
+        self.candles = {}
+        self.states = {}
+        self._aggregated = {}
+        for symbol in symbols:
+            state = self.market.start_state(symbol, start)
+            self.candles[symbol] = self.market.generate(count, state)
+            self.states[symbol] = state
+
+    def _base(self, symbol):
+        """
+        Velas del intervalo más corto hasta la que está en formación según el reloj
+        """
+        if symbol not in self.candles:
+            raise ValueError(f"Par no disponible en el cliente sintético: {symbol}")
+        now = int(self.clock.time() * 1000)
+        state = self.states[symbol]
+        if state['open_time'] <= now:
+            missing = (now - state['open_time']) // self.market.interval_ms + 1
+            self.candles[symbol] = np.concatenate([self.candles[symbol], self.market.generate(missing, state)])
+        array = self.candles[symbol]
+        return array[:int(np.searchsorted(array['open_time'], now, side='right'))]
+
+    def _series(self, symbol, interval):
+        base = self._base(symbol)
+        if interval == self.market.interval:
+            return base
+        if interval not in self.intervals:
+            raise ValueError(f"Intervalo no disponible en el cliente sintético: {interval}")
+        # Se reagrupa solo cuando llegaron velas nuevas del intervalo base
+        key = (symbol, interval)
+        cached = self._aggregated.get(key)
+        if cached is None or cached[0] != len(base):
+            cached = (len(base), aggregate(base, interval))
+            self._aggregated[key] = cached
+        return cached[1]
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None, endTime=None, **kwargs):
+        array = self._series(symbol, interval)
+        if endTime is not None:
+            array = array[:int(np.searchsorted(array['open_time'], endTime, side='right'))]
+        # Como la API: desde startTime hacia adelante, o las últimas `limit` velas
+        if startTime is not None:
+            first = int(np.searchsorted(array['open_time'], startTime, side='left'))
+            return array_to_klines(array[first:first + limit])
+        return array_to_klines(array[-limit:])
+
+    def get_symbol_ticker(self, symbol):
+        # Cierre de la vela en formación del intervalo más corto: el último precio
+        return {"symbol": symbol, "price": str(self._base(symbol)['close'][-1])}
+
+    def get_exchange_info(self):
+        symbols = sorted(self.candles)
+        return {"symbols": [
+            {"symbol": symbol, "status": "TRADING", "isSpotTradingAllowed": True,
+             "quoteAsset": next((quote for quote in QUOTE_ASSETS if symbol.endswith(quote)), symbol[-3:])}
+            for symbol in symbols
+        ]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera velas sintéticas en el almacenamiento local")
+    parser.add_argument('--symbols', nargs='+', help="Pares a generar (por defecto, SYN000USDT, SYN001USDT, ...)")
+    parser.add_argument('--count', type=int, default=20, help="Cantidad de pares si no se da --symbols")
+    parser.add_argument('--rows', type=int, default=100_000, help="Velas por par")
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--start', help="Primera vela (UTC); por defecto, terminar en la vela actual")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--volatility', type=float, help="Desvío por vela (por defecto, según el intervalo)")
+    parser.add_argument('--pattern-rate', type=float, default=0.002, help="Patrones de señal por vela")
+    parser.add_argument('--missing', type=float, default=0.0, help="Probabilidad de que falte una vela")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Procesos (uno por par a la vez)")
+    parser.add_argument('--data-dir', default='data/synthetic', help="Directorio del almacenamiento de velas")
+    args = parser.parse_args()
+
+    symbols = args.symbols or [f"SYN{i:03d}USDT" for i in range(args.count)]
+    start = int(np.datetime64(args.start, 'ms').astype(np.int64)) if args.start else None
+    market = SyntheticMarket(args.interval, volatility=args.volatility, pattern_rate=args.pattern_rate,
+                             missing_probability=args.missing, seed=args.seed)
+    store = CandleStore(args.data_dir)
+
+    started = time.perf_counter()
+    written = market.write_store(store, symbols, args.rows, args.chunk_size, start, args.workers)
+    elapsed = time.perf_counter() - started
+
+    size = written * KLINE_DTYPE.itemsize
+    print(f"{written} velas de {len(symbols)} pares en {elapsed:.1f}s ({size / 2**30:.2f} GiB, "
+          f"{size / 2**20 / elapsed if elapsed else 0:.0f} MiB/s)")
+    print(tabulate(
+        [[symbol, store.count(symbol, args.interval), f"{store.load(symbol, args.interval)['close'][-1]:.6g}"]
+         for symbol in symbols[:20]],
+        headers=["Par", "Velas", "Último cierre"], tablefmt="grid"
+    ))
@@ -1,39 +1,209 @@
 import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
 from tabulate import tabulate
 import telegram_send
 from PIL import Image
 
+
+class TableRenderer:
+    def __init__(self, dpi=150, fontsize=9, max_templates=16, compress_level=1):
+        """
+        Servicio de renderizado de tablas a PNG con figuras reutilizables.
+
+        Cada forma de tabla (filas x columnas) tiene una plantilla ya construida
+        sobre el backend Agg (sin interfaz gráfica): una grilla de líneas y un
+        texto por celda. Renderizar solo actualiza el texto de las celdas y la
+        geometría, evitando crear la figura, tight_layout y bbox_inches='tight'.
+
+        Args:
+            dpi (int): Resolución de las imágenes
+            fontsize (int): Tamaño de fuente de las celdas
+            max_templates (int): Cantidad máxima de plantillas en memoria (LRU)
+            compress_level (int): Nivel de compresión PNG (0-9, menor es más rápido)
+        """
+        self.dpi = dpi
+        self.fontsize = fontsize
+        self.max_templates = max_templates
+        self.compress_level = compress_level
+
+        # Medidas aproximadas en pulgadas derivadas del tamaño de fuente
+        self.char_width = fontsize * 0.62 / 72
+        self.row_height = fontsize * 2.0 / 72
+        self.title_height = fontsize * 2.5 / 72
+        self.cell_padding = 2
+
+        self._templates = OrderedDict()
+        # Las figuras de matplotlib no son thread-safe: un render a la vez
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_template(self, n_rows, n_cols):
+        """
+        Devuelve la plantilla para una forma de tabla, creándola si no existe
+
+        Args:
+            n_rows (int): Cantidad de filas de datos (sin encabezado)
+            n_cols (int): Cantidad de columnas
+
+        Returns:
+            dict: Figura, ejes, líneas de la grilla, textos de celdas y título
+        """
+        key = (n_rows, n_cols)
+        template = self._templates.get(key)
+        if template is not None:
+            self._templates.move_to_end(key)
+            return template
+
+        figure = Figure(dpi=self.dpi)
+        FigureCanvasAgg(figure)
+        # Ejes en pulgadas: (0, 0) es la esquina inferior izquierda de la tabla
+        ax = figure.add_axes([0, 0, 1, 1])
+        ax.axis('off')
+
+        grid = LineCollection([], colors='black', linewidths=1.0)
+        ax.add_collection(grid)
+
+        cells = [
+            [ax.text(0, 0, '', ha='center', va='center', fontsize=self.fontsize) for _ in range(n_cols)]
+            for _ in range(n_rows + 1)
+        ]
+        title = figure.text(0.5, 1.0, '', ha='center', va='top', fontsize=self.fontsize + 3)
+
+        template = {'figure': figure, 'axes': ax, 'grid': grid, 'cells': cells, 'title': title}
+        self._templates[key] = template
+        if len(self._templates) > self.max_templates:
+            self._templates.popitem(last=False)
+        return template
+
+    def render(self, data, headers, title=""):
+        """
+        Renderiza una tabla a imagen PNG en memoria
+
+        Args:
+            data (list): Filas de la tabla (listas de valores)
+            headers (list): Encabezados de las columnas
+            title (str): Título opcional sobre la tabla
+
+        Returns:
+            io.BytesIO: Buffer con la imagen PNG, posicionado al inicio
+
+        Raises:
+            ValueError: Si alguna fila no tiene una celda por encabezado
+        """
+        rows = [[str(header) for header in headers]]
+        rows.extend([str(value) for value in row] for row in data)
+        n_rows, n_cols = len(rows) - 1, len(headers)
+        # Las plantillas se reutilizan: una fila corta dejaría texto de la tabla anterior
+        for index, row in enumerate(rows[1:]):
+            if len(row) != n_cols:
+                raise ValueError(f"La fila {index} tiene {len(row)} celdas y hay {n_cols} encabezados")
+
+        # Ancho de cada columna según su texto más largo
+        col_chars = [0] * n_cols
+        for row in rows:
+            for col, value in enumerate(row):
+                col_chars[col] = max(col_chars[col], len(value))
+        col_widths = [(chars + self.cell_padding) * self.char_width for chars in col_chars]
+        col_edges = [0.0]
+        for width in col_widths:
+            col_edges.append(col_edges[-1] + width)
+
+        table_width = col_edges[-1]
+        table_height = (n_rows + 1) * self.row_height
+        title_height = self.title_height if title else 0.0
+        margin = self.char_width
+        fig_width = table_width + 2 * margin
+        fig_height = table_height + title_height + 2 * margin
+
+        # Grilla: líneas horizontales entre filas y verticales entre columnas
+        segments = [[(0, y * self.row_height), (table_width, y * self.row_height)] for y in range(n_rows + 2)]
+        segments.extend([(x, 0), (x, table_height)] for x in col_edges)
+
+        with self._lock:
+            template = self._get_template(n_rows, n_cols)
+            figure, ax = template['figure'], template['axes']
+
+            figure.set_size_inches(fig_width, fig_height)
+            ax.set_position([margin / fig_width, margin / fig_height,
+                             table_width / fig_width, table_height / fig_height])
+            ax.set_xlim(0, table_width)
+            ax.set_ylim(0, table_height)
+            template['grid'].set_segments(segments)
+
+            for row_index, row in enumerate(rows):
+                y = table_height - (row_index + 0.5) * self.row_height
+                for col, value in enumerate(row):
+                    cell = template['cells'][row_index][col]
+                    cell.set_text(value)
+                    cell.set_position(((col_edges[col] + col_edges[col + 1]) / 2, y))
+            template['title'].set_text(title)
+
+            buf = io.BytesIO()
+            figure.savefig(buf, format='png', dpi=self.dpi,
+                           pil_kwargs={'compress_level': self.compress_level})
+            buf.seek(0)
+
+        return buf
+
+    def render_batch(self, tables):
+        """
+        Renderiza varias tablas reutilizando las plantillas
+
+        Args:
+            tables (list): Tuplas (data, headers) o (data, headers, title)
+
+        Returns:
+            list: Buffers PNG en el mismo orden que las tablas
+        """
+        return [self.render(*table) for table in tables]
+
+    def submit_batch(self, tables):
+        """
+        Renderiza un lote de tablas en un hilo de fondo
+
+        Args:
+            tables (list): Tuplas (data, headers) o (data, headers, title)
+
+        Returns:
+            concurrent.futures.Future: Futuro con la lista de buffers PNG
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='table-renderer')
+        return self._executor.submit(self.render_batch, list(tables))
+
+    def close(self):
+        """
+        Detiene el hilo de fondo y libera las plantillas
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            self._templates.clear()
+
+
+# Servicio compartido de renderizado de tablas
+table_renderer = TableRenderer()
+
+
 # Esta función convierte una tabla en imagen
 def table_to_image(data, headers, title="", figsize=(10, 6)):
-    fig, ax = plt.subplots(figsize=figsize)
-    ax.axis('tight')
-    ax.axis('off')
-    
-    # Crear la tabla en matplotlib
-    table = ax.table(
-        cellText=data,
-        colLabels=headers,
-        loc='center',
-        cellLoc='center'
-    )
-    
-    # Ajustar tamaño de fuente
-    table.auto_set_font_size(False)
-    table.set_fontsize(9)
-    
-    # Ajustar ancho de columnas
-    table.auto_set_column_width(col=list(range(len(headers))))
-    
-    # Agregar título
-    plt.title(title)
-    plt.tight_layout()
-    
-    # Guardar en un buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-    buf.seek(0)
-    plt.close(fig)
-    
-    return buf
\ No newline at end of file
+    """
+    Convierte una tabla en imagen usando el servicio compartido
+
+    Args:
+        data (list): Filas de la tabla
+        headers (list): Encabezados de las columnas
+        title (str): Título de la tabla
+        figsize (tuple): Se conserva por compatibilidad; el tamaño se ajusta al contenido
+
+    Returns:
+        io.BytesIO: Buffer con la imagen PNG
+    """
+    return table_renderer.render(data, headers, title)
@@ -0,0 +1,419 @@
+import argparse
+import contextlib
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+from decouple import config
+from candle_store import KLINE_DTYPE, to_frame
+from clock import VirtualClock
+from main import PecetoPredictor, logger
+
+# Operación agregada de Binance (aggTrade) en formato binario
+AGG_TRADE_DTYPE = np.dtype([
+    ('agg_id', '<i8'),
+    ('price', '<f8'),
+    ('quantity', '<f8'),
+    ('first_id', '<i8'),
+    ('last_id', '<i8'),
+    ('time', '<i8'),
+    ('buyer_maker', '?'),
+])
+
+# Claves de los mensajes de aggTrade (websocket y get_aggregate_trades) por campo
+AGG_TRADE_KEYS = (('agg_id', 'a'), ('price', 'p'), ('quantity', 'q'), ('first_id', 'f'),
+                  ('last_id', 'l'), ('time', 'T'), ('buyer_maker', 'm'))
+
+
+def trades_to_array(trades):
+    """
+    Convierte mensajes de aggTrade de Binance a registros
+
+    Args:
+        trades (list): Diccionarios con las claves a, p, q, f, l, T, m (websocket o REST)
+
+    Returns:
+        np.ndarray: Registros AGG_TRADE_DTYPE
+    """
+    array = np.empty(len(trades), dtype=AGG_TRADE_DTYPE)
+    for field, key in AGG_TRADE_KEYS:
+        array[field] = [trade[key] for trade in trades]
+    return array
+
+
+def load_agg_trades_csv(path):
+    """
+    Lee un archivo de aggTrades de los datos públicos de Binance (data.binance.vision)
+
+    Acepta archivos con o sin cabecera y tiempos en milisegundos o microsegundos.
+
+    Args:
+        path (str): Archivo CSV (o .zip con un único CSV)
+
+    Returns:
+        np.ndarray: Registros AGG_TRADE_DTYPE ordenados por tiempo
+    """
+    first = pd.read_csv(path, header=None, nrows=1)
+    header = None if str(first.iloc[0, 0]).isdigit() else 0
+    data = pd.read_csv(path, header=header)
+    array = np.empty(len(data), dtype=AGG_TRADE_DTYPE)
+    for position, field in enumerate(AGG_TRADE_DTYPE.names):
+        array[field] = data.iloc[:, position].to_numpy()
+    # Desde 2025 los archivos de contado traen los tiempos en microsegundos
+    if len(array) and array['time'][0] > 10**14:
+        array['time'] //= 1000
+    return array
+
+
+def build_bars(trades, bar_ms, start=None, prev_close=None):
+    """
+    Arma velas OHLCV de bar_ms milisegundos a partir de operaciones
+
+    Las velas sin operaciones se completan con el cierre anterior y volumen
+    cero (como las velas de 1s de Binance), de modo que la serie no tiene
+    huecos de tiempo.
+
+    Args:
+        trades (np.ndarray): Registros AGG_TRADE_DTYPE ordenados por tiempo
+        bar_ms (int): Duración de cada vela en milisegundos
+        start (int): open_time de la primera vela (por defecto, la de la primera operación)
+        prev_close (float): Cierre previo para completar velas vacías iniciales
+
+    Returns:
+        np.ndarray: Registros KLINE_DTYPE desde start hasta la vela de la última operación
+    """
+    if not len(trades):
+        return np.empty(0, dtype=KLINE_DTYPE)
+    buckets = trades['time'] // bar_ms * bar_ms
+    first = int(buckets[0]) if start is None else start
+    count = (int(buckets[-1]) - first) // bar_ms + 1
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.concatenate((starts[1:], [len(trades)])) - 1
+    rows = (buckets[starts] - first) // bar_ms
+
+    bars = np.zeros(count, dtype=KLINE_DTYPE)
+    bars['open_time'] = first + np.arange(count, dtype=np.int64) * bar_ms
+    bars['close_time'] = bars['open_time'] + bar_ms - 1
+    bars['open'][rows] = trades['price'][starts]
+    bars['close'][rows] = trades['price'][ends]
+    bars['high'][rows] = np.maximum.reduceat(trades['price'], starts)
+    bars['low'][rows] = np.minimum.reduceat(trades['price'], starts)
+    bars['volume'][rows] = np.add.reduceat(trades['quantity'], starts)
+    bars['quote_asset_volume'][rows] = np.add.reduceat(trades['price'] * trades['quantity'], starts)
+    bars['number_of_trades'][rows] = np.add.reduceat(trades['last_id'] - trades['first_id'] + 1, starts)
+    # Compras agresivas: el comprador no es el maker
+    taker_quantity = np.where(trades['buyer_maker'], 0.0, trades['quantity'])
+    bars['taker_buy_base_asset_volume'][rows] = np.add.reduceat(taker_quantity, starts)
+    bars['taker_buy_quote_asset_volume'][rows] = np.add.reduceat(taker_quantity * trades['price'], starts)
+
+    # Velas vacías: precio plano en el último cierre
+    filled = np.zeros(count, dtype=bool)
+    filled[rows] = True
+    if not filled.all():
+        last = np.maximum.accumulate(np.where(filled, np.arange(count), -1))
+        close = np.where(last >= 0, bars['close'][np.maximum(last, 0)],
+                         np.nan if prev_close is None else prev_close)
+        for field in ('open', 'high', 'low', 'close'):
+            bars[field] = np.where(filled, bars[field], close)
+    return bars
+
+
+class TradeCandleBuilder:
+    def __init__(self, bar_ms=1000, history=1000, on_bar=None):
+        """
+        Velas de bar_ms milisegundos armadas en memoria a partir de aggTrades
+
+        Las operaciones se agregan por lotes (un mensaje del websocket o una
+        página de la API); cuando una vela se cierra se llama a on_bar.
+
+        Args:
+            bar_ms (int): Duración de cada vela en milisegundos (1000 para 1s)
+            history (int): Velas cerradas a conservar
+            on_bar (callable): on_bar(builder, closed) al cerrarse una o más velas
+        """
+        self.bar_ms = bar_ms
+        self.history = history
+        self.on_bar = on_bar
+        self._closed = np.empty(0, dtype=KLINE_DTYPE)
+        self._forming = None
+        self._lock = threading.Lock()
+        self.last_agg_id = None
+        self.late_trades = 0
+
+    def add(self, trades):
+        """
+        Agrega un lote de operaciones ordenadas por tiempo
+
+        Args:
+            trades (np.ndarray | list): Registros AGG_TRADE_DTYPE o mensajes de aggTrade
+
+        Returns:
+            int: Velas cerradas por el lote
+        """
+        if not isinstance(trades, np.ndarray):
+            trades = trades_to_array(trades)
+        with self._lock:
+            # Operaciones repetidas (reconexiones) o de velas ya cerradas se descartan
+            if self.last_agg_id is not None:
+                trades = trades[trades['agg_id'] > self.last_agg_id]
+            if not len(trades):
+                return 0
+            self.last_agg_id = int(trades['agg_id'][-1])
+            forming = self._forming
+            if forming is not None:
+                late = trades['time'] < forming['open_time']
+                self.late_trades += int(np.count_nonzero(late))
+                trades = trades[~late]
+                if not len(trades):
+                    return 0
+                start, prev_close = int(forming['open_time']), float(forming['close'])
+            elif len(self._closed):
+                start, prev_close = int(self._closed['open_time'][-1]) + self.bar_ms, float(self._closed['close'][-1])
+                late = trades['time'] < start
+                self.late_trades += int(np.count_nonzero(late))
+                trades = trades[~late]
+                if not len(trades):
+                    return 0
+            else:
+                start, prev_close = None, None
+
+            bars = build_bars(trades, self.bar_ms, start, prev_close)
+            # Una vela en formación sin operaciones (abierta por advance) se reemplaza
+            if forming is not None and forming['number_of_trades']:
+                bars[0] = self._merge(forming, bars[0])
+            closed = self._append(bars[:-1])
+            self._forming = bars[-1]
+        if closed and self.on_bar is not None:
+            self.on_bar(self, closed)
+        return closed
+
+    @staticmethod
+    def _merge(forming, bar):
+        # Une la vela en formación con las operaciones nuevas del mismo período (si el
+        # lote no trae operaciones de ese período, bar es plana en el mismo cierre)
+        merged = forming.copy()
+        merged['high'] = max(forming['high'], bar['high'])
+        merged['low'] = min(forming['low'], bar['low'])
+        merged['close'] = bar['close']
+        for field in ('volume', 'quote_asset_volume', 'number_of_trades',
+                      'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume'):
+            merged[field] = forming[field] + bar[field]
+        return merged
+
+    def _append(self, bars):
+        if len(bars):
+            self._closed = np.concatenate((self._closed, bars))[-self.history:]
+        return len(bars)
+
+    def advance(self, now_ms):
+        """
+        Cierra las velas cuyo período terminó aunque no haya operaciones nuevas
+
+        Args:
+            now_ms (int): Instante actual en milisegundos
+
+        Returns:
+            int: Velas cerradas
+        """
+        with self._lock:
+            forming = self._forming
+            if forming is None or now_ms <= forming['close_time']:
+                return 0
+            # Velas vacías hasta la que contiene now_ms, que pasa a ser la nueva en formación
+            # (plana en el último cierre y sin volumen hasta que lleguen operaciones)
+            current = now_ms // self.bar_ms * self.bar_ms
+            count = (current - int(forming['open_time'])) // self.bar_ms
+            bars = np.zeros(count + 1, dtype=KLINE_DTYPE)
+            bars[0] = forming
+            empty = bars[1:]
+            empty['open_time'] = int(forming['open_time']) + np.arange(1, count + 1, dtype=np.int64) * self.bar_ms
+            empty['close_time'] = empty['open_time'] + self.bar_ms - 1
+            for field in ('open', 'high', 'low', 'close'):
+                empty[field] = forming['close']
+            closed = self._append(bars[:-1])
+            self._forming = bars[-1]
+        if closed and self.on_bar is not None:
+            self.on_bar(self, closed)
+        return closed
+
+    def candles(self, limit=None, include_forming=False):
+        """
+        Últimas velas armadas
+
+        Args:
+            limit (int): Cantidad máxima de velas
+            include_forming (bool): Agregar la vela en formación al final
+
+        Returns:
+            np.ndarray: Registros KLINE_DTYPE
+        """
+        with self._lock:
+            rows = self._closed
+            if include_forming and self._forming is not None:
+                rows = np.concatenate((rows, self._forming[None]))
+            return rows if limit is None else rows[-limit:]
+
+
+class TradeSignalFeed:
+    def __init__(self, predictor, bar_ms=1000, limit=200, history=1000):
+        """
+        Evalúa las señales de un predictor sobre velas armadas desde aggTrades
+
+        Cada vez que se cierra una vela se calculan los indicadores y se
+        procesan las señales con las últimas `limit` velas cerradas, sin
+        consultar la API. Si se cierran varias velas juntas se evalúa solo la
+        última.
+
+        Args:
+            predictor (PecetoPredictor): Predictor a alimentar (su intervalo es solo una etiqueta)
+            bar_ms (int): Duración de cada vela en milisegundos
+            limit (int): Velas por evaluación (como get_historical_klines)
+            history (int): Velas cerradas a conservar
+        """
+        self.predictor = predictor
+        self.limit = limit
+        self.builder = TradeCandleBuilder(bar_ms, max(history, limit), on_bar=self._on_bar)
+        self.evaluations = 0
+        # El websocket y el temporizador de advance() pueden cerrar velas a la vez
+        self._evaluating = threading.Lock()
+
+    def _on_bar(self, builder, closed):
+        with self._evaluating:
+            candles = builder.candles(self.limit)
+            # Los cruces necesitan al menos la vela anterior
+            if len(candles) < 2:
+                return
+            data = to_frame(candles)
+            try:
+                data = self.predictor.calculate_indicators(data, self.predictor.required_columns)
+                self.predictor.process_signals(data)
+                self.evaluations += 1
+            except Exception as e:
+                logger.error(f"Error al evaluar velas de operaciones de {self.predictor.symbol}: {e}")
+
+    def on_message(self, message):
+        """
+        Callback para los mensajes del websocket de aggTrade de Binance
+        """
+        if message.get('e') == 'error':
+            logger.error(f"Error en el stream de operaciones: {message}")
+            return
+        self.builder.add([message])
+
+    def run(self, api_key=None, api_secret=None):
+        """
+        Se suscribe al stream de aggTrade del par y procesa las velas hasta Ctrl+C
+        """
+        from binance import ThreadedWebsocketManager
+
+        manager = ThreadedWebsocketManager(api_key=api_key, api_secret=api_secret)
+        manager.start()
+        manager.start_aggtrade_socket(callback=self.on_message, symbol=self.predictor.symbol)
+        logger.info(f"Velas de {self.builder.bar_ms} ms desde aggTrades de {self.predictor.symbol}")
+        print(f"Velas de {self.builder.bar_ms} ms desde el stream de operaciones de {self.predictor.symbol}")
+        print(f"Presiona Ctrl+C para detener el bot")
+        try:
+            # Cierra las velas sin operaciones aunque el stream esté quieto
+            while True:
+                self.predictor.clock.sleep(self.builder.bar_ms / 1000)
+                self.builder.advance(int(self.predictor.clock.time() * 1000))
+        except KeyboardInterrupt:
+            print("\n\nBot detenido manualmente.")
+            logger.info("Bot detenido manualmente")
+        finally:
+            manager.stop()
+
+
+class TradeReplay:
+    def __init__(self, trades, clock, batch_ms=100):
+        """
+        Reproduce operaciones almacenadas como si llegaran por el websocket
+
+        Las operaciones se entregan en lotes de batch_ms milisegundos y el
+        reloj virtual avanza hasta el tiempo de cada lote, de modo que el
+        cooldown y las alertas ven la hora de la operación.
+
+        Args:
+            trades (np.ndarray): Registros AGG_TRADE_DTYPE ordenados por tiempo
+            clock (VirtualClock): Reloj de la simulación
+            batch_ms (int): Ventana de agrupación de los mensajes
+        """
+        self.trades = trades
+        self.clock = clock
+        self.batch_ms = batch_ms
+
+    def batches(self):
+        """
+        Yields:
+            np.ndarray: Lotes de operaciones en orden
+        """
+        if not len(self.trades):
+            return
+        windows = self.trades['time'] // self.batch_ms
+        bounds = np.flatnonzero(np.concatenate(([True], windows[1:] != windows[:-1], [True])))
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            batch = self.trades[first:last]
+            # Llegada al final de la ventana del lote
+            arrival = (int(windows[first]) + 1) * self.batch_ms / 1000
+            if arrival > self.clock.time():
+                self.clock.sleep(arrival - self.clock.time())
+            yield batch
+
+    def run(self, feed):
+        """
+        Entrega todas las operaciones a un TradeSignalFeed
+
+        Returns:
+            int: Velas cerradas
+        """
+        closed = 0
+        for batch in self.batches():
+            closed += feed.builder.add(batch)
+        closed += feed.builder.advance(int(self.clock.time() * 1000) + feed.builder.bar_ms)
+        return closed
+
+
+if __name__ == "__main__":
+    from replay import CapturingAlertSystem, OfflineKlineClient, ReplayAlertAggregator
+
+    parser = argparse.ArgumentParser(description="Señales Peceto sobre velas armadas desde operaciones (aggTrades)")
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--bar-ms', type=int, default=1000, help="Duración de cada vela en milisegundos")
+    parser.add_argument('--replay', help="Archivo CSV/ZIP de aggTrades de data.binance.vision a reproducir")
+    parser.add_argument('--telegram', action='store_true', help="Enviar alertas por Telegram (solo en vivo)")
+    args = parser.parse_args()
+    label = '1s' if args.bar_ms == 1000 else f"{args.bar_ms}ms"
+
+    if args.replay:
+        trades = load_agg_trades_csv(args.replay)
+        start = pd.Timestamp(int(trades['time'][0]) // 1000 * 1000, unit='ms').to_pydatetime()
+        clock = VirtualClock(start)
+        aggregator = ReplayAlertAggregator(CapturingAlertSystem(clock), clock)
+        predictor = PecetoPredictor(None, None, symbol=args.symbol, interval=label, show_chart=False,
+                                    attach_chart_image=False, client=OfflineKlineClient({}, clock), clock=clock,
+                                    alert_aggregator=aggregator, indicator_backend='fused')
+        feed = TradeSignalFeed(predictor, args.bar_ms)
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            bars = TradeReplay(trades, clock).run(feed)
+            aggregator.flush()
+        elapsed = time.perf_counter() - started
+        print(f"{len(trades)} operaciones -> {bars} velas de {label} en {elapsed:.1f}s "
+              f"({elapsed / max(feed.evaluations, 1) * 1000:.2f} ms por evaluación)")
+        print(tabulate(
+            [[signal['candle'], signal['signal_type'], f"{signal['price']:.2f}", signal['strength']]
+             for signal in aggregator.signals],
+            headers=["Vela", "Señal", "Precio", "Fuerza"], tablefmt="grid"
+        ))
+    else:
+        predictor = PecetoPredictor(
+            api_key=config("BINANCE_API_KEY"),
+            api_secret=config("BINANCE_API_SECRET"),
+            symbol=args.symbol,
+            interval=label,
+            use_telegram=args.telegram,
+            show_chart=False,
+        )
+        TradeSignalFeed(predictor, args.bar_ms).run(config("BINANCE_API_KEY"), config("BINANCE_API_SECRET"))
@@ -0,0 +1,171 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+from candle_store import CandleStore, interval_to_ms
+from optimizer import (DEFAULT_GRID, SEARCH_SPACE, IndicatorBank, evaluate, expand_grid, grid_search,
+                       map_with_bank, sample_candidates, successive_halving)
+
+
+def make_folds(count, train_size, test_size, step=None, start=0):
+    """
+    Divide un historial en ventanas móviles de entrenamiento y prueba
+
+    Args:
+        count (int): Cantidad de velas del historial
+        train_size (int): Velas de cada ventana de entrenamiento
+        test_size (int): Velas de cada ventana de prueba
+        step (int): Desplazamiento entre ventanas (por defecto test_size)
+        start (int): Primera vela utilizable (por ejemplo, tras el calentamiento)
+
+    Returns:
+        list: Tuplas (inicio de entrenamiento, inicio de prueba, fin de prueba)
+    """
+    step = test_size if step is None else step
+    if step < test_size:
+        raise ValueError("Las ventanas de prueba no pueden superponerse (step < test_size)")
+    return [
+        (train_start, train_start + train_size, train_start + train_size + test_size)
+        for train_start in range(start, count - train_size - test_size + 1, step)
+    ]
+
+
+def _run_fold(bank, fold, candidates, search, objective, backtest_kwargs):
+    """
+    Optimiza sobre la ventana de entrenamiento y evalúa sobre la de prueba
+    """
+    train_start, test_start, test_stop = fold
+    if search == 'halving':
+        found = successive_halving(bank, candidates, start=train_start, stop=test_start,
+                                   objective=objective, **backtest_kwargs)
+        params, train_score = found['params'], found['score']
+    else:
+        params, train_score = grid_search(bank, candidates, train_start, test_start, objective, **backtest_kwargs)
+    results = evaluate(bank, params, test_start, test_stop, keep_equity=True, **backtest_kwargs)
+    return params, train_score, results
+
+
+def walk_forward(candles, train_size, test_size, param_grid=None, candidates=None, step=None,
+                 objective='total_return', search='grid', n_candidates=243, seed=None,
+                 workers=None, warmup=200, initial_capital=1000.0, fee=0.001):
+    """
+    Optimización walk-forward de los parámetros de la estrategia Peceto
+
+    Cada ventana elige los parámetros con mejor puntaje en su tramo de
+    entrenamiento y los evalúa en el tramo siguiente. Los indicadores se
+    calculan una sola vez sobre todo el historial y los comparten todas las
+    ventanas; las ventanas se reparten entre procesos.
+
+    La equity fuera de muestra se encadena: cada tramo de prueba empieza con
+    el capital con el que terminó el anterior (una posición abierta al final
+    de un tramo se valúa al último cierre).
+
+    Args:
+        candles (np.ndarray): Registros KLINE_DTYPE ordenados por open_time
+        train_size (int): Velas de cada ventana de entrenamiento
+        test_size (int): Velas de cada ventana de prueba
+        param_grid (dict): Valores a probar por parámetro (por defecto DEFAULT_GRID)
+        candidates (list): Lista explícita de parámetros (reemplaza a param_grid)
+        step (int): Desplazamiento entre ventanas (por defecto test_size)
+        objective (str | callable): Métrica a maximizar en entrenamiento
+        search (str): 'grid' evalúa todos los candidatos; 'halving' usa successive_halving()
+        n_candidates (int): Candidatos a sortear de SEARCH_SPACE con search='halving'
+        seed (int): Semilla del sorteo de candidatos
+        workers (int): Procesos (por defecto, uno por núcleo)
+        warmup (int): Velas iniciales reservadas para el calentamiento de indicadores
+        initial_capital (float): Capital inicial en USDT
+        fee (float): Comisión por operación (fracción)
+
+    Returns:
+        dict: Ventanas con sus parámetros y métricas, y la equity fuera de muestra
+    """
+    if search not in ('grid', 'halving'):
+        raise ValueError(f"Búsqueda no soportada: {search}")
+    if candidates is None:
+        if search == 'halving' and param_grid is None:
+            candidates = sample_candidates(SEARCH_SPACE, n_candidates, seed)
+        else:
+            candidates = expand_grid(param_grid or DEFAULT_GRID)
+    folds = make_folds(len(candles), train_size, test_size, step, warmup)
+    if not folds:
+        raise ValueError("No hay velas suficientes para una ventana de entrenamiento y prueba")
+
+    bank = IndicatorBank(candles)
+    bank.precompute(candidates)
+    backtest_kwargs = {'initial_capital': initial_capital, 'fee': fee}
+    workers = workers if workers is not None else os.cpu_count() or 1
+    outputs = map_with_bank(
+        bank, _run_fold, [(fold, candidates, search, objective, backtest_kwargs) for fold in folds], workers
+    )
+
+    fold_results, equities = [], []
+    capital = initial_capital
+    for (train_start, test_start, test_stop), (params, train_score, results) in zip(folds, outputs):
+        equity = results.pop('equity') * (capital / initial_capital)
+        capital = float(equity[-1])
+        equities.append(equity)
+        fold_results.append({
+            'train_start': int(bank.open_time[train_start]),
+            'test_start': int(bank.open_time[test_start]),
+            'test_end': int(bank.open_time[test_stop - 1]),
+            'params': params,
+            'train_score': train_score,
+            'test': results,
+        })
+
+    equity = np.concatenate(equities)
+    peak = np.maximum.accumulate(np.concatenate(([initial_capital], equity)))[1:]
+    return {
+        'folds': fold_results,
+        # Con step > test_size las ventanas de prueba dejan huecos entre sí
+        'timestamps': np.concatenate([bank.open_time[start:stop] for _, start, stop in folds]),
+        'equity': equity,
+        'final_equity': capital,
+        'total_return': capital / initial_capital - 1,
+        'max_drawdown': float(np.max(1 - equity / peak)),
+        'trades': sum(fold['test']['trades'] for fold in fold_results),
+        'candidates': len(candidates),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimización walk-forward de la estrategia Peceto")
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--interval', default='15m')
+    parser.add_argument('--start', help="Inicio del historial (UTC), por ejemplo 2024-01-01")
+    parser.add_argument('--end', help="Fin del historial (UTC)")
+    parser.add_argument('--data-dir', default='data/klines', help="Directorio del almacenamiento local de velas")
+    parser.add_argument('--train-days', type=float, default=60, help="Días de cada ventana de entrenamiento")
+    parser.add_argument('--test-days', type=float, default=15, help="Días de cada ventana de prueba")
+    parser.add_argument('--objective', default='total_return', help="Métrica a maximizar en entrenamiento")
+    parser.add_argument('--search', choices=['grid', 'halving'], default='grid', help="Grilla completa o búsqueda adaptativa")
+    parser.add_argument('--seed', type=int, help="Semilla del sorteo de candidatos (búsqueda adaptativa)")
+    parser.add_argument('--workers', type=int, help="Procesos (por defecto, uno por núcleo)")
+    args = parser.parse_args()
+
+    to_ms = lambda value: int(np.datetime64(value, 'ms').astype(np.int64)) if value else None
+    candles = CandleStore(args.data_dir).load(args.symbol, args.interval, to_ms(args.start), to_ms(args.end))
+    bars_per_day = 86_400_000 // interval_to_ms(args.interval)
+
+    started = time.perf_counter()
+    result = walk_forward(
+        candles, int(args.train_days * bars_per_day), int(args.test_days * bars_per_day),
+        objective=args.objective, search=args.search, seed=args.seed, workers=args.workers
+    )
+    elapsed = time.perf_counter() - started
+
+    tuned = list(SEARCH_SPACE if args.search == 'halving' else DEFAULT_GRID)
+    print(f"Walk-forward {args.symbol} {args.interval}: {len(result['folds'])} ventanas, "
+          f"{result['candidates']} candidatos en {elapsed:.1f}s")
+    print(tabulate(
+        [[pd.Timestamp(fold['test_start'], unit='ms'), pd.Timestamp(fold['test_end'], unit='ms'),
+          *(fold['params'][name] for name in tuned),
+          f"{fold['train_score']:.4f}", f"{fold['test']['total_return']:.2%}", fold['test']['trades']]
+         for fold in result['folds']],
+        headers=["Prueba desde", "Prueba hasta", *tuned, "Entrenamiento", "Retorno prueba", "Operaciones"],
+        tablefmt="grid"
+    ))
+    print(f"Retorno fuera de muestra: {result['total_return']:.2%}  "
+          f"Máximo drawdown: {result['max_drawdown']:.2%}  Operaciones: {result['trades']}")